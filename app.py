@@ -1,9 +1,32 @@
+import logging
+import tempfile
+import time
+
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import numpy as np
 import re
 
+from export import FORMATS as EXPORT_FORMATS, XLSX_MAX_ROWS, Export
+from facets import open_facet_index, value_range
+from price_stats import GroupStats, open_price_stats
+from score_explanations import open_score_explanations
+from search_index import open_search_index
+from sort_index import open_sort_index
+from supplier_index import current_index_path, read_index
+from supplier_query import keyword_rows
+
+logger = logging.getLogger(__name__)
+
+CSV_FILE_PATH = "attached_assets/indiamart_casting_data_cleaned_no_missing_prices.csv"
+PAGE_SIZES = [10, 25, 50]
+# Exports larger than this are spooled to a temporary file on disk
+EXPORT_SPOOL_BYTES = 8 * 1024 * 1024
+
+# Timed from the top of every rerun
+rerun_started = time.perf_counter()
+
 # Set page configuration
 st.set_page_config(page_title="Manufacturer Directory",
                    page_icon="🏭",
@@ -97,136 +120,226 @@ if page == "Home":
 elif page == "Supplier Search":
     st.markdown("## Filter and explore suppliers in the casting industry")
 
-# Scoring weights for supplier ranking
-SCORING_WEIGHTS = {
-    'products': 0.15,        # Diversity of product range
-    'business_info': 0.20,   # Company age, turnover, and employees
-    'quality': 0.25,         # Certifications and ratings
-    'market_presence': 0.25,  # Reviews and ratings
-    'accessibility': 0.15    # Contact information and location
-}
-
+# Load data function. The pre-scored index is memory-mapped, so it is cached
+# as a shared resource rather than copied into every session by st.cache_data.
+@st.cache_resource
+def load_index_path():
+    return current_index_path(CSV_FILE_PATH, preset='streamlit')
 
-# Function to calculate supplier score
-def calculate_supplier_score(row):
-    score = 0
-    
-    # Products score (15%) - Based on product details in name
-    product_score = 0
-    if pd.notna(row['Product Name']):
-        # More words in product name might indicate more product details
-        words = len(row['Product Name'].split())
-        product_score = min(words / 10, 1)  # Normalize to max of 1
-        
-        # Bonus for specific manufacturing details
-        manufacturing_terms = ['casting', 'machined', 'forged', 'precision', 'custom']
-        if any(term in row['Product Name'].lower() for term in manufacturing_terms):
-            product_score += 0.3
-            
-        # Cap at 1.0
-        product_score = min(product_score, 1.0)
-    
-    # Business info score (20%) - Based on available business info
-    business_score = 0
-    # Company URL often indicates established business
-    if pd.notna(row['Company URL']):
-        business_score += 0.5
-    
-    # Company name patterns suggesting established business
-    company_patterns = ['ltd', 'limited', 'pvt', 'private', 'industries', 'inc', 'corporation']
-    if any(pattern in str(row['Company']).lower() for pattern in company_patterns):
-        business_score += 0.5
-    
-    # Cap at 1.0
-    business_score = min(business_score, 1.0)
-    
-    # Quality score (25%) - Based on ratings and inferred quality
-    quality_score = 0
-    
-    # Base on rating if available
-    if pd.notna(row['Rating']) and row['Rating'] > 0:
-        quality_score = row['Rating'] / 5.0  # Normalize to 0-1
-    
-    # Quality terms in product name
-    quality_terms = ['premium', 'high quality', 'certified', 'iso', 'standard']
-    if any(term in str(row['Product Name']).lower() for term in quality_terms):
-        quality_score += 0.3
-        
-    # Cap at 1.0
-    quality_score = min(quality_score, 1.0)
-    
-    # Market presence score (25%) - Based on price position and online presence
-    market_score = 0
-    
-    # Competitive pricing (inverse of normalized price)
-    # We'll assume higher price might indicate better quality
-    if pd.notna(row['Price (per Kg)']):
-        # This is just a placeholder - would be better with category-specific pricing knowledge
-        price_competitiveness = 0.5  # Neutral score for price
-        market_score += price_competitiveness
-    
-    # Online presence indicated by having URLs
-    if pd.notna(row['Company URL']) and pd.notna(row['Product URL']):
-        market_score += 0.5
-        
-    # Cap at 1.0
-    market_score = min(market_score, 1.0)
-    
-    # Accessibility score (15%) - Contact info and location
-    accessibility_score = 0
-    
-    # Phone and address available
-    if pd.notna(row['Phone']):
-        accessibility_score += 0.5
-    
-    if pd.notna(row['Address']) or pd.notna(row['City']):
-        accessibility_score += 0.5
-        
-    # Cap at 1.0
-    accessibility_score = min(accessibility_score, 1.0)
-    
-    # Calculate weighted score
-    final_score = (
-        SCORING_WEIGHTS['products'] * product_score +
-        SCORING_WEIGHTS['business_info'] * business_score +
-        SCORING_WEIGHTS['quality'] * quality_score +
-        SCORING_WEIGHTS['market_presence'] * market_score +
-        SCORING_WEIGHTS['accessibility'] * accessibility_score
-    )
-    
-    # Scale to 0-100 for better readability
-    return round(final_score * 100, 1)
 
-# Load data function
-@st.cache_data
+@st.cache_resource
 def load_data():
     try:
-        df = pd.read_csv(
-            "attached_assets/indiamart_casting_data_cleaned_no_missing_prices.csv"
-        )
-        # Convert Price to numeric, handling any errors
-        df['Price (per Kg)'] = pd.to_numeric(df['Price (per Kg)'],
-                                             errors='coerce')
-        # Convert Rating to numeric and fill any missing ratings with 0
-        df['Rating'] = pd.to_numeric(df['Rating'], errors='coerce').fillna(0)
-        
-        # Calculate supplier score for each row
-        df['Supplier Score'] = df.apply(calculate_supplier_score, axis=1)
-        
-        return df
+        return read_index(load_index_path())
     except Exception as e:
         st.error(f"Error loading data: {e}")
         return pd.DataFrame()
 
 
+# The component scores the Supplier Score was combined from, and the terms
+# and signals behind each, stored in the index
+@st.cache_resource
+def load_explanations():
+    return open_score_explanations(load_index_path(), load_data())
+
+
+# Search index over Keyword, Product Name and Company, saved next to the
+# supplier index and memory-mapped like it (built there on first use)
+@st.cache_resource
+def load_search_index():
+    return open_search_index(load_index_path(), load_data())
+
+
+# Precomputed orderings for the "Sort by" options
+@st.cache_resource
+def load_sort_index():
+    return open_sort_index(load_index_path(), load_data())
+
+
+# Per-Keyword/City price quantiles and histograms
+@st.cache_resource
+def load_price_stats():
+    return open_price_stats(load_index_path(), load_data())
+
+
+# City/Keyword/rating/price codes for counting the sidebar's facets in one pass
+@st.cache_resource
+def load_facet_index():
+    return open_facet_index(load_index_path(), load_data())
+
+
+# Everything below depends only on the filter state, so it is cached per
+# state with st.cache_data; a rerun that only pages or expands a card reuses it
+
+@st.cache_data(max_entries=64)
+def matching_rows(selected_keyword, search_term):
+    """Row ids of the keyword (dropdown) or search term (search box) matches."""
+    df = load_data()
+    if selected_keyword is not None:
+        return np.flatnonzero((df['Keyword'] == selected_keyword).to_numpy())
+    if search_term:
+        # Case-insensitive word/prefix match in Keyword or Product Name,
+        # tolerating typos in words that match nothing
+        return keyword_rows(df, load_search_index(), search_term, fuzzy=True)
+    return np.arange(len(df))
+
+
+@st.cache_data(max_entries=64)
+def price_bounds(selected_keyword, search_term):
+    """Slider bounds: the keyword's precomputed min/max, else the matches', else every listing's."""
+    keyword_stats = load_price_stats()['keyword']
+    if selected_keyword is not None:
+        group = keyword_stats.groups_of([selected_keyword])[0]
+        if group >= 0:
+            return int(keyword_stats.minimum[group]), int(keyword_stats.maximum[group])
+    prices = load_data()['Price (per Kg)']
+    # Matches without any price fall back to the full price range
+    low, high = value_range(prices, matching_rows(selected_keyword, search_term)) or value_range(prices)
+    return int(low), int(high)
+
+
+@st.cache_data(max_entries=64)
+def price_filtered_rows(selected_keyword, search_term, price_range):
+    rows = matching_rows(selected_keyword, search_term)
+    prices = load_data()['Price (per Kg)'].to_numpy()[rows]
+    return rows[(prices >= price_range[0]) & (prices <= price_range[1])]
+
+
+@st.cache_data(max_entries=64)
+def city_options(selected_keyword, search_term, price_range):
+    """{city: listings} of the price-filtered matches, by city name."""
+    rows = price_filtered_rows(selected_keyword, search_term, price_range)
+    return dict(sorted(load_facet_index().value_counts('City', rows).items()))
+
+
+@st.cache_data(max_entries=64)
+def result_rows(selected_keyword, search_term, price_range, selected_city, sort_by, ascending):
+    """Row ids of the filtered listings, in display order."""
+    df = load_data()
+    rows = price_filtered_rows(selected_keyword, search_term, price_range)
+    if selected_city is not None:
+        rows = rows[(df['City'].iloc[rows] == selected_city).to_numpy()]
+    # Apply sorting from the precomputed order
+    return load_sort_index().sort(rows, sort_by, ascending)
+
+
+def price_histogram_figure(stats, group):
+    if not 0 <= group < len(stats.names):
+        return None
+    edges, counts = stats.display_histogram(group)
+    labels = [f"{low:,.0f}-{high:,.0f}" for low, high in zip(edges[:-1], edges[1:])]
+    return px.bar(x=labels, y=counts,
+                  title="Price Distribution (per Kg)",
+                  labels={"x": "Price (Rs per Kg)", "y": "Listings"},
+                  color_discrete_sequence=["#1f77b4"])
+
+
+@st.cache_data(max_entries=64)
+def price_histogram(selected_keyword, search_term, price_range, selected_city, full_price_range):
+    """Price histogram figure of the filtered listings."""
+    keyword_stats = load_price_stats()['keyword']
+    if selected_keyword is not None and selected_city is None and full_price_range:
+        # Exactly one keyword's listings: its precomputed histogram
+        return price_histogram_figure(keyword_stats, keyword_stats.groups_of([selected_keyword])[0])
+    rows = result_rows(selected_keyword, search_term, price_range, selected_city, 'Supplier Score', False)
+    # Bin just these listings the same way
+    return price_histogram_figure(GroupStats.build(
+        np.zeros(len(rows)), load_data()['Price (per Kg)'].iloc[rows]), 0)
+
+
+@st.cache_data(max_entries=64)
+def score_histogram(selected_keyword, search_term, price_range, selected_city):
+    """Supplier Score histogram figure, binned here rather than in the browser."""
+    rows = result_rows(selected_keyword, search_term, price_range, selected_city, 'Supplier Score', False)
+    counts, edges = np.histogram(load_data()['Supplier Score'].to_numpy()[rows], bins=20, range=(0, 100))
+    return px.bar(x=(edges[:-1] + edges[1:]) / 2, y=counts,
+                  title="AI-Ranked Supplier Score Distribution",
+                  labels={"x": "Supplier Score (0-100)", "y": "Listings"},
+                  color_discrete_sequence=["#2ca02c"])  # Green color
+
+
+SIGNAL_LABELS = {
+    'company_url': "company website",
+    'online_listing': "website and product page",
+    'priced': "price vs. similar listings",
+    'phone': "phone number",
+    'location': "address or city",
+}
+
+
+def score_breakdown(row_id):
+    """Markdown list of a listing's stored component scores and what raised them."""
+    lines = []
+    for component in load_explanations().explain(row_id):
+        reasons = [f"{component['words']} words in the name"] if 'words' in component else []
+        if 'rating' in component:
+            reasons.append(f"rated {component['rating']:g}/5")
+        reasons += [f"\"{term}\"" for term in component['terms']]
+        reasons += [SIGNAL_LABELS[signal] for signal in component['signals']]
+        value = component['score']
+        lines.append(f"- **{component['label']} ({component['weight']:.0%})**: "
+                     f"{'⭐' * max(1, round(value * 5))} {value * 100:.0f}/100"
+                     + (f" — {', '.join(reasons)}" if reasons else ""))
+    return "\n".join(lines)
+
+
+def render_supplier(row_id, row):
+    score = row['Supplier Score']
+
+    # Create color based on score
+    if score >= 80:
+        score_color = "green"
+    elif score >= 60:
+        score_color = "orange"
+    else:
+        score_color = "gray"
+
+    # Display company name with score badge
+    st.markdown(f"""
+    ### {row['Company']}
+    <span style="background-color:{score_color}; color:white; padding:4px 8px; border-radius:4px; font-size:16px;">
+    AI Score: {score:.1f}/100
+    </span>
+    """, unsafe_allow_html=True)
+
+    # Score breakdown from the component scores stored in the index
+    with st.expander("View Score Breakdown"):
+        st.markdown("**Score Components:**\n" + score_breakdown(row_id))
+
+    col1, col2 = st.columns([2, 1])
+
+    details = [f"**Product:** {row['Product Name']}",
+               f"**Price:** ₹{row['Price (per Kg)']:g} per Kg"]
+    if row['Rating'] > 0:
+        details.append(f"**Rating:** {'⭐' * int(row['Rating'])}")
+    if pd.notna(row['Address']):
+        details.append(f"**Address:** {row['Address']}")
+    if pd.notna(row['City']):
+        details.append(f"**City:** {row['City']}")
+    with col1:
+        st.markdown("  \n".join(details))
+
+    links = []
+    if pd.notna(row['Phone']):
+        links.append(f"**Phone:** {row['Phone']}")
+    if pd.notna(row['Product URL']):
+        links.append(f"[View Product on IndiaMART]({row['Product URL']})")
+    if pd.notna(row['Company URL']):
+        links.append(f"[Visit Company Website]({row['Company URL']})")
+    with col2:
+        st.markdown("  \n".join(links))
+
+    st.divider()
+
+
 # Load the data
 df = load_data()
 
 if df.empty:
     st.warning("No data available. Please check the CSV file.")
 elif page == "Supplier Search":  # Only show filtering on Supplier Search page
-    # Get unique keywords for dropdown
-    keywords = sorted(df['Keyword'].unique())
+    # Keywords for the dropdown, with their precomputed listing counts
+    keyword_counts = dict(sorted(load_facet_index().value_counts('Keyword').items()))
 
     # Sidebar filters
     st.sidebar.header("Filters")
@@ -235,181 +348,118 @@ elif page == "Supplier Search":  # Only show filtering on Supplier Search page
     filter_method = st.sidebar.radio(
         "Choose how to filter:", ["Select from dropdown", "Search by keyword"])
 
-    filtered_df = None
-
+    selected_keyword = search_term = None
     if filter_method == "Select from dropdown":
-        selected_keyword = st.sidebar.selectbox("Select a keyword:", keywords)
-        filtered_df = df[df['Keyword'] == selected_keyword]
+        selected_keyword = st.sidebar.selectbox("Select a keyword:", list(keyword_counts),
+                                                format_func=lambda k: f"{k} ({keyword_counts[k]})")
     else:
         search_term = st.sidebar.text_input(
-            "Search by keyword or product name:")
-        if search_term:
-            # Filter based on case-insensitive partial match in Keyword or Product Name
-            filtered_df = df[
-                df['Keyword'].str.contains(search_term, case=False)
-                | df['Product Name'].str.contains(search_term, case=False)]
-        else:
-            filtered_df = df.copy()
+            "Search by keyword or product name:") or None
 
     # Additional filters
     st.sidebar.subheader("Additional Filters")
 
-    # Price range filter
-    if not filtered_df.empty:
-        min_price = int(filtered_df['Price (per Kg)'].min())
-        max_price = int(filtered_df['Price (per Kg)'].max())
+    rows = matching_rows(selected_keyword, search_term)
+    price_range = None
+    selected_city = None
+    full_price_range = True
 
+    # Price range filter
+    if len(rows):
+        min_price, max_price = price_bounds(selected_keyword, search_term)
         price_range = st.sidebar.slider("Price Range (per Kg):", min_price,
                                         max_price, (min_price, max_price))
+        full_price_range = price_range == (min_price, max_price)
 
-        filtered_df = filtered_df[
-            (filtered_df['Price (per Kg)'] >= price_range[0])
-            & (filtered_df['Price (per Kg)'] <= price_range[1])]
-
-    # City filter if we have data
-    if not filtered_df.empty and 'City' in filtered_df.columns:
-        cities = ["All Cities"] + sorted(filtered_df['City'].unique().tolist())
-        selected_city = st.sidebar.selectbox("Filter by city:", cities)
-
-        if selected_city != "All Cities":
-            filtered_df = filtered_df[filtered_df['City'] == selected_city]
+        # City filter if we have data
+        city_counts = city_options(selected_keyword, search_term, price_range)
+        city_choice = st.sidebar.selectbox(
+            "Filter by city:", ["All Cities"] + list(city_counts),
+            format_func=lambda c: f"{c} ({city_counts[c]})" if c in city_counts else c)
+        if city_choice != "All Cities":
+            selected_city = city_choice
 
     # Main content area
-    if filtered_df is not None:
-        if filtered_df.empty:
-            st.warning("No companies match your filter criteria.")
-        else:
-            # Display count and allow sorting
-            st.subheader(f"Found {len(filtered_df)} matching companies")
-
-            # Sorting options
-            sort_col, sort_dir = st.columns(2)
-            with sort_col:
-                sort_by = st.selectbox("Sort by:",
-                                       ["Supplier Score", "Price (per Kg)", "Rating", "Company"])
-            with sort_dir:
-                ascending = st.selectbox("Order:", [("Ascending", True),
-                                                    ("Descending", False)],
-                                         format_func=lambda x: x[0])[1]
-
-            # Apply sorting
-            if sort_by in filtered_df.columns:
-                filtered_df = filtered_df.sort_values(by=sort_by,
-                                                      ascending=ascending)
-                
-            # Default sort by Supplier Score if selecting that option
-            if sort_by == "Supplier Score":
-                filtered_df = filtered_df.sort_values(by="Supplier Score", 
-                                                      ascending=False)
-
-            # Visualization of price distribution
-            st.subheader("Price Distribution")
-            fig = px.histogram(filtered_df,
-                               x="Price (per Kg)",
-                               title="Price Distribution (per Kg)",
-                               labels={"Price (per Kg)": "Price (Rs per Kg)"},
-                               color_discrete_sequence=["#1f77b4"])
+    if len(rows):
+        rows = result_rows(selected_keyword, search_term, price_range, selected_city, 'Supplier Score', False)
+    if not len(rows):
+        st.warning("No companies match your filter criteria.")
+    else:
+        # Display count and allow sorting
+        st.subheader(f"Found {len(rows)} matching companies")
+
+        # Sorting options
+        sort_col, sort_dir = st.columns(2)
+        with sort_col:
+            sort_by = st.selectbox("Sort by:",
+                                   ["Supplier Score", "Price (per Kg)", "Rating", "Company"])
+        with sort_dir:
+            ascending = st.selectbox("Order:", [("Ascending", True),
+                                                ("Descending", False)],
+                                     format_func=lambda x: x[0])[1]
+
+        # Supplier Score always ranks best first
+        if sort_by == "Supplier Score":
+            ascending = False
+
+        rows = result_rows(selected_keyword, search_term, price_range, selected_city, sort_by, ascending)
+
+        # Visualization of price distribution
+        st.subheader("Price Distribution")
+        fig = price_histogram(selected_keyword, search_term, price_range, selected_city, full_price_range)
+        if fig is not None:
             st.plotly_chart(fig, use_container_width=True)
 
-            # Company details
-            st.subheader("Company Details")
-
-            # Add a visualization for supplier scores
-            st.subheader("Supplier Score Distribution")
-            score_fig = px.histogram(
-                filtered_df, 
-                x="Supplier Score",
-                title="AI-Ranked Supplier Score Distribution",
-                labels={"Supplier Score": "Supplier Score (0-100)"},
-                color_discrete_sequence=["#2ca02c"]  # Green color
-            )
-            st.plotly_chart(score_fig, use_container_width=True)
-            
+        # Add a visualization for supplier scores
+        st.subheader("Supplier Score Distribution")
+        st.plotly_chart(score_histogram(selected_keyword, search_term, price_range, selected_city),
+                        use_container_width=True)
+
+        # Company details, one page at a time; the table view is virtualized
+        # by the browser, so it can show every match
+        st.subheader("Company Details")
+        view_col, size_col, page_col = st.columns([2, 1, 1])
+        with view_col:
+            view = st.radio("View:", ["Cards", "Table"], horizontal=True)
+        if view == "Table":
+            st.dataframe(df.iloc[rows], hide_index=True, use_container_width=True)
+        else:
+            with size_col:
+                page_size = st.selectbox("Per page:", PAGE_SIZES)
+            n_pages = max(1, -(-len(rows) // page_size))
+            with page_col:
+                page_number = st.number_input("Page:", min_value=1, max_value=n_pages, value=1)
+            start = (page_number - 1) * page_size
+            page_rows = rows[start:start + page_size]
+            st.caption(f"Showing {start + 1}-{start + len(page_rows)} of {len(rows)}")
+
             # Display companies in a clean format with supplier score
-            for i, row in filtered_df.iterrows():
+            for row_id, (_, row) in zip(page_rows, df.iloc[page_rows].iterrows()):
                 with st.container():
-                    # Create header with supplier score
-                    score = row['Supplier Score']
-                    
-                    # Create color based on score
-                    if score >= 80:
-                        score_color = "green"
-                    elif score >= 60:
-                        score_color = "orange"
-                    else:
-                        score_color = "gray"
-                    
-                    # Display company name with score badge
-                    st.markdown(f"""
-                    ### {row['Company']} 
-                    <span style="background-color:{score_color}; color:white; padding:4px 8px; border-radius:4px; font-size:16px;">
-                    AI Score: {score}/100
-                    </span>
-                    """, unsafe_allow_html=True)
-                    
-                    # Add score breakdown expander
-                    with st.expander("View Score Breakdown"):
-                        st.markdown("**Score Components:**")
-                        
-                        # Calculate component scores (simplified)
-                        product_terms = ['casting', 'machined', 'forged', 'precision', 'custom']
-                        product_matches = sum(1 for term in product_terms if term in str(row['Product Name']).lower())
-                        
-                        quality_terms = ['premium', 'high quality', 'certified', 'iso', 'standard']
-                        quality_matches = sum(1 for term in quality_terms if term in str(row['Product Name']).lower())
-                        
-                        company_terms = ['ltd', 'limited', 'pvt', 'private', 'industries', 'inc', 'corporation']
-                        company_matches = sum(1 for term in company_terms if term in str(row['Company']).lower())
-                        
-                        # Create score breakdown
-                        st.markdown(f"""
-                        - **Products (15%)**: {'⭐' * min(product_matches+1, 5)}
-                        - **Business Info (20%)**: {'⭐' * min(company_matches+1, 5)}
-                        - **Quality (25%)**: {'⭐' * (int(row['Rating']) if row['Rating'] > 0 else min(quality_matches+1, 3))}
-                        - **Market Presence (25%)**: {'⭐' * min(3 if pd.notna(row['Company URL']) else 1, 5)}
-                        - **Accessibility (15%)**: {'⭐' * min(3 if pd.notna(row['Phone']) else 1, 5)}
-                        """)
-                    
-                    col1, col2 = st.columns([2, 1])
-
-                    with col1:
-                        st.markdown(f"**Product:** {row['Product Name']}")
-                        st.markdown(
-                            f"**Price:** ₹{row['Price (per Kg)']} per Kg")
-
-                        if 'Rating' in row and row['Rating'] > 0:
-                            st.markdown(
-                                f"**Rating:** {'⭐' * int(row['Rating'])}")
-
-                        if 'Address' in row and pd.notna(row['Address']):
-                            st.markdown(f"**Address:** {row['Address']}")
-
-                        if 'City' in row and pd.notna(row['City']):
-                            st.markdown(f"**City:** {row['City']}")
-
-                    with col2:
-                        if 'Phone' in row and pd.notna(row['Phone']):
-                            st.markdown(f"**Phone:** {row['Phone']}")
-
-                        if 'Product URL' in row and pd.notna(
-                                row['Product URL']):
-                            st.markdown(
-                                f"[View Product on IndiaMART]({row['Product URL']})"
-                            )
-
-                        if 'Company URL' in row and pd.notna(
-                                row['Company URL']):
-                            st.markdown(
-                                f"[Visit Company Website]({row['Company URL']})"
-                            )
-
-                    st.divider()
-
-            # Export option
-            if st.button("Export Results to CSV"):
-                csv = filtered_df.to_csv(index=False)
-                st.download_button(
-                    label="Download CSV",
-                    data=csv,
-                    file_name="casting_companies_export.csv",
-                    mime="text/csv")
+                    render_supplier(row_id, row)
+
+        # Export option, written a chunk of rows at a time into a spooled
+        # temporary file rather than built as one string
+        formats = [name for name in EXPORT_FORMATS if name != 'xlsx' or len(rows) <= XLSX_MAX_ROWS]
+        export_format = st.selectbox("Export format:", formats, format_func=str.upper)
+        if st.button("Export Results"):
+            export_file = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES)
+            export = Export(df, rows, export_format).write_to(export_file)
+
+            def read_export():
+                export_file.seek(0)
+                return export_file.read()
+
+            logger.info("Exported %d rows as %s: %.1f MB in %.2f s (%.1f MB/s)", export.rows, export_format,
+                        export.bytes / 1e6, export.seconds, export.mb_per_second)
+            st.download_button(
+                label=f"Download {export_format.upper()}",
+                # Read into bytes (the one in-memory copy) only once clicked
+                data=read_export,
+                file_name=f"casting_companies_export.{export_format}",
+                mime=EXPORT_FORMATS[export_format])
+            st.caption(f"{export.bytes / 1e6:.2f} MB written at {export.mb_per_second:.1f} MB/s")
+
+        render_ms = (time.perf_counter() - rerun_started) * 1000
+        logger.info("Supplier Search rerun rendered in %.1f ms (%d matches)", render_ms, len(rows))
+        st.caption(f"Rendered in {render_ms:.0f} ms")
@@ -1,110 +1,596 @@
-from flask import Flask, request, jsonify
+import hashlib
+import json
+import os
+
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 import pandas as pd
 import numpy as np
 from flask_cors import CORS
 
+from catalogue import Catalogue
+from chat import DEFAULT_ANSWER_K, MAX_ANSWER_K, ChatPipeline
+from company_index import SORTABLE_COLUMNS as COMPANY_SORTABLE_COLUMNS
+from export import FORMATS as EXPORT_FORMATS, Export
+from facets import value_range
+from geo_index import parse_near
+from instrumentation import begin_request, end_request, render_metrics, stage
+from live_dataset import LiveDataset
+from price_stats import DEFAULT_HISTOGRAM_BINS, DIMENSIONS as PRICE_DIMENSIONS
+from query_cache import QueryCache
+from scoring import SCORING_WEIGHTS
+from scoring_profiles import PRICE_TERM, ProfileStore, profile_key
+from supplier_index import scoring_fingerprint
+from serialization import COMPACT_SEPARATORS, JSON, NDJSON, encode_binary, negotiate_media_type
+from supplier_query import (DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, filter_rows, filter_rows_batch, order_rows,
+                            page_records, parse_fields, query_key, sort_rows)
+
+MAX_BATCH_IDS = 1000
+MAX_BATCH_QUERIES = 100
+DEFAULT_FACET_LIMIT = 100
+
 app = Flask(__name__)
-CORS(app)  # Enable CORS to allow frontend requests
-
-# Load Data
-df = pd.read_csv("attached_assets/indiamart_casting_data_cleaned_no_missing_prices.csv")
-
-# Ensure numeric values for 'Rating' and 'Price'
-df['Rating'] = pd.to_numeric(df['Rating'], errors='coerce').fillna(0)  # Convert Rating to float
-df['Price (per Kg)'] = pd.to_numeric(df['Price (per Kg)'], errors='coerce').fillna(0)  # Convert Price to float
-
-# Define scoring weights
-SCORING_WEIGHTS = {
-    'products': 0.15,        
-    'business_info': 0.20,   
-    'quality': 0.25,         
-    'market_presence': 0.25, 
-    'accessibility': 0.15    
-}
-
-# Supplier score calculation
-def calculate_supplier_score(row):
-    score = 0
-
-    # Products Score (15%)
-    product_score = 0
-    if pd.notna(row['Product Name']):
-        words = len(row['Product Name'].split())
-        product_score = min(words / 10, 1)  
-        manufacturing_terms = ['casting', 'machined', 'forged', 'precision', 'custom']
-        if any(term in row['Product Name'].lower() for term in manufacturing_terms):
-            product_score += 0.3
-        product_score = min(product_score, 1.0)
-
-    # Business Score (20%)
-    business_score = 0.5 if pd.notna(row['Company URL']) else 0
-    company_patterns = ['ltd', 'private', 'inc']
-    if any(pattern in str(row['Company']).lower() for pattern in company_patterns):
-        business_score += 0.5
-    business_score = min(business_score, 1.0)
-
-    # Quality Score (25%) - Using Numeric Rating
-    quality_score = row['Rating'] / 5.0 if pd.notna(row['Rating']) else 0
-    quality_terms = ['premium', 'iso', 'certified']
-    if any(term in str(row['Product Name']).lower() for term in quality_terms):
-        quality_score += 0.3
-    quality_score = min(quality_score, 1.0)
-
-    # Market Presence Score (25%)
-    market_score = 0.5 if pd.notna(row['Company URL']) and pd.notna(row['Product URL']) else 0
-    market_score = min(market_score, 1.0)
-
-    # Accessibility Score (15%)
-    accessibility_score = 0.5 if pd.notna(row['Phone']) else 0
-    if pd.notna(row['Address']) or pd.notna(row['City']):
-        accessibility_score += 0.5
-    accessibility_score = min(accessibility_score, 1.0)
-
-    # Calculate final score
-    final_score = (
-        SCORING_WEIGHTS['products'] * product_score +
-        SCORING_WEIGHTS['business_info'] * business_score +
-        SCORING_WEIGHTS['quality'] * quality_score +
-        SCORING_WEIGHTS['market_presence'] * market_score +
-        SCORING_WEIGHTS['accessibility'] * accessibility_score
-    )
-
-    return round(final_score * 100, 1)
-
-# Apply score calculation to dataset
-df['Supplier Score'] = df.apply(calculate_supplier_score, axis=1)
+CORS(app, expose_headers=['X-Total-Count', 'X-Next-Offset', 'X-Shards', 'ETag', 'Server-Timing'])  # Enable CORS to allow frontend requests
+
+# Serve the typed, pre-scored dataset from the memory-mapped index, together
+# with its keyword, sort, TF-IDF, geo, company and facet indexes and price statistics.
+# Batches appended with ingest.py are picked up and swapped in without a restart.
+CSV_FILE_PATH = os.environ.get(
+    "SUPPLIER_CSV_PATH", "attached_assets/indiamart_casting_data_cleaned_no_missing_prices.csv")
+# Spawned catalogue pool workers re-run this file as __mp_main__ when it was
+# started directly; they only search shards (see catalogue_worker.py), so
+# none of the serving state is loaded there
+if __name__ != '__mp_main__':
+    dataset = LiveDataset(CSV_FILE_PATH, preset='api')
+
+    # Filtered row ids per normalized query, dropped whenever the
+    # dataset or the scoring weights change
+    query_cache = QueryCache()
+
+    # Named weightings selectable with ?profile=, reloaded when the file changes
+    profiles = ProfileStore()
+
+    # Every category's crawl as one sharded catalogue (see catalogue.py); shards
+    # are opened by the first query routed to them, except one listed without
+    # a CSV, which is the dataset above
+    catalogue = Catalogue.load(served=dataset)
+
+    # Local retrieval-augmented answers over the dataset (see chat.py)
+    chat_pipeline = ChatPipeline()
+
+@app.before_request
+def start_trace():
+    # ?trace=1 also samples the request's stacks into a flamegraph file
+    g.trace = begin_request(request.endpoint or 'unknown', request.args.get('trace') == '1')
+
+@app.after_request
+def finish_trace(response):
+    trace = g.pop('trace', None)
+    if trace is not None:
+        response.headers['Server-Timing'] = end_request(trace, response.status_code)
+        if trace.profile_path:
+            response.headers['X-Profile'] = os.path.basename(trace.profile_path)
+    return response
+
+def cache_version(data):
+    # The index file name already encodes the data and scoring options
+    return f"{data.version}:{scoring_fingerprint('api', SCORING_WEIGHTS)[:16]}"
+
+def json_indent():
+    # jsonify() pretty-prints with indent=2 in debug mode
+    compact = app.json.compact
+    return 2 if (compact is None and app.debug) or compact is False else None
+
+def json_text_response(text):
+    # Pre-encoded JSON, sent exactly like jsonify() would send it
+    return app.response_class(text + "\n", mimetype=app.json.mimetype)
+
+def json_container(brackets, texts, indent=None, level=0):
+    # Pre-encoded items joined into a JSON array or object (brackets '[]' or
+    # '{}') laid out like jsonify() at this nesting level
+    if indent is None:
+        return brackets[0] + ','.join(texts) + brackets[1]
+    if not texts:
+        return brackets
+    pad = '\n' + ' ' * (indent * (level + 1))
+    return brackets[0] + pad + (',' + pad).join(texts) + '\n' + ' ' * (indent * level) + brackets[1]
+
+def json_object(items, indent=None, level=0):
+    # {key: pre-encoded value} as a JSON object, keys sorted like jsonify()
+    key_separator = ':' if indent is None else ': '
+    return json_container('{}', [json.dumps(key) + key_separator + value for key, value in sorted(items.items())],
+                          indent, level)
+
+NO_FILTERS = query_key()
+
+def query_rows(data, sort_by=None):
+    """(rows, key, overrides, sort_index) of this request's listing filters and profile=.
+
+    The filters are /suppliers' keyword, price range, city, near/radius_km,
+    state and fuzzy. Their matching row ids are cached per normalized query;
+    rows is None when no filter is given. `key` identifies the filters and
+    the profile's weights. A profile's Supplier Score is served through
+    `overrides`, and ranks by `sort_index` when sorting by sort_by.
+
+    Raises ValueError for a bad near= or an unknown profile.
+    """
+    args = request.args
+    keyword = args.get('keyword')
+    min_price = args.get('min_price', type=float)
+    max_price = args.get('max_price', type=float)
+    city = args.get('city')
+    # near=lat,lon or near=<place> with radius_km=, and state=<name>
+    near = args.get('near')
+    near = parse_near(near, args.get('radius_km', type=float)) if near else None
+    state = args.get('state')
+    # fuzzy=1 matches the keyword against Keyword and Product Name, allowing typos
+    fuzzy = args.get('fuzzy') == '1'
+    profile = args.get('profile')
+    weights = profiles.get(profile) if profile is not None else None
+    if profile is not None and weights is None:
+        raise ValueError(f"Unknown scoring profile: {profile}")
+
+    filters = query_key(keyword, min_price, max_price, city, near, state, fuzzy)
+    rows = None
+    if filters != NO_FILTERS:
+        version = cache_version(data)
+        with stage('filter'):
+            rows = query_cache.get(filters, version)
+            if rows is None:
+                rows = filter_rows(data.df, data.search_index, keyword, min_price, max_price, city,
+                                   data.geo_index, near, state, fuzzy)
+                query_cache.put(filters, rows, version)
+
+    # A profile re-weights the stored component scores: its Supplier Score is
+    # served in place of the index's, and ranks by it
+    overrides, sort_index = {}, data.sort_index
+    if weights is not None:
+        with stage('score'):
+            overrides = {'Supplier Score': data.profile_scores.scores(weights)}
+            if sort_by == 'Supplier Score':
+                sort_index = data.profile_scores.sort_index(weights)
+    return rows, (filters, profile_key(weights) if weights is not None else None), overrides, sort_index
 
 @app.route('/suppliers', methods=['GET'])
 def get_suppliers():
-    keyword = request.args.get('keyword')
-    min_price = request.args.get('min_price', type=float)
-    max_price = request.args.get('max_price', type=float)
-    city = request.args.get('city')
     sort_by = request.args.get('sort_by', 'Supplier Score')
     order = request.args.get('order', 'desc')
+    offset = request.args.get('offset', 0, type=int)
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    # JSON (default), NDJSON, or an Arrow IPC stream / Parquet file for
+    # internal consumers, by ?format= or Accept
+    media_type = negotiate_media_type(request.args.get('format'), request.headers.get('Accept'))
+    data = dataset.current
+    df = data.df
+
+    if offset < 0 or limit < 1:
+        return jsonify({"error": "'offset' must be >= 0 and 'limit' >= 1"}), 400
+    ascending = order == 'asc'
+    if sort_by not in df.columns:
+        sort_by, ascending = None, False
+    try:
+        fields = parse_fields(request.args.get('fields'), df.columns)
+        rows, key, overrides, sort_index = query_rows(data, sort_by)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if rows is None:
+        rows = np.arange(len(df))
+    total = len(rows)
+    # Only JSON pages are capped; the other formats are meant for bulk reads
+    limit = min(limit, MAX_PAGE_SIZE) if media_type == JSON else limit
+
+    # The response is fully determined by the data version and the query, so
+    # a matching If-None-Match is answered before any rows are sorted or encoded
+    request_key = (cache_version(data), key, sort_by, ascending, offset, limit, tuple(fields), media_type)
+    etag = hashlib.sha1(repr(request_key).encode()).hexdigest()
+    if etag in request.if_none_match:
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    if media_type == NDJSON:
+        # NDJSON streams every match (from offset on), one chunk of rows at a
+        # time, so encoding happens after the response leaves and is not timed
+        with stage('sort'):
+            rows = order_rows(df, sort_index, rows, sort_by, ascending)[offset:]
+        lines = data.encoder.lines(rows, fields, overrides=overrides)
+        response = Response(stream_with_context(lines), mimetype=NDJSON)
+    else:
+        # Only the top offset + limit rows are ever put in order
+        with stage('sort'):
+            rows = order_rows(df, sort_index, rows, sort_by, ascending, limit=offset + limit)[offset:]
+        with stage('encode'):
+            if media_type == JSON:
+                # Encoded straight from the columns, no per-record dicts
+                response = json_text_response(data.encoder.dumps(rows, fields, json_indent(), overrides))
+            else:
+                response = Response(encode_binary(df, rows, fields, media_type, overrides=overrides),
+                                    mimetype=media_type)
+        if offset + limit < total:
+            response.headers['X-Next-Offset'] = str(offset + limit)
+    response.headers['X-Total-Count'] = str(total)
+    response.set_etag(etag)
+    return response
+
+def batch_query(query):
+    """(query_key, sort_by, ascending, offset, limit) of one /suppliers/batch query.
+
+    Raises ValueError for malformed queries.
+    """
+    if not isinstance(query, dict):
+        raise ValueError("Each query must be an object of /suppliers parameters")
+
+    def number(name, default=None):
+        value = query.get(name, default)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            raise ValueError(f"'{name}' must be a number")
+        return float(value) if value is not None else None
+
+    def text(name, default=None):
+        value = query.get(name, default)
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f"'{name}' must be a string")
+        return value
+
+    offset = number('offset', 0)
+    limit = number('limit', DEFAULT_PAGE_SIZE)
+    # Fractional offsets and limits are rejected rather than truncated
+    if not (offset >= 0 and limit >= 1 and offset.is_integer() and limit.is_integer()):
+        raise ValueError("'offset' must be >= 0 and 'limit' >= 1")
+    offset, limit = int(offset), min(int(limit), MAX_PAGE_SIZE)
+    near = text('near')
+    near = parse_near(near, number('radius_km')) if near else None
+    key = query_key(text('keyword'), number('min_price'), number('max_price'), text('city'),
+                    near, text('state'), query.get('fuzzy') is True)
+    return key, text('sort_by', 'Supplier Score'), text('order', 'desc') == 'asc', offset, limit
+
+@app.route('/suppliers/batch', methods=['POST'])
+def get_suppliers_batch():
+    # Many suppliers in one round trip. {"ids": [...]} looks listings up by
+    # their stable Listing ID (null for unknown ids); {"queries": [...]} runs
+    # /suppliers queries with their filters evaluated together. "fields" and
+    # "profile" apply to every result.
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return jsonify({"error": "Expected a JSON object with 'ids' and/or 'queries'"}), 400
+    ids = body.get('ids', [])
+    queries = body.get('queries', [])
+    if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        return jsonify({"error": "'ids' must be a list of integers"}), 400
+    if not isinstance(queries, list):
+        return jsonify({"error": "'queries' must be a list"}), 400
+    if len(ids) > MAX_BATCH_IDS or len(queries) > MAX_BATCH_QUERIES:
+        return jsonify({"error": f"At most {MAX_BATCH_IDS} ids and {MAX_BATCH_QUERIES} queries per batch"}), 400
+    fields = body.get('fields')
+    if isinstance(fields, list):
+        fields = ','.join(map(str, fields))
+    profile = body.get('profile')
+    data = dataset.current
+    df = data.df
+
+    try:
+        fields = parse_fields(fields, df.columns)
+        queries = [batch_query(query) for query in queries]
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    weights = profiles.get(profile) if profile is not None else None
+    if profile is not None and weights is None:
+        return jsonify({"error": f"Unknown scoring profile: {profile}"}), 400
+
+    with stage('lookup'):
+        id_rows = data.listing_ids.rows_of(ids)
+
+    # Cached results first; the rest are filtered together, each distinct
+    # filter computed once
+    with stage('filter'):
+        version = cache_version(data)
+        results = {key: query_cache.get(key, version) for key, *_ in queries}
+        missing = [key for key, rows in results.items() if rows is None]
+        for key, rows in zip(missing, filter_rows_batch(df, data.search_index, missing, data.geo_index)):
+            results[key] = rows
+            query_cache.put(key, rows, version)
+
+    overrides, sort_indexes = {}, {}
+    if weights is not None:
+        with stage('score'):
+            overrides = {'Supplier Score': data.profile_scores.scores(weights)}
+            sort_indexes['Supplier Score'] = data.profile_scores.sort_index(weights)
+    with stage('sort'):
+        pages = []
+        for key, sort_by, ascending, offset, limit in queries:
+            if sort_by not in df.columns:
+                sort_by, ascending = None, False
+            sort_index = sort_indexes.get(sort_by, data.sort_index)
+            pages.append(order_rows(df, sort_index, results[key], sort_by, ascending, limit=offset + limit)[offset:])
+
+    # The rows of every result are encoded in one pass, then split per result;
+    # the response is put together from the encoded records like jsonify() would
+    with stage('encode'):
+        indent = json_indent()
+        separators = COMPACT_SEPARATORS if indent is None else (',', ': ')
+        found = id_rows >= 0
+        suppliers = np.full(len(ids), 'null', dtype=object)
+        suppliers[found] = data.encoder.objects(id_rows[found], fields, separators, indent, level=2,
+                                                overrides=overrides)
+        records = data.encoder.objects(np.concatenate([np.zeros(0, dtype=np.int64)] + pages), fields,
+                                       separators, indent, level=4, overrides=overrides)
+        query_results, start = [], 0
+        for (key, *_), page in zip(queries, pages):
+            page_records = json_container('[]', records[start:start + len(page)], indent, level=3)
+            query_results.append(json_object({'total': str(len(results[key])), 'suppliers': page_records},
+                                             indent, level=2))
+            start += len(page)
+        response = json_text_response(json_object({
+            'suppliers': json_container('[]', suppliers.tolist(), indent, level=1),
+            'results': json_container('[]', query_results, indent, level=1),
+        }, indent))
+    return response
+
+@app.route('/suppliers/export', methods=['GET'])
+def export_suppliers():
+    # Every match of a /suppliers query as a CSV, Parquet or XLSX download,
+    # written and sent a chunk of rows at a time (see export.py)
+    sort_by = request.args.get('sort_by', 'Supplier Score')
+    order = request.args.get('order', 'desc')
+    format_name = request.args.get('format', 'csv')
+    data = dataset.current
+    df = data.df
+
+    if format_name not in EXPORT_FORMATS:
+        return jsonify({"error": f"'format' must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    ascending = order == 'asc'
+    if sort_by not in df.columns:
+        sort_by, ascending = None, False
+    try:
+        fields = parse_fields(request.args.get('fields'), df.columns)
+        rows, _, overrides, sort_index = query_rows(data, sort_by)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if rows is None:
+        rows = np.arange(len(df))
+    with stage('sort'):
+        rows = order_rows(df, sort_index, rows, sort_by, ascending)
+
+    # Writing happens as the response is sent, so it is not timed as a stage;
+    # its throughput is recorded in /metrics once the download finishes
+    try:
+        export = Export(df, rows, format_name, fields, overrides=overrides)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    response = Response(stream_with_context(export), mimetype=export.media_type)
+    response.headers['Content-Disposition'] = f'attachment; filename="suppliers.{format_name}"'
+    response.headers['X-Total-Count'] = str(len(rows))
+    return response
+
+@app.route('/companies', methods=['GET'])
+def get_companies():
+    # Listings resolved into suppliers (see company_index.py): the listing
+    # filters pick the suppliers, which are then sorted and paged as companies
+    sort_by = request.args.get('sort_by', 'Best Score')
+    order = request.args.get('order', 'desc')
+    offset = request.args.get('offset', 0, type=int)
+    limit = min(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), MAX_PAGE_SIZE)
+    data = dataset.current
+    companies = data.company_index
+
+    if offset < 0 or limit < 1:
+        return jsonify({"error": "'offset' must be >= 0 and 'limit' >= 1"}), 400
+    try:
+        rows, *_ = query_rows(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if rows is None:
+        supplier_ids = np.arange(len(companies.companies))
+    else:
+        supplier_ids = companies.suppliers_of(rows)
+
+    if sort_by in COMPANY_SORTABLE_COLUMNS:
+        with stage('sort'):
+            supplier_ids = sort_rows(companies.companies, supplier_ids, sort_by, order == 'asc')
+    total = len(supplier_ids)
+    with stage('encode'):
+        response = jsonify(companies.records(supplier_ids[offset:offset + limit]))
+    response.headers['X-Total-Count'] = str(total)
+    if offset + limit < total:
+        response.headers['X-Next-Offset'] = str(offset + limit)
+    return response
+
+@app.route('/stats', methods=['GET'])
+def get_price_stats():
+    # Precomputed price statistics per Keyword (by=keyword) or City (by=city);
+    # value= picks one group, and price= places a price within it
+    by = request.args.get('by', 'keyword')
+    value = request.args.get('value')
+    price = request.args.get('price', type=float)
+    bins = request.args.get('bins', DEFAULT_HISTOGRAM_BINS, type=int)
+    if by not in PRICE_DIMENSIONS:
+        return jsonify({"error": f"'by' must be one of: {', '.join(PRICE_DIMENSIONS)}"}), 400
+    if bins < 1:
+        return jsonify({"error": "'bins' must be a positive integer"}), 400
+    stats = dataset.current.price_stats[by]
+
+    if value is None:
+        return jsonify([stats.summary(group, bins) for group in range(len(stats.names))])
+    group = stats.groups_of([value])[0]
+    if group < 0:
+        return jsonify({"error": f"No priced listings for {by} '{value}'"}), 404
+    summary = stats.summary(group, bins)
+    if price is not None:
+        summary['z_score'] = round(float(stats.z_scores([value], [price])[0]), 4)
+        summary['competitiveness'] = round(float(stats.competitiveness([value], [price])[0]), 4)
+    return jsonify(summary)
+
+@app.route('/facets', methods=['GET'])
+def get_facets():
+    # Per-City, per-Keyword, rating-bucket and price-bucket counts of the
+    # listings a /suppliers query matches, counted in one pass over the
+    # precomputed facet codes (see facets.py); limit= caps the City and
+    # Keyword values returned
+    limit = request.args.get('limit', DEFAULT_FACET_LIMIT, type=int)
+    data = dataset.current
+    df = data.df
+
+    if limit < 1:
+        return jsonify({"error": "'limit' must be >= 1"}), 400
+    try:
+        rows, *_ = query_rows(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    with stage('count'):
+        facets = data.facet_index.counts(rows, limit)
+        # Exact bounds for a price slider, next to the price buckets
+        price_range = value_range(df['Price (per Kg)'], rows)
+        if price_range is not None:
+            facets['Price (per Kg)']['min'], facets['Price (per Kg)']['max'] = price_range
+    return jsonify({'total': len(df) if rows is None else len(rows), 'facets': facets})
+
+@app.route('/profiles', methods=['GET'])
+def get_profiles():
+    # Weights of every scoring profile usable as /suppliers?profile=
+    return jsonify(profiles.profiles())
+
+@app.route('/catalogue', methods=['GET'])
+def get_catalogue():
+    return jsonify(catalogue.describe())
+
+@app.route('/catalogue/suppliers', methods=['GET'])
+def get_catalogue_suppliers():
+    # Listings across every category's shard. category= (comma-separated)
+    # names the shards to search; otherwise the keyword routes the query.
+    query = {
+        'keyword': request.args.get('keyword'),
+        'min_price': request.args.get('min_price', type=float),
+        'max_price': request.args.get('max_price', type=float),
+        'city': request.args.get('city'),
+        'fuzzy': request.args.get('fuzzy') == '1',
+    }
+    category = request.args.get('category')
+    if category:
+        query['categories'] = [name for name in category.split(',') if name.strip()]
+    sort_by = request.args.get('sort_by', 'Supplier Score')
+    order = request.args.get('order', 'desc')
+    offset = request.args.get('offset', 0, type=int)
+    limit = min(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), MAX_PAGE_SIZE)
+    if offset < 0 or limit < 1:
+        return jsonify({"error": "'offset' must be >= 0 and 'limit' >= 1"}), 400
 
-    filtered_df = df.copy()
+    try:
+        total, records, shards = catalogue.search(query, sort_by, order == 'asc', offset, limit,
+                                                  request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    response = jsonify(records)
+    response.headers['X-Total-Count'] = str(total)
+    response.headers['X-Shards'] = ','.join(shards)
+    if offset + limit < total:
+        response.headers['X-Next-Offset'] = str(offset + limit)
+    return response
 
-    if keyword:
-        filtered_df = filtered_df[filtered_df['Keyword'].str.contains(keyword, case=False, na=False)]
-    
-    if min_price is not None and max_price is not None:
-        filtered_df = filtered_df[(filtered_df['Price (per Kg)'] >= min_price) & (filtered_df['Price (per Kg)'] <= max_price)]
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    # Request and per-stage histograms in the Prometheus text format
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
 
-    if city:
-        filtered_df = filtered_df[filtered_df['City'] == city]
+@app.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify(query_cache.stats())
 
-    if sort_by in filtered_df.columns:
-        filtered_df = filtered_df.sort_values(by=sort_by, ascending=(order == 'asc'))
+def similarity_results(df, rows, scores):
+    results = page_records(df, rows)
+    for record, score in zip(results, scores):
+        record['Similarity'] = round(float(score), 4)
+    return results
 
-    return jsonify(filtered_df.to_dict(orient='records'))
+@app.route('/search', methods=['GET', 'POST'])
+def search_suppliers():
+    # GET /search?q=...&k=10 ranks listings for one query; POST a JSON body
+    # {"queries": [...], "k": 10} to score many queries in one pass
+    data = dataset.current
+    if request.method == 'POST':
+        body = request.get_json(silent=True) or {}
+        queries = body.get('queries')
+        k = body.get('k', 10)
+        if not isinstance(queries, list) or not all(isinstance(q, str) for q in queries):
+            return jsonify({"error": "'queries' must be a list of strings"}), 400
+        if not isinstance(k, int) or k < 1:
+            return jsonify({"error": "'k' must be a positive integer"}), 400
+        batches = data.tfidf_index.query_batch(queries, k) if queries else []
+        return jsonify([similarity_results(data.df, rows, scores) for rows, scores in batches])
+
+    query = request.args.get('q', '')
+    k = request.args.get('k', 10, type=int)
+    if not query:
+        return jsonify({"error": "Missing query parameter 'q'"}), 400
+    if k < 1:
+        return jsonify({"error": "'k' must be a positive integer"}), 400
+    rows, scores = data.tfidf_index.query(query, k)
+    return jsonify(similarity_results(data.df, rows, scores))
+
+@app.route('/chat', methods=['GET', 'POST'])
+def chat():
+    # GET /chat?q=...&k=5 answers one question; POST {"question": ..., "k": 5},
+    # or {"questions": [...]} to answer many with one retrieval pass
+    data = dataset.current
+    if request.method == 'POST':
+        body = request.get_json(silent=True) or {}
+        question = body.get('question')
+        questions = body.get('questions')
+        k = body.get('k', DEFAULT_ANSWER_K)
+    else:
+        question = request.args.get('q')
+        questions = None
+        k = request.args.get('k', DEFAULT_ANSWER_K, type=int)
+    if not isinstance(k, int) or not 1 <= k <= MAX_ANSWER_K:
+        return jsonify({"error": f"'k' must be an integer from 1 to {MAX_ANSWER_K}"}), 400
+
+    if questions is not None:
+        if not isinstance(questions, list) or not all(isinstance(q, str) and q.strip() for q in questions):
+            return jsonify({"error": "'questions' must be a list of non-empty strings"}), 400
+        return jsonify(chat_pipeline.answer_batch(data, questions, k) if questions else [])
+    if not isinstance(question, str) or not question.strip():
+        return jsonify({"error": "Missing question"}), 400
+    return jsonify(chat_pipeline.answer(data, question, k))
+
+@app.route('/chat/stats', methods=['GET'])
+def get_chat_stats():
+    return jsonify(chat_pipeline.stats())
 
 @app.route('/supplier/<int:supplier_id>', methods=['GET'])
 def get_supplier(supplier_id):
-    if supplier_id < 0 or supplier_id >= len(df):
+    data = dataset.current
+    if supplier_id < 0 or supplier_id >= len(data.df):
         return jsonify({"error": "Supplier ID out of range"}), 404
-    supplier = df.iloc[supplier_id].to_dict()
-    return jsonify(supplier)
+    # Encoded rows are cached per dataset, so hot suppliers skip pandas entirely
+    return json_text_response(data.encoder.row(supplier_id, json_indent()))
+
+@app.route('/supplier/<int:supplier_id>/explain', methods=['GET'])
+def explain_supplier(supplier_id):
+    # The stored component scores behind a listing's Supplier Score, with the
+    # terms and signals that raised each, as recorded when the index was
+    # built; profile= weights them like /suppliers does
+    profile = request.args.get('profile')
+    data = dataset.current
+    if supplier_id < 0 or supplier_id >= len(data.df):
+        return jsonify({"error": "Supplier ID out of range"}), 404
+    weights = profiles.get(profile) if profile is not None else None
+    if profile is not None and weights is None:
+        return jsonify({"error": f"Unknown scoring profile: {profile}"}), 400
+
+    extra = {}
+    if weights is None:
+        weights, scores = SCORING_WEIGHTS, data.df['Supplier Score']
+    else:
+        scores = data.profile_scores.scores(weights)
+        if weights.get(PRICE_TERM):
+            extra[PRICE_TERM] = float(data.profile_scores.price_competitiveness()[supplier_id])
+    return jsonify({
+        'id': supplier_id,
+        'Listing ID': int(data.listing_ids.ids[supplier_id]),
+        'Company': data.df['Company'].iat[supplier_id],
+        'profile': profile,
+        # float32 scores through their shortest decimal form, as /suppliers serves them
+        'Supplier Score': float(str(scores.iat[supplier_id])),
+        'components': data.explanations.explain(supplier_id, weights, extra),
+    })
 
 if __name__ == '__main__':
     app.run(debug=True)
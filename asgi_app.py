@@ -0,0 +1,211 @@
+"""ASGI variant of the supplier API for multi-process serving.
+
+    python asgi_app.py --workers 4 --port 8000
+    uvicorn asgi_app:app --workers 4 --port 8000   # after `python supplier_index.py build`
+
+Serves /suppliers and /supplier/<id> with the same parameters and responses
+as app2.py. Filtering, sorting and serialization run on a bounded thread pool
+per worker, so the event loop only parses requests and writes responses.
+The dataset and its keyword/sort indexes are memory-mapped files, so all
+uvicorn workers share one copy in the page cache; `python asgi_app.py`
+builds any missing files once before the workers start.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+
+from geo_index import parse_near
+from live_dataset import LiveDataset
+from query_cache import QueryCache
+from scoring import SCORING_WEIGHTS
+from scoring_profiles import ProfileStore, profile_key
+from serialization import (COMPACT_SEPARATORS, JSON, NDJSON, encode_binary,
+                           negotiate_media_type)
+from supplier_index import scoring_fingerprint
+from supplier_query import (DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, STREAM_CHUNK_SIZE, filter_rows,
+                            order_rows, parse_fields, query_key)
+
+CSV_FILE_PATH = os.environ.get(
+    "SUPPLIER_CSV_PATH", "attached_assets/indiamart_casting_data_cleaned_no_missing_prices.csv")
+POOL_SIZE = int(os.environ.get('SUPPLIER_POOL_SIZE', 4))
+
+dataset = LiveDataset(CSV_FILE_PATH, preset='api')
+query_cache = QueryCache()
+profiles = ProfileStore()
+executor = ThreadPoolExecutor(POOL_SIZE, thread_name_prefix='suppliers')
+
+
+def cache_version(data):
+    # The index file name already encodes the data and scoring options
+    return f"{data.version}:{scoring_fingerprint('api', SCORING_WEIGHTS)[:16]}"
+
+
+async def run_blocking(func, *args):
+    """Run CPU-bound work on the pool instead of the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+
+def json_response(content, status_code=200, headers=None):
+    # Same text as Flask's jsonify()
+    body = json.dumps(content, sort_keys=True, separators=COMPACT_SEPARATORS) + "\n"
+    return Response(body, status_code, headers, media_type=JSON)
+
+
+def query_arg(params, name, type=str, default=None):
+    """Like Flask's request.args.get(name, type=...): bad values give the default."""
+    if name not in params:
+        return default
+    try:
+        return type(params[name])
+    except ValueError:
+        return default
+
+
+def select_rows(data, key, keyword, min_price, max_price, city, near, state, fuzzy, version):
+    rows = query_cache.get(key, version)
+    if rows is None:
+        rows = filter_rows(data.df, data.search_index, keyword, min_price, max_price, city,
+                           data.geo_index, near, state, fuzzy)
+        query_cache.put(key, rows, version)
+    return rows
+
+
+def profile_view(data, weights, sort_by):
+    """(column overrides, sort index) serving a profile's Supplier Score, as in app2.py."""
+    if weights is None:
+        return {}, data.sort_index
+    overrides = {'Supplier Score': data.profile_scores.scores(weights)}
+    if sort_by == 'Supplier Score':
+        return overrides, data.profile_scores.sort_index(weights)
+    return overrides, data.sort_index
+
+
+def order_page(data, rows, sort_by, ascending, weights):
+    overrides, sort_index = profile_view(data, weights, sort_by)
+    return order_rows(data.df, sort_index, rows, sort_by, ascending)
+
+
+def render_page(data, rows, sort_by, ascending, offset, limit, fields, media_type, weights):
+    overrides, sort_index = profile_view(data, weights, sort_by)
+    rows = order_rows(data.df, sort_index, rows, sort_by, ascending, limit=offset + limit)[offset:]
+    if media_type == JSON:
+        return data.encoder.dumps(rows, fields, overrides=overrides) + "\n"
+    return encode_binary(data.df, rows, fields, media_type, overrides=overrides)
+
+
+def render_lines(data, rows, fields, overrides):
+    return ''.join(data.encoder.lines(rows, fields, overrides=overrides))
+
+
+async def stream_lines(data, rows, fields, overrides):
+    # One pool task per chunk of rows, so a long stream never holds a thread
+    # (or more than one chunk of records) while the client is reading
+    for start in range(0, len(rows), STREAM_CHUNK_SIZE):
+        yield await run_blocking(render_lines, data, rows[start:start + STREAM_CHUNK_SIZE], fields, overrides)
+
+
+async def get_suppliers(request):
+    params = request.query_params
+    keyword = params.get('keyword')
+    min_price = query_arg(params, 'min_price', float)
+    max_price = query_arg(params, 'max_price', float)
+    city = params.get('city')
+    near = params.get('near')
+    radius_km = query_arg(params, 'radius_km', float)
+    state = params.get('state')
+    fuzzy = params.get('fuzzy') == '1'
+    sort_by = params.get('sort_by', 'Supplier Score')
+    order = params.get('order', 'desc')
+    offset = query_arg(params, 'offset', int, 0)
+    limit = query_arg(params, 'limit', int, DEFAULT_PAGE_SIZE)
+    profile = params.get('profile')
+    media_type = negotiate_media_type(params.get('format'), request.headers.get('accept'))
+    data = dataset.current
+    df = data.df
+
+    try:
+        fields = parse_fields(params.get('fields'), df.columns)
+        near = parse_near(near, radius_km) if near else None
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+    if offset < 0 or limit < 1:
+        return json_response({"error": "'offset' must be >= 0 and 'limit' >= 1"}, 400)
+    weights = profiles.get(profile) if profile is not None else None
+    if profile is not None and weights is None:
+        return json_response({"error": f"Unknown scoring profile: {profile}"}, 400)
+
+    ascending = order == 'asc'
+    if sort_by not in df.columns:
+        sort_by, ascending = None, False
+    limit = min(limit, MAX_PAGE_SIZE) if media_type == JSON else limit
+    key = query_key(keyword, min_price, max_price, city, near, state, fuzzy)
+    version = cache_version(data)
+
+    request_key = (version, key, sort_by, ascending, offset, limit, tuple(fields), media_type,
+                   profile_key(weights) if weights is not None else None)
+    etag = f'"{hashlib.sha1(repr(request_key).encode()).hexdigest()}"'
+    if etag in request.headers.get('if-none-match', ''):
+        return Response(status_code=304, headers={'ETag': etag})
+
+    rows = await run_blocking(select_rows, data, key, keyword, min_price, max_price, city,
+                              near, state, fuzzy, version)
+    headers = {'X-Total-Count': str(len(rows)), 'ETag': etag}
+
+    if media_type == NDJSON:
+        rows = await run_blocking(order_page, data, rows, sort_by, ascending, weights)
+        overrides, _ = profile_view(data, weights, sort_by)
+        return StreamingResponse(stream_lines(data, rows[offset:], fields, overrides),
+                                 headers=headers, media_type=NDJSON)
+
+    if offset + limit < len(rows):
+        headers['X-Next-Offset'] = str(offset + limit)
+    body = await run_blocking(render_page, data, rows, sort_by, ascending, offset, limit, fields,
+                              media_type, weights)
+    return Response(body, headers=headers, media_type=media_type)
+
+
+async def get_supplier(request):
+    supplier_id = request.path_params['supplier_id']
+    data = dataset.current
+    if supplier_id >= len(data.df):
+        return json_response({"error": "Supplier ID out of range"}, 404)
+    return Response(data.encoder.row(supplier_id) + "\n", media_type=JSON)
+
+
+app = Starlette(
+    routes=[
+        Route('/suppliers', get_suppliers),
+        Route('/supplier/{supplier_id:int}', get_supplier),
+    ],
+    middleware=[
+        Middleware(CORSMiddleware, allow_origins=['*'],
+                   expose_headers=['X-Total-Count', 'X-Next-Offset', 'ETag']),
+    ],
+)
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the supplier API with uvicorn.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    # Importing this module above already built any missing index files, so
+    # the workers only map them
+    uvicorn.run('asgi_app:app', host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == '__main__':
+    main()
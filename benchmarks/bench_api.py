@@ -0,0 +1,335 @@
+"""Benchmark and load test for the supplier API (app2.py).
+
+Usage (from the repository root):
+
+    python benchmarks/bench_api.py                          # 100k rows
+    python benchmarks/bench_api.py --rows 10000 1000000 --output results.json
+    python benchmarks/bench_api.py --target http --concurrency 16
+    python benchmarks/bench_api.py --baseline results.json  # compare runs
+
+For every dataset size a synthetic IndiaMART-shaped CSV is written to a
+scratch directory (rows resampled from the casting CSV, so columns keep
+their real value distributions, with unique product URLs and jittered
+prices). The run then measures:
+
+  * scoring throughput of score_suppliers,
+  * index build time (scored Arrow index, keyword/sort indexes, TF-IDF),
+  * p50/p95/p99 latency and throughput of /suppliers and /supplier/<id>
+    under concurrent load, through Flask's test client or a local threaded
+    WSGI server (--target http),
+  * memory: process RSS before/after the load and the peak Python
+    allocation of a single request per endpoint (tracemalloc).
+
+All numbers are written as JSON (--output) so runs can be compared; with
+--baseline the new run is printed side by side with an earlier one.
+"""
+import argparse
+import datetime
+import importlib.util
+import json
+import logging
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Synthetic CSVs and their indexes live in a scratch directory, so every run
+# builds from scratch and the served index directory is left alone. Both
+# settings are read when the repo modules are first imported.
+SCRATCH_DIR = tempfile.mkdtemp(prefix='supplier-bench-')
+os.environ['SUPPLIER_INDEX_DIR'] = os.path.join(SCRATCH_DIR, 'index')
+os.environ.setdefault('SUPPLIER_INDEX_POLL_INTERVAL', '3600')
+
+from bench_memory import synthesize  # noqa: E402
+from scoring import score_suppliers  # noqa: E402
+from supplier_index import load_csv  # noqa: E402
+
+CSV_FILE_PATH = "indiamart_casting_data_cleaned_no_missing_prices.csv"
+DEFAULT_SIZES = [100_000]
+PERCENTILES = [50, 95, 99]
+
+
+def synthesize_csv(source, n_rows, path, seed=0):
+    """Write an n_rows crawl-shaped CSV resampled from source; returns the frame."""
+    rng = np.random.default_rng(seed)
+    df = synthesize(source, n_rows, seed)
+    # Jitter prices around the sampled listing so price filters see a spread
+    price = df['Price (per Kg)'] * rng.lognormal(0, 0.1, n_rows)
+    df['Price (per Kg)'] = price.round(0).where(df['Price (per Kg)'].notna())
+    df.drop(columns=['Supplier Score'], errors='ignore').to_csv(path, index=False)
+    return df
+
+
+def rss_mb():
+    """Current resident set size in MiB (peak RSS where /proc is missing)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+def load_app(csv_path):
+    """Import a fresh app2 module serving csv_path; returns (module, load seconds)."""
+    os.environ['SUPPLIER_CSV_PATH'] = csv_path
+    spec = importlib.util.spec_from_file_location('bench_app2', os.path.join(ROOT, 'app2.py'))
+    module = importlib.util.module_from_spec(spec)
+    start = time.perf_counter()
+    spec.loader.exec_module(module)
+    return module, time.perf_counter() - start
+
+
+def request_plan(df, n_requests, seed=0):
+    """A reproducible mix of (endpoint, url) covering the /suppliers filters."""
+    rng = np.random.default_rng(seed)
+    keywords = df['Keyword'].dropna().unique()
+    cities = df['City'].dropna().unique()
+    prices = df['Price (per Kg)'].dropna().to_numpy()
+    sorts = ['Supplier Score', 'Price (per Kg)', 'Rating', 'Company']
+    plan = []
+    for _ in range(n_requests):
+        if rng.random() < 0.25:
+            plan.append(('/supplier/<id>', f"/supplier/{rng.integers(0, len(df))}"))
+            continue
+        params = {'limit': int(rng.choice([10, 50, 100]))}
+        if rng.random() < 0.7:
+            params['keyword'] = str(rng.choice(keywords))
+        if rng.random() < 0.3:
+            low, high = np.sort(rng.choice(prices, 2))
+            params['min_price'], params['max_price'] = float(low), float(high)
+        if rng.random() < 0.2:
+            params['city'] = str(rng.choice(cities))
+        if rng.random() < 0.5:
+            params['sort_by'] = str(rng.choice(sorts))
+            params['order'] = str(rng.choice(['asc', 'desc']))
+        if rng.random() < 0.2:
+            params['offset'] = int(rng.integers(0, 500))
+        plan.append(('/suppliers', '/suppliers?' + urllib.parse.urlencode(params)))
+    return plan
+
+
+class TestClientTarget:
+    name = 'test-client'
+
+    def __init__(self, app):
+        self.app = app
+        self.local = threading.local()
+
+    def get(self, url):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        response = client.get(url)
+        response.get_data()
+        return response.status_code
+
+    def close(self):
+        pass
+
+
+class HttpTarget:
+    """The app behind a local threaded werkzeug server on a free port."""
+    name = 'http'
+
+    def __init__(self, app):
+        from werkzeug.serving import make_server
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)  # no per-request access log
+        self.server = make_server('127.0.0.1', 0, app, threaded=True)
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def get(self, url):
+        try:
+            with urllib.request.urlopen(self.base + url) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    def close(self):
+        self.server.shutdown()
+
+
+def latency_summary(latencies):
+    latencies = np.asarray(latencies) * 1000
+    summary = {f"p{p}_ms": float(np.percentile(latencies, p)) for p in PERCENTILES}
+    summary.update(requests=len(latencies), mean_ms=float(latencies.mean()),
+                   max_ms=float(latencies.max()))
+    return summary
+
+
+def run_load(target, plan, concurrency, warmup):
+    """Fire plan at target from `concurrency` threads; per-endpoint latency stats."""
+    for _, url in plan[:warmup]:
+        target.get(url)
+
+    def timed(item):
+        endpoint, url = item
+        start = time.perf_counter()
+        status = target.get(url)
+        return endpoint, time.perf_counter() - start, status
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(timed, plan))
+    elapsed = time.perf_counter() - start
+
+    report = {}
+    for endpoint in sorted({endpoint for endpoint, _, _ in results}):
+        latencies = [latency for name, latency, _ in results if name == endpoint]
+        errors = sum(status >= 400 for name, _, status in results if name == endpoint)
+        report[endpoint] = dict(latency_summary(latencies), errors=errors)
+    return {
+        'concurrency': concurrency,
+        'seconds': elapsed,
+        'requests_per_sec': len(plan) / elapsed,
+        'rss_before_mb': rss_before,
+        'rss_after_mb': rss_mb(),
+        'endpoints': report,
+    }
+
+
+def request_memory(app, plan, samples):
+    """Peak Python allocation of single requests, per endpoint (in KiB)."""
+    client = app.test_client()
+    peaks = {}
+    for endpoint, url in plan:
+        if len(peaks.get(endpoint, [])) >= samples:
+            continue
+        tracemalloc.start()
+        client.get(url).get_data()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peaks.setdefault(endpoint, []).append(peak / 1024)
+    return {endpoint: {'median_peak_kib': float(np.median(values)),
+                       'max_peak_kib': float(np.max(values))}
+            for endpoint, values in peaks.items()}
+
+
+def bench_size(source, n_rows, args):
+    csv_path = os.path.join(SCRATCH_DIR, f"synthetic-{n_rows}.csv")
+    frame = synthesize_csv(source, n_rows, csv_path, args.seed)
+
+    start = time.perf_counter()
+    score_suppliers(frame)
+    scoring_seconds = time.perf_counter() - start
+
+    # The first import builds every index from the CSV; the second one only
+    # maps the files that were just written
+    module, build_seconds = load_app(csv_path)
+    module, load_seconds = load_app(csv_path)
+    app = module.app
+
+    plan = request_plan(module.dataset.current.df, args.requests, args.seed)
+    target = HttpTarget(app) if args.target == 'http' else TestClientTarget(app)
+    try:
+        load = run_load(target, plan, args.concurrency, args.warmup)
+    finally:
+        target.close()
+
+    return {
+        'rows': n_rows,
+        'scoring': {'seconds': scoring_seconds, 'rows_per_sec': n_rows / scoring_seconds},
+        'index': {'build_seconds': build_seconds, 'load_seconds': load_seconds},
+        'load': dict(load, target=target.name),
+        'request_memory': request_memory(app, plan, args.memory_samples),
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def flatten(result, prefix=''):
+    """{'a': {'b': 1}} -> {'a.b': 1}, numeric leaves only."""
+    flat = {}
+    for key, value in result.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def print_result(result, baseline=None):
+    current = flatten(result)
+    previous = flatten(baseline) if baseline else {}
+    print(f"\nrows: {result['rows']:,}")
+    for key, value in current.items():
+        line = f"  {key:<52} {value:>14,.3f}"
+        if key in previous and previous[key]:
+            line += f"  (was {previous[key]:,.3f}, {value / previous[key]:.2f}x)"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--requests', type=int, default=2000, help="requests per size")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--memory-samples', type=int, default=20,
+                        help="requests per endpoint traced for allocation peaks")
+    parser.add_argument('--target', choices=['test-client', 'http'], default='test-client')
+    parser.add_argument('--csv', default=CSV_FILE_PATH)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write results as JSON to this file")
+    parser.add_argument('--baseline', help="earlier --output file to compare against")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {result['rows']: result for result in json.load(f)['results']}
+
+    source = load_csv(args.csv)
+    results = []
+    try:
+        for n_rows in args.rows:
+            result = bench_size(source, n_rows, args)
+            results.append(result)
+            print_result(result, baseline.get(n_rows))
+    finally:
+        shutil.rmtree(SCRATCH_DIR, ignore_errors=True)
+
+    report = {'environment': environment(), 'arguments': vars(args), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nwrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
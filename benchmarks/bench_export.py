@@ -0,0 +1,75 @@
+"""Throughput and memory report for the chunked exports.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_export.py                 # 1M synthetic rows
+    python benchmarks/bench_export.py --rows 200000 --formats csv parquet
+
+Builds a synthetic IndiaMART-shaped frame in the compact index layout (see
+bench_memory.py), then writes every row in each format to a temporary file
+with export.Export and reports MB/s and the peak Python allocation during
+the export. The peak is taken with tracemalloc in a second, untimed pass,
+since tracing slows every allocation; buffers allocated inside Arrow are
+not traced. For comparison it also measures the
+old in-memory export, DataFrame.to_csv into one string.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_memory import CSV_FILE_PATH, synthesize  # noqa: E402
+from export import EXPORT_CHUNK_SIZE, FORMATS, Export  # noqa: E402
+from scoring import score_suppliers  # noqa: E402
+from supplier_index import compact_frame, load_csv  # noqa: E402
+
+
+def measure(run):
+    """run()'s result and seconds, and the peak traced bytes of a second run."""
+    start = time.perf_counter()
+    result = run()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    try:
+        run()
+        return result, seconds, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def export_to_file(df, rows, format_name, chunk_size):
+    with tempfile.TemporaryFile() as f:
+        return Export(df, rows, format_name, chunk_size=chunk_size).write_to(f).bytes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--formats', nargs='+', choices=list(FORMATS), default=list(FORMATS))
+    parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+    parser.add_argument('--csv', default=CSV_FILE_PATH)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    df = synthesize(load_csv(args.csv), args.rows, args.seed)
+    df['Supplier Score'] = score_suppliers(df)
+    df = compact_frame(df)
+    rows = list(range(len(df)))
+
+    print(f"rows: {args.rows:,}  chunk size: {args.chunk_size:,}")
+    print(f"  {'format':<16} {'MB':>9} {'seconds':>9} {'MB/s':>9} {'peak MiB':>9}")
+    for format_name in args.formats:
+        size, seconds, peak = measure(lambda: export_to_file(df, rows, format_name, args.chunk_size))
+        print(f"  {format_name:<16} {size / 1e6:>9.1f} {seconds:>9.2f} {size / 1e6 / seconds:>9.1f} {peak / 2**20:>9.1f}")
+    text, seconds, peak = measure(lambda: df.to_csv(index=False).encode())
+    print(f"  {'to_csv (string)':<16} {len(text) / 1e6:>9.1f} {seconds:>9.2f} "
+          f"{len(text) / 1e6 / seconds:>9.1f} {peak / 2**20:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
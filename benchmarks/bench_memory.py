@@ -0,0 +1,79 @@
+"""Memory report for the compact supplier layout.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_memory.py               # 5M synthetic rows
+    python benchmarks/bench_memory.py --rows 500000
+
+Builds a synthetic IndiaMART-shaped frame (resampled from the casting CSV,
+with unique product URLs and listing positions), scores it, and reports
+bytes per row of the plain frame versus the compact layout served from the
+index (categorical text, float32 or int32 numbers).
+The raw frame alone needs roughly 1 KB per row, so size --rows to the RAM
+available.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scoring import score_suppliers  # noqa: E402
+from supplier_index import compact_frame, load_csv  # noqa: E402
+
+CSV_FILE_PATH = "indiamart_casting_data_cleaned_no_missing_prices.csv"
+
+
+def synthesize(source, n_rows, seed=0):
+    """Resample source rows, giving every listing its own URL id and position."""
+    rng = np.random.default_rng(seed)
+    df = source.iloc[rng.integers(0, len(source), n_rows)].reset_index(drop=True)
+    listing_ids = np.char.mod('%d', rng.integers(10**9, 10**13, n_rows))
+    positions = np.char.mod('%d', rng.integers(1, 200, n_rows))
+    url = df['Product URL'].str.partition('?')
+    canonical = url[0].str.replace(r'-\d+\.html$', '', regex=True) + '-' + listing_ids + '.html'
+    query = url[2].str.replace(r'^pos=\d+', '', regex=True)
+    df['Product URL'] = canonical + '?pos=' + positions + query
+    return df
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(deep=True, index=False).sum())
+
+
+def column_report(before, after):
+    lines = []
+    for column in before.columns:
+        old = int(before[column].memory_usage(deep=True, index=False))
+        new = int(after[column].memory_usage(deep=True, index=False)) if column in after else 0
+        lines.append(f"  {column:<20} {old / len(before):>10.1f} {new / len(after):>10.1f}  {after[column].dtype if column in after else '-'}")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    parser.add_argument('--csv', default=CSV_FILE_PATH)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    before = synthesize(load_csv(args.csv), args.rows, args.seed)
+    before['Supplier Score'] = score_suppliers(before)
+
+    start = time.perf_counter()
+    after = compact_frame(before)
+    elapsed = time.perf_counter() - start
+
+    old, new = frame_bytes(before), frame_bytes(after)
+    print(f"rows: {args.rows:,}  (compaction took {elapsed:.1f}s)")
+    print(f"  {'column':<20} {'bytes/row':>10} {'compact':>10}  dtype")
+    print("\n".join(column_report(before, after)))
+    print(f"  {'total':<20} {old / args.rows:>10.1f} {new / args.rows:>10.1f}  "
+          f"({old / 2**20:,.0f} MiB -> {new / 2**20:,.0f} MiB, {old / new:.1f}x smaller)")
+
+
+if __name__ == '__main__':
+    main()
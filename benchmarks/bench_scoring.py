@@ -0,0 +1,136 @@
+"""Benchmark the vectorized supplier scorer against the old row-wise version.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_scoring.py                  # 10k, 1M and 10M rows
+    python benchmarks/bench_scoring.py --sizes 10000 100000
+
+Synthetic rows are resampled from the IndiaMART casting CSV with some cells
+blanked out, so every branch of the scorer is exercised. Large sizes are
+scored in chunks to keep memory bounded; throughput is summed over chunks.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scoring import (SCORING_WEIGHTS, MANUFACTURING_TERMS, COMPANY_PATTERNS,  # noqa: E402
+                     QUALITY_TERMS, score_suppliers)
+
+CSV_FILE_PATH = "indiamart_casting_data_cleaned_no_missing_prices.csv"
+DEFAULT_SIZES = [10_000, 1_000_000, 10_000_000]
+NULLABLE_COLUMNS = ['Product Name', 'Company', 'Company URL', 'Product URL',
+                    'Phone', 'Address', 'City', 'Rating']
+
+
+# Row-wise scorer as it was in app2.py, kept here as the reference
+def calculate_supplier_score(row):
+    product_score = 0
+    if pd.notna(row['Product Name']):
+        words = len(row['Product Name'].split())
+        product_score = min(words / 10, 1)
+        if any(term in row['Product Name'].lower() for term in MANUFACTURING_TERMS):
+            product_score += 0.3
+        product_score = min(product_score, 1.0)
+
+    business_score = 0.5 if pd.notna(row['Company URL']) else 0
+    if any(pattern in str(row['Company']).lower() for pattern in COMPANY_PATTERNS):
+        business_score += 0.5
+    business_score = min(business_score, 1.0)
+
+    quality_score = row['Rating'] / 5.0 if pd.notna(row['Rating']) else 0
+    if any(term in str(row['Product Name']).lower() for term in QUALITY_TERMS):
+        quality_score += 0.3
+    quality_score = min(quality_score, 1.0)
+
+    market_score = 0.5 if pd.notna(row['Company URL']) and pd.notna(row['Product URL']) else 0
+    market_score = min(market_score, 1.0)
+
+    accessibility_score = 0.5 if pd.notna(row['Phone']) else 0
+    if pd.notna(row['Address']) or pd.notna(row['City']):
+        accessibility_score += 0.5
+    accessibility_score = min(accessibility_score, 1.0)
+
+    final_score = (
+        SCORING_WEIGHTS['products'] * product_score +
+        SCORING_WEIGHTS['business_info'] * business_score +
+        SCORING_WEIGHTS['quality'] * quality_score +
+        SCORING_WEIGHTS['market_presence'] * market_score +
+        SCORING_WEIGHTS['accessibility'] * accessibility_score
+    )
+
+    return round(final_score * 100, 1)
+
+
+def load_source(path=CSV_FILE_PATH):
+    df = pd.read_csv(path)
+    df['Price (per Kg)'] = pd.to_numeric(df['Price (per Kg)'], errors='coerce').fillna(0)
+    df['Rating'] = pd.to_numeric(df['Rating'], errors='coerce').fillna(0)
+    return df
+
+
+def synthesize(source, n_rows, seed=0, null_rate=0.05):
+    """Resample `source` to n_rows, blanking a fraction of nullable cells."""
+    rng = np.random.default_rng(seed)
+    df = source.iloc[rng.integers(0, len(source), n_rows)].reset_index(drop=True)
+    df['Rating'] = np.round(rng.uniform(0, 5, n_rows), 1)
+    for column in NULLABLE_COLUMNS:
+        df.loc[rng.random(n_rows) < null_rate, column] = np.nan
+    return df
+
+
+def bench_size(source, n_rows, chunk_size, verify_rows, seed):
+    elapsed = 0.0
+    done = 0
+    chunk_index = 0
+    while done < n_rows:
+        size = min(chunk_size, n_rows - done)
+        chunk = synthesize(source, size, seed=seed + chunk_index)
+        start = time.perf_counter()
+        scores = score_suppliers(chunk)
+        elapsed += time.perf_counter() - start
+
+        if chunk_index == 0 and verify_rows:
+            sample = chunk.head(verify_rows)
+            start = time.perf_counter()
+            expected = sample.apply(calculate_supplier_score, axis=1)
+            legacy_rate = len(sample) / (time.perf_counter() - start)
+            mismatches = int((expected.to_numpy() != scores.head(verify_rows).to_numpy()).sum())
+        done += size
+        chunk_index += 1
+
+    return {
+        'rows': n_rows,
+        'seconds': elapsed,
+        'rows_per_sec': n_rows / elapsed,
+        'legacy_rows_per_sec': legacy_rate if verify_rows else None,
+        'mismatches': mismatches if verify_rows else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--chunk-size', type=int, default=1_000_000)
+    parser.add_argument('--verify-rows', type=int, default=10_000,
+                        help="rows checked against the row-wise scorer (0 to skip)")
+    parser.add_argument('--csv', default=CSV_FILE_PATH)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    source = load_source(args.csv)
+    print(f"{'rows':>12} {'seconds':>10} {'rows/sec':>14} {'row-wise rows/sec':>18} {'mismatches':>11}")
+    for n_rows in args.sizes:
+        result = bench_size(source, n_rows, args.chunk_size, min(args.verify_rows, n_rows), args.seed)
+        legacy = result['legacy_rows_per_sec']
+        print(f"{result['rows']:>12,} {result['seconds']:>10.3f} {result['rows_per_sec']:>14,.0f} "
+              f"{(f'{legacy:,.0f}' if legacy else '-'):>18} {str(result['mismatches']):>11}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""Catalogue of supplier datasets, one shard per category crawl.
+
+The shards are listed in catalogue.json (or SUPPLIER_CATALOGUE):
+
+    {"shards": [
+        {"name": "casting", "keywords": ["casting", "foundry"]},
+        {"name": "forging", "csv": "crawls/forging.csv"}
+    ]}
+
+Relative CSV paths are resolved against the catalogue file. A shard without
+a CSV is the dataset the API already serves, so its crawl is not loaded
+twice. Every other shard is a LiveDataset over its own index, opened the
+first time a query reaches it, so startup cost does not grow with the
+catalogue.
+
+A query is routed before any shard is opened. `category=` names the shards
+outright. Otherwise a keyword goes to the shards whose routing terms contain
+one of its words as a prefix. The routing terms are the shard's name, its
+configured keywords and, once it has been opened, its Keyword values. A
+shard that has never been opened and has no configured keywords is always
+asked.
+
+When a query needs more than one shard, the shards are searched in parallel
+on a process pool (see catalogue_worker.py). Each worker opens its own shards
+lazily; the indexes are memory-mapped, so workers share them through the
+page cache. Every shard
+returns its first offset + limit matches, and the pages are merged by the
+sort column.
+"""
+import heapq
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from catalogue_worker import keyword_terms, search_in_worker, search_shard
+from live_dataset import LiveDataset
+from search_index import tokenize
+from sort_index import SORTABLE_COLUMNS
+
+CATALOGUE_PATH = os.environ.get(
+    'SUPPLIER_CATALOGUE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'catalogue.json'))
+POOL_SIZE = int(os.environ.get('SUPPLIER_CATALOGUE_POOL_SIZE', min(4, os.cpu_count() or 1)))
+
+
+class Shard:
+    """One category's dataset, opened on first use."""
+
+    def __init__(self, name, csv_path, preset='api', keywords=(), dataset=None):
+        self.name = name
+        self.csv_path = csv_path
+        self.preset = preset
+        self.keywords = list(keywords)
+        self.terms = set(tokenize(' '.join([name] + self.keywords)))
+        self.learned = False     # whether terms include the crawl's Keyword values
+        self._dataset = dataset  # already open when the shard is the served dataset
+        self._lock = threading.Lock()
+        if dataset is not None:
+            self.learn(keyword_terms(dataset.current))
+
+    @property
+    def loaded(self):
+        return self._dataset is not None
+
+    @property
+    def dataset(self):
+        """The shard's LiveDataset, opened (building its index if needed) on first use."""
+        with self._lock:
+            if self._dataset is None:
+                self._dataset = LiveDataset(self.csv_path, self.preset)
+                self.learn(keyword_terms(self._dataset.current))
+            return self._dataset
+
+    def learn(self, terms):
+        self.terms |= set(terms)
+        self.learned = True
+
+    def matches(self, words):
+        """Whether a keyword query with these words may match this shard."""
+        if not self.learned and not self.keywords:
+            return True
+        return any(term.startswith(word) for word in words for term in self.terms)
+
+    def spec(self):
+        return self.name, self.csv_path, self.preset
+
+
+def load_shards(path=CATALOGUE_PATH, preset='api', served=None):
+    """Shards listed in a catalogue file; `served` is the LiveDataset of shards without a CSV."""
+    with open(path) as f:
+        config = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(path))
+    shards = []
+    for entry in config['shards']:
+        keywords = entry.get('keywords', ())
+        if 'csv' not in entry:
+            if served is None:
+                raise ValueError(f"Shard {entry['name']!r} has no 'csv' and no dataset is served")
+            shards.append(Shard(entry['name'], served.csv_path, served.preset, keywords, served))
+            continue
+        csv_path = os.path.join(base_dir, os.path.expanduser(entry['csv']))
+        shards.append(Shard(entry['name'], csv_path, entry.get('preset', preset), keywords))
+    return shards
+
+
+def merge_pages(pages, ascending, offset, limit):
+    """Merge per-shard pages (each in sort order) into one page of records.
+
+    Missing values come last in either direction; ties keep shard order, then
+    each shard's own order.
+    """
+    def keyed(i, page):
+        for position, ((missing, value), record) in enumerate(page):
+            if ascending:
+                yield (missing, value, i, position), record
+            else:
+                yield (not missing, value, -i, -position), record
+
+    merged = heapq.merge(*(keyed(i, page) for i, page in enumerate(pages)),
+                         key=lambda item: item[0], reverse=not ascending)
+    return [record for _, record in list(merged)[offset:offset + limit]]
+
+
+class Catalogue:
+    def __init__(self, shards, pool_size=POOL_SIZE):
+        self.shards = {shard.name: shard for shard in shards}
+        self.pool_size = pool_size
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path=CATALOGUE_PATH, preset='api', pool_size=POOL_SIZE, served=None):
+        return cls(load_shards(path, preset, served), pool_size)
+
+    def route(self, keyword=None, categories=None):
+        """The shards a query has to search, in catalogue order.
+
+        Raises ValueError for categories that name no shard.
+        """
+        shards = list(self.shards.values())
+        if categories:
+            wanted = {category.strip().lower() for category in categories}
+            unknown = wanted - {shard.name.lower() for shard in shards}
+            if unknown:
+                raise ValueError(f"Unknown category: {', '.join(sorted(unknown))}; "
+                                 f"expected one of: {', '.join(self.shards)}")
+            shards = [shard for shard in shards if shard.name.lower() in wanted]
+        words = tokenize(keyword or '')
+        if words:
+            shards = [shard for shard in shards if shard.matches(words)]
+        return shards
+
+    def pool(self):
+        with self._lock:
+            if self._pool is None:
+                # Spawned, not forked: the serving process has threads running
+                self._pool = ProcessPoolExecutor(self.pool_size, mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def search(self, query, sort_by='Supplier Score', ascending=False, offset=0, limit=100, fields=None):
+        """(total matches, merged page of records, names of the shards searched).
+
+        Raises ValueError for unknown fields or categories.
+        """
+        if sort_by not in SORTABLE_COLUMNS:
+            sort_by = 'Supplier Score'
+        shards = self.route(query.get('keyword'), query.get('categories'))
+        k = offset + limit
+        if len(shards) == 1 or self.pool_size <= 1:
+            results = [search_shard(shard.dataset.current, shard.name, query, sort_by, ascending, k, fields)
+                       for shard in shards]
+        else:
+            futures = [self.pool().submit(search_in_worker, shard.spec(), query, sort_by, ascending, k, fields)
+                       for shard in shards]
+            results = []
+            for shard, future in zip(shards, futures):
+                result, terms = future.result()
+                # Route later queries by the Keyword values the worker found
+                shard.learn(terms)
+                results.append(result)
+        total = sum(count for count, _ in results)
+        return total, merge_pages([page for _, page in results], ascending, offset, limit), [
+            shard.name for shard in shards]
+
+    def describe(self):
+        """JSON-ready summary of every shard."""
+        return [{
+            'name': shard.name,
+            'csv': shard.csv_path,
+            'keywords': shard.keywords,
+            'loaded': shard.loaded,
+            'rows': len(shard.dataset.current.df) if shard.loaded else None,
+        } for shard in self.shards.values()]
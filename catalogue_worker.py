@@ -0,0 +1,55 @@
+"""Searching one catalogue shard, in the serving process or a pool worker.
+
+The catalogue's process pool is spawned, so a worker imports this module
+to run search_in_worker; nothing here loads data at import time. (A worker
+also re-runs the serving script when that was started directly, as
+__mp_main__; app2.py loads nothing then.) A worker opens each shard the
+first time a query reaches it and keeps it for later queries.
+"""
+import math
+
+from live_dataset import LiveDataset
+from search_index import tokenize
+from supplier_query import filter_rows, order_rows, page_records, parse_fields
+
+CATEGORY_FIELD = 'Category'
+
+
+def keyword_terms(data):
+    """Routing terms of a dataset: the words of its Keyword values."""
+    keywords = data.df['Keyword'].astype('category').cat.categories
+    return sorted(set(tokenize(' '.join(map(str, keywords)))))
+
+
+def _sort_value(value):
+    """(missing, value) with missing values comparable (and ranked last by the caller)."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return True, 0
+    return False, value
+
+
+def search_shard(data, name, query, sort_by, ascending, k, fields=None):
+    """(total matches, [(sort value, record)] of the first k) for one shard's data."""
+    df = data.df
+    fields = parse_fields(fields, df.columns)
+    rows = filter_rows(df, data.search_index, query.get('keyword'), query.get('min_price'),
+                       query.get('max_price'), query.get('city'), fuzzy=query.get('fuzzy', False))
+    top = order_rows(df, data.sort_index, rows, sort_by, ascending, limit=k)
+    sort_values = page_records(df, top, [sort_by])
+    records = page_records(df, top, fields)
+    for record in records:
+        record[CATEGORY_FIELD] = name
+    return len(rows), [(_sort_value(value[sort_by]), record) for value, record in zip(sort_values, records)]
+
+
+# Shards opened in this (worker) process, by name
+_worker_shards = {}
+
+
+def search_in_worker(spec, query, sort_by, ascending, k, fields):
+    """search_shard() on this process's copy of the shard, plus its routing terms."""
+    name, csv_path, preset = spec
+    if name not in _worker_shards:
+        _worker_shards[name] = LiveDataset(csv_path, preset)
+    data = _worker_shards[name].current
+    return search_shard(data, name, query, sort_by, ascending, k, fields), keyword_terms(data)
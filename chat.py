@@ -0,0 +1,306 @@
+"""Retrieval-augmented answers to supplier questions, without any network.
+
+A question goes through three timed stages:
+
+retrieve  The dataset's persisted TF-IDF index (see semantic_search) finds
+          the RETRIEVE_K listings most similar to the question. Results are
+          cached per dataset by the question's TF-IDF tokens, so rephrasings
+          that differ only in case or punctuation share an entry. Questions
+          arriving together are collected for BATCH_WINDOW seconds and
+          retrieved with one sparse product.
+rank      Listings above a price cap ("under 200") or outside a city named in
+          the question are dropped, the rest are ordered by similarity
+          blended with Supplier Score, and each supplier (see company_index)
+          keeps only its best listing.
+generate  A generator turns the question and the ranked listings into the
+          answer text.
+
+Generators are callables (question, records) -> str. 'template' writes the
+answer straight from the listings; 'stub' builds the prompt a language model
+would get and answers it with a local extractive stand-in. LocalModelGenerator
+wraps any local prompt -> text model the same way. SUPPLIER_CHAT_GENERATOR
+picks a registered generator or names one as 'module:attribute'.
+"""
+import importlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from query_cache import QueryCache
+from search_index import tokenize
+from supplier_query import equals
+
+RETRIEVE_K = 50
+DEFAULT_ANSWER_K = 5
+MAX_ANSWER_K = 20
+BATCH_WINDOW = float(os.environ.get('SUPPLIER_CHAT_BATCH_WINDOW', 0.005))
+MAX_BATCH_SIZE = 64
+
+# Share of the ranking given to similarity; the rest goes to Supplier Score
+SIMILARITY_WEIGHT = 0.7
+
+CONTEXT_FIELDS = ['Company', 'Product Name', 'Keyword', 'City', 'Price (per Kg)',
+                  'Rating', 'Supplier Score', 'Phone', 'Product URL', 'Listing ID']
+
+_PRICE_CAP = re.compile(
+    r'\b(?:under|below|less than|cheaper than|up ?to|within|max(?:imum)?)\s*'
+    r'(?:rs\.?|inr|₹)?\s*(\d+(?:\.\d+)?)', re.IGNORECASE)
+
+
+def city_pattern(df):
+    """Regex matching any of df's City values as whole words in tokenized text."""
+    names = {' '.join(tokenize(name)): name for name in df['City'].astype('category').cat.categories.astype(str)}
+    names.pop('', None)
+    # Longest name first, so "navi mumbai" wins over "mumbai"
+    alternatives = sorted(names, key=len, reverse=True)
+    return re.compile(r'\b(' + '|'.join(map(re.escape, alternatives)) + r')\b'), names
+
+
+def question_filters(question, cities):
+    """{'max_price', 'city'} stated in a question; either may be None.
+
+    `cities` is city_pattern() of the dataset.
+    """
+    pattern, names = cities
+    price = _PRICE_CAP.search(question)
+    city = pattern.search(' '.join(tokenize(question))) if names else None
+    return {'max_price': float(price.group(1)) if price else None,
+            'city': names[city.group(1)] if city else None}
+
+
+def rank(data, rows, similarities, filters, k):
+    """The k best (row, similarity) pairs of the retrieved listings, one per supplier."""
+    df = data.df
+    keep = np.ones(len(rows), dtype=bool)
+    if filters['max_price'] is not None:
+        prices = df['Price (per Kg)'].to_numpy()[rows]
+        keep &= (prices > 0) & (prices <= filters['max_price'])
+    if filters['city'] is not None:
+        keep &= equals(df['City'], filters['city'], rows)
+    rows, similarities = rows[keep], similarities[keep]
+    if not len(rows):
+        return rows, similarities
+
+    scores = np.nan_to_num(df['Supplier Score'].to_numpy(dtype=np.float64)[rows]) / 100
+    relevance = similarities / similarities.max() if similarities.max() > 0 else similarities
+    blended = SIMILARITY_WEIGHT * relevance + (1 - SIMILARITY_WEIGHT) * scores
+    order = np.lexsort((rows, -blended))
+    # First (best) listing of each supplier
+    _, first = np.unique(data.company_index.supplier_ids[rows[order]], return_index=True)
+    order = order[np.sort(first)][:k]
+    return rows[order], similarities[order]
+
+
+def _price(value):
+    return f"₹{value:g}/kg" if value else "price on request"
+
+
+def template_answer(question, records):
+    """Answer written directly from the ranked listings."""
+    if not records:
+        return f"I couldn't find any suppliers matching \"{question}\"."
+    lines = [f"Here are {len(records)} supplier{'s' if len(records) != 1 else ''} "
+             f"for \"{question}\":"]
+    for i, record in enumerate(records, 1):
+        rating = f", rated {record['Rating']:g}" if record.get('Rating') else ""
+        lines.append(f"{i}. {record['Company']} ({record['City']}): {record['Product Name']} "
+                     f"at {_price(record['Price (per Kg)'])}{rating}, "
+                     f"supplier score {record['Supplier Score']:g}")
+    prices = [record['Price (per Kg)'] for record in records if record['Price (per Kg)']]
+    if len(prices) > 1:
+        lines.append(f"Prices range from {_price(min(prices))} to {_price(max(prices))}.")
+    best = max(records, key=lambda record: record['Supplier Score'] or 0)
+    lines.append(f"{best['Company']} has the highest supplier score.")
+    return '\n'.join(lines)
+
+
+def build_prompt(question, records):
+    """The context-plus-question prompt a local language model is given."""
+    context = '\n'.join(
+        f"[{i}] " + '; '.join(f"{field}: {record[field]}" for field in CONTEXT_FIELDS
+                              if record.get(field) not in (None, ''))
+        for i, record in enumerate(records, 1))
+    return ("Answer the question using only the supplier listings below.\n\n"
+            f"Listings:\n{context}\n\nQuestion: {question}\nAnswer:")
+
+
+def extractive_stub(prompt):
+    """Stand-in model: the context lines sharing the most words with the question."""
+    context, _, question = prompt.rpartition('\nQuestion: ')
+    words = set(tokenize(question.rsplit('\nAnswer:', 1)[0]))
+    listings = [line for line in context.splitlines() if line.startswith('[')]
+    if not listings:
+        return "No listings were found for this question."
+    best = sorted(listings, key=lambda line: -len(words & set(tokenize(line))))[:3]
+    return "Most relevant listings:\n" + '\n'.join(best)
+
+
+class LocalModelGenerator:
+    """Generator that prompts a local model, any callable prompt -> text."""
+
+    def __init__(self, model):
+        self.model = model
+
+    def __call__(self, question, records):
+        return self.model(build_prompt(question, records)).strip()
+
+
+GENERATORS = {
+    'template': template_answer,
+    'stub': LocalModelGenerator(extractive_stub),
+}
+
+
+def load_generator(name):
+    """A registered generator, or the callable at 'module:attribute'."""
+    if name in GENERATORS:
+        return GENERATORS[name]
+    module, _, attribute = name.partition(':')
+    if not attribute:
+        raise ValueError(f"Unknown generator '{name}'; expected one of {sorted(GENERATORS)} "
+                         f"or 'module:attribute'")
+    return getattr(importlib.import_module(module), attribute)
+
+
+class RetrievalBatcher:
+    """Collects concurrent retrievals into one TfidfSearchIndex.query_batch call.
+
+    The first question to arrive waits `window` seconds, then retrieves every
+    question queued meanwhile; questions arriving after that start the next
+    batch.
+    """
+
+    def __init__(self, k=RETRIEVE_K, window=BATCH_WINDOW, max_batch_size=MAX_BATCH_SIZE):
+        self.k = k
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.batches = 0
+        self.questions = 0
+        self.largest_batch = 0
+        self._pending = []     # (tfidf index, text, Future)
+        self._lock = threading.Lock()
+
+    def retrieve(self, tfidf_index, text):
+        """(row ids, similarities) of the k listings most similar to text."""
+        future = Future()
+        with self._lock:
+            self._pending.append((tfidf_index, text, future))
+            leader = len(self._pending) == 1
+            full = len(self._pending) >= self.max_batch_size
+        if leader and not full:
+            time.sleep(self.window)
+        if leader or full:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if batch:
+                self._run(batch)
+        return future.result()
+
+    def _run(self, batch):
+        with self._lock:
+            self.batches += 1
+            self.questions += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+        # A dataset swap can put two indexes in one batch
+        by_index = {}
+        for tfidf_index, text, future in batch:
+            by_index.setdefault(id(tfidf_index), (tfidf_index, []))[1].append((text, future))
+        for tfidf_index, items in by_index.values():
+            try:
+                results = tfidf_index.query_batch([text for text, _ in items], self.k)
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(items, results):
+                future.set_result(result)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'batches': self.batches,
+                'questions': self.questions,
+                'largest_batch': self.largest_batch,
+                'mean_batch': self.questions / self.batches if self.batches else 0.0,
+            }
+
+
+def _elapsed_ms(start):
+    return round((time.perf_counter() - start) * 1000, 3)
+
+
+class ChatPipeline:
+    def __init__(self, generator=None, cache=None, batcher=None):
+        self.generator = generator or load_generator(os.environ.get('SUPPLIER_CHAT_GENERATOR', 'template'))
+        self.cache = cache if cache is not None else QueryCache()
+        self.batcher = batcher or RetrievalBatcher()
+        self._cities = None    # (dataset version, city_pattern())
+
+    def _cache_key(self, data, question):
+        # The TF-IDF index only ever sees these tokens
+        return tuple(data.tfidf_index.vectorizer.build_tokenizer()(question.lower()))
+
+    def _city_pattern(self, data):
+        cities = self._cities
+        if cities is None or cities[0] != data.version:
+            cities = self._cities = (data.version, city_pattern(data.df))
+        return cities[1]
+
+    def _respond(self, data, question, retrieved, cached, retrieve_ms, k):
+        start = time.perf_counter()
+        filters = question_filters(question, self._city_pattern(data))
+        rows, similarities = rank(data, *retrieved, filters, k)
+        # Decoded from the dataset's encoder, which skips pandas' per-call overhead
+        records = json.loads(data.encoder.dumps(rows, CONTEXT_FIELDS))
+        for record, similarity in zip(records, similarities):
+            record['Similarity'] = round(float(similarity), 4)
+        rank_ms = _elapsed_ms(start)
+
+        start = time.perf_counter()
+        answer = self.generator(question, records)
+        generate_ms = _elapsed_ms(start)
+        return {
+            'question': question,
+            'answer': answer,
+            'suppliers': records,
+            'filters': filters,
+            'cached': cached,
+            'latency_ms': {'retrieve': retrieve_ms, 'rank': rank_ms, 'generate': generate_ms,
+                           'total': round(retrieve_ms + rank_ms + generate_ms, 3)},
+        }
+
+    def answer(self, data, question, k=DEFAULT_ANSWER_K):
+        """Answer one question, batching its retrieval with concurrent ones."""
+        start = time.perf_counter()
+        key = self._cache_key(data, question)
+        retrieved = self.cache.get(key, data.version)
+        cached = retrieved is not None
+        if not cached:
+            retrieved = self.batcher.retrieve(data.tfidf_index, question)
+            self.cache.put(key, retrieved, data.version)
+        return self._respond(data, question, retrieved, cached, _elapsed_ms(start), k)
+
+    def answer_batch(self, data, questions, k=DEFAULT_ANSWER_K):
+        """Answer many questions, retrieving the uncached ones in one pass."""
+        start = time.perf_counter()
+        keys = [self._cache_key(data, question) for question in questions]
+        retrieved = [self.cache.get(key, data.version) for key in keys]
+        cached = [result is not None for result in retrieved]
+        missing = [i for i, result in enumerate(retrieved) if result is None]
+        if missing:
+            results = data.tfidf_index.query_batch([questions[i] for i in missing], self.batcher.k)
+            for i, result in zip(missing, results):
+                retrieved[i] = result
+                self.cache.put(keys[i], result, data.version)
+        # The retrieval pass is shared, so every answer reports its full time
+        retrieve_ms = _elapsed_ms(start)
+        return [self._respond(data, question, result, hit, retrieve_ms, k)
+                for question, result, hit in zip(questions, retrieved, cached)]
+
+    def stats(self):
+        return {'cache': self.cache.stats(), 'batching': self.batcher.stats()}
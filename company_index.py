@@ -0,0 +1,193 @@
+"""Entity resolution of listings into suppliers, with company-level aggregates.
+
+The dataset has one row per product listing, so the same company shows up
+once per Keyword it was crawled under. Listings are clustered into suppliers
+by three blocking keys: normalized company name, phone number and website
+domain (IndiaMART-hosted sites count as indiamart.com/<slug>). Two listings
+sharing any key end up in the same supplier, transitively. Only listings
+within a block are ever compared, and each block is handled with a
+group-by, so resolution is O(n log n) instead of all pairs.
+
+Per supplier, a companies table (listing count, price range, best score)
+and a per-keyword breakdown are computed once per index file. They are saved
+next to the supplier index like the other derived indexes.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from supplier_index import derived_index_path, distinct_values, load_arrays, read_index, save_arrays
+from supplier_query import frame_records
+
+# Trailing words that do not tell two companies apart
+LEGAL_SUFFIXES = {'private', 'pvt', 'limited', 'ltd', 'llp', 'inc', 'corporation', 'corp', 'co'}
+
+# Marketplaces that host many suppliers' sites under one domain
+HOSTED_DOMAINS = {'indiamart.com'}
+
+COMPANY_COLUMNS = ['Supplier ID', 'Company', 'Phone', 'Company URL', 'City', 'Address', 'Products',
+                   'Min Price (per Kg)', 'Max Price (per Kg)', 'Best Score', 'Rating']
+KEYWORD_COLUMNS = ['Keyword', 'Products', 'Min Price (per Kg)', 'Max Price (per Kg)', 'Best Score']
+SORTABLE_COLUMNS = ['Best Score', 'Products', 'Min Price (per Kg)', 'Max Price (per Kg)', 'Rating', 'Company']
+
+
+def normalize_name(names):
+    """Lowercased company name without punctuation or trailing legal suffixes."""
+    words = (names.astype(str).str.lower().str.replace('&', ' and ', regex=False)
+             .str.replace(r'[^\w]+', ' ', regex=True).str.split())
+
+    def strip_suffixes(tokens):
+        while tokens and tokens[-1] in LEGAL_SUFFIXES:
+            tokens = tokens[:-1]
+        return ' '.join(tokens)
+
+    return words.map(strip_suffixes).where(names.notna())
+
+
+def normalize_domain(urls):
+    """Website host without 'www.'; hosted marketplace sites keep their first path segment."""
+    parts = urls.astype(str).str.lower().str.extract(r'^(?:[a-z]+://)?(?:www\.|m\.)?([^/?#]+)/*([^/?#]*)')
+    hosted = parts[0].isin(HOSTED_DOMAINS) & (parts[1] != '')
+    return parts[0].where(~hosted, parts[0] + '/' + parts[1]).where(urls.notna())
+
+
+def normalize_phone(phones):
+    """Last ten digits of a phone number (the Indian subscriber number)."""
+    digits = phones.astype(str).str.replace(r'\.0$', '', regex=True).str.replace(r'\D', '', regex=True).str[-10:]
+    return digits.where(phones.notna() & (digits.str.len() >= 6))
+
+
+def _key_codes(values, normalize):
+    """Per-row code of the normalized value (-1 when missing), normalizing distinct values once."""
+    codes, uniques = distinct_values(values)
+    key_codes, _ = pd.factorize(normalize(pd.Series(uniques, dtype=object)))
+    return np.append(key_codes, -1)[codes]
+
+
+def connected_components(key_codes, n_rows):
+    """Label each row with the smallest row id it is linked to through any shared key."""
+    labels = np.arange(n_rows)
+    while True:
+        previous = labels
+        for codes in key_codes:
+            has_key = codes >= 0
+            block_min = pd.Series(labels[has_key]).groupby(codes[has_key]).transform('min').to_numpy()
+            labels = labels.copy()
+            labels[has_key] = np.minimum(labels[has_key], block_min)
+        # Pointer jumping: follow each label to its own label
+        labels = labels[labels]
+        if np.array_equal(labels, previous):
+            return labels
+
+
+def resolve_suppliers(df):
+    """Supplier id per listing, numbered in order of first appearance."""
+    key_codes = [
+        _key_codes(df['Company'], normalize_name),
+        _key_codes(df['Phone'], normalize_phone),
+        _key_codes(df['Company URL'], normalize_domain),
+    ]
+    labels = connected_components(key_codes, len(df))
+    supplier_ids, _ = pd.factorize(labels)
+    return supplier_ids.astype(np.int32)
+
+
+def _widen(values):
+    # Shortest-decimal widening of float32, as in supplier_query.frame_records
+    values = values.to_numpy()
+    if values.dtype == np.float32:
+        return values.astype(str).astype(np.float64)
+    return values.astype(np.float64)
+
+
+def aggregate(df, supplier_ids):
+    """(companies, keywords) tables for the resolved suppliers.
+
+    Prices of 0 are missing prices (see load_data) and are left out of the
+    price ranges.
+    """
+    price = _widen(df['Price (per Kg)'])
+    listings = pd.DataFrame({
+        'Supplier ID': supplier_ids,
+        'Keyword': df['Keyword'].astype(object).to_numpy(),
+        'Price': np.where(price > 0, price, np.nan),
+        'Score': _widen(df['Supplier Score']),
+        'Rating': _widen(df['Rating']),
+    })
+    by_supplier = listings.groupby('Supplier ID', sort=True)
+    # The first listing of a supplier provides its name and contact details
+    first_rows = pd.Series(np.arange(len(df))).groupby(supplier_ids).first().to_numpy()
+    details = df.iloc[first_rows][['Company', 'Phone', 'Company URL', 'City', 'Address']]
+    companies = pd.DataFrame({
+        'Supplier ID': np.arange(len(first_rows), dtype=np.int32),
+        **{column: details[column].astype(object).to_numpy() for column in details.columns},
+        'Products': by_supplier.size().to_numpy(),
+        'Min Price (per Kg)': by_supplier['Price'].min().to_numpy(),
+        'Max Price (per Kg)': by_supplier['Price'].max().to_numpy(),
+        'Best Score': by_supplier['Score'].max().to_numpy(),
+        'Rating': by_supplier['Rating'].max().to_numpy(),
+    })
+
+    keywords = (listings.groupby(['Supplier ID', 'Keyword'], sort=True)
+                .agg(**{'Products': ('Score', 'size'),
+                        'Min Price (per Kg)': ('Price', 'min'),
+                        'Max Price (per Kg)': ('Price', 'max'),
+                        'Best Score': ('Score', 'max')})
+                .reset_index())
+    return companies, keywords
+
+
+class CompanyIndex:
+    def __init__(self, supplier_ids, companies, keywords, keyword_offsets):
+        self.supplier_ids = supplier_ids          # supplier id per listing row
+        self.companies = companies                # one row per supplier id
+        self.keywords = keywords                  # rows sorted by supplier id
+        self.keyword_offsets = keyword_offsets    # keywords of s: keyword_offsets[s]:keyword_offsets[s + 1]
+
+    @classmethod
+    def build(cls, df):
+        supplier_ids = resolve_suppliers(df)
+        companies, keywords = aggregate(df, supplier_ids)
+        offsets = np.searchsorted(keywords['Supplier ID'].to_numpy(), np.arange(len(companies) + 1))
+        return cls(supplier_ids, companies, keywords, offsets)
+
+    def save(self, path):
+        """Write the tables and arrays to directory `path` atomically."""
+        save_arrays(path, {'supplier_ids': self.supplier_ids, 'keyword_offsets': self.keyword_offsets},
+                    {'n_suppliers': len(self.companies)},
+                    tables={'companies': self.companies, 'keywords': self.keywords})
+
+    @classmethod
+    def load(cls, path):
+        """Open the saved tables and arrays memory-mapped."""
+        arrays, _ = load_arrays(path)
+        return cls(arrays['supplier_ids'], read_index(os.path.join(path, 'companies.arrow')),
+                   read_index(os.path.join(path, 'keywords.arrow')), arrays['keyword_offsets'])
+
+    def suppliers_of(self, rows):
+        """Sorted supplier ids of the given listing rows."""
+        return np.unique(self.supplier_ids[rows])
+
+    def keyword_rows(self, supplier_id):
+        return slice(int(self.keyword_offsets[supplier_id]), int(self.keyword_offsets[supplier_id + 1]))
+
+    def records(self, supplier_ids):
+        """Company records for the given supplier ids, each with its per-keyword breakdown."""
+        results = frame_records(self.companies.iloc[supplier_ids])
+        keywords = self.keywords[KEYWORD_COLUMNS]
+        for record, supplier_id in zip(results, supplier_ids):
+            record['Keywords'] = frame_records(keywords.iloc[self.keyword_rows(supplier_id)])
+        return results
+
+
+def open_company_index(index_path, df):
+    """Load the company index for a supplier index, resolving df if it is missing.
+
+    `df` must be the frame read from index_path.
+    """
+    path = derived_index_path(index_path, 'companies', {
+        'suffixes': sorted(LEGAL_SUFFIXES), 'hosted': sorted(HOSTED_DOMAINS)})
+    if not os.path.exists(path):
+        CompanyIndex.build(df).save(path)
+    return CompanyIndex.load(path)
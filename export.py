@@ -0,0 +1,300 @@
+"""Chunked exports of supplier rows as CSV, Parquet or XLSX.
+
+row_batches() yields the selected rows a chunk at a time as small frames,
+and each writer turns those batches into a stream of bytes chunks. An export
+never holds more than one chunk of rows, plus the writer's own buffer, in
+memory, however many rows match:
+
+- CSV writes each batch through Arrow's CSV writer, which is several times
+  faster than DataFrame.to_csv. Text fields are always quoted.
+- Parquet writes each batch as one row group through a ParquetWriter whose
+  sink is drained after every batch.
+- XLSX writes a minimal SpreadsheetML workbook (one sheet, inline strings)
+  into a zip that is streamed as it is written, so no spreadsheet library
+  is needed and the sheet is never built in memory. Cells are escaped with
+  Arrow compute kernels, and the sheet is deflated at a low level: speed
+  matters more than size here, and XML compresses well either way.
+
+Export wraps a stream and measures its size and throughput as it is
+consumed; finished exports are recorded in instrumentation.EXPORT_THROUGHPUT.
+"""
+import io
+import os
+import time
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from instrumentation import EXPORT_THROUGHPUT
+from serialization import PARQUET
+
+EXPORT_CHUNK_SIZE = int(os.environ.get('SUPPLIER_EXPORT_CHUNK_SIZE', 50_000))
+
+CSV = 'text/csv'
+XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# ?format= values and their media types
+FORMATS = {'csv': CSV, 'parquet': PARQUET, 'xlsx': XLSX}
+
+# One sheet holds 1,048,576 rows, the header included
+XLSX_MAX_ROWS = 1_048_575
+
+XLSX_COMPRESS_LEVEL = 1
+
+# Characters XML 1.0 cannot carry at all (an RE2 pattern)
+_XML_ILLEGAL = r'[\x{0}-\x{8}\x{b}\x{c}\x{e}-\x{1f}\x{fffe}\x{ffff}]'
+
+
+def row_batches(df, rows, fields=None, chunk_size=EXPORT_CHUNK_SIZE, overrides=None):
+    """Yield the rows (restricted to fields) as frames of at most chunk_size rows.
+
+    `overrides` maps column names to full-length Series served instead.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        frame = df.iloc[chunk]
+        if overrides:
+            frame = frame.assign(**{column: values.to_numpy()[chunk] for column, values in overrides.items()})
+        yield frame if fields is None else frame[fields]
+
+
+class _Sink(io.RawIOBase):
+    """Write-only, non-seekable byte sink that is emptied by drain()."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def arrow_schema(df, columns):
+    """Arrow schema for an export of df's columns.
+
+    Text (categorical or object) columns are plain strings: categoricals are
+    decoded so every row group is dictionary-encoded on its own values
+    rather than repeating the whole category list.
+    """
+    schema = pa.Schema.from_pandas(df[columns].iloc[:0], preserve_index=False)
+    return pa.schema([pa.field(field.name, pa.string())
+                      if pa.types.is_dictionary(field.type) or pa.types.is_null(field.type) else field
+                      for field in schema])
+
+
+def _decode_categories(frame):
+    categorical = [column for column in frame.columns if isinstance(frame[column].dtype, pd.CategoricalDtype)]
+    if not categorical:
+        return frame
+    return frame.assign(**{column: frame[column].astype(object) for column in categorical})
+
+
+def _arrow_batches(batches, schema):
+    for frame in batches:
+        yield pa.Table.from_pandas(_decode_categories(frame), schema=schema, preserve_index=False)
+
+
+def csv_chunks(batches, schema):
+    """CSV text of the batches, header first, one bytes chunk per batch."""
+    sink = _Sink()
+    with pa_csv.CSVWriter(sink, schema) as writer:
+        for table in _arrow_batches(batches, schema):
+            writer.write_table(table)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def parquet_chunks(batches, schema):
+    """A Parquet file of the batches, one row group (and bytes chunk) per batch."""
+    sink = _Sink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for table in _arrow_batches(batches, schema):
+            writer.write_table(table)
+            yield sink.drain()
+    yield sink.drain()
+
+
+_XLSX_PARTS = {
+    '[Content_Types].xml':
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>',
+    '_rels/.rels':
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>',
+    'xl/workbook.xml':
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Suppliers" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>',
+    'xl/_rels/workbook.xml.rels':
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>',
+}
+
+_SHEET_START = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+_SHEET_END = '</sheetData></worksheet>'
+
+
+_EMPTY_CELL = pa.scalar('<c/>')
+
+
+def _string_cells(values):
+    """Inline-string cells (an Arrow string array) for text values; missing values get an empty cell."""
+    text = pa.array(values, type=pa.string(), from_pandas=True)
+    text = pc.replace_substring_regex(text, _XML_ILLEGAL, '')
+    for char, entity in (('&', '&amp;'), ('<', '&lt;'), ('>', '&gt;')):
+        text = pc.replace_substring(text, char, entity)
+    cells = pc.binary_join_element_wise('<c t="inlineStr"><is><t xml:space="preserve">', text, '</t></is></c>', '')
+    return pc.fill_null(cells, _EMPTY_CELL)
+
+
+def _pick(cells, codes):
+    """cells[codes], with code -1 picking an empty cell."""
+    return pc.fill_null(cells.take(pa.array(codes, mask=codes < 0)), _EMPTY_CELL)
+
+
+def _number_cells(values):
+    """Cells for numeric values, formatting each distinct value once."""
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    uniques = np.asarray(uniques)
+    if uniques.dtype == np.float32:
+        # Shortest decimal form, as the JSON encoder serves it
+        uniques = uniques.astype(str).astype(np.float64)
+    cells = [f'<c><v>{value!r}</v></c>' if np.isfinite(value) else '<c/>' for value in uniques.tolist()]
+    return _pick(pa.array(cells, type=pa.string()), codes)
+
+
+class _SheetCells:
+    """XML cells of one column at a time; categories are escaped once per export."""
+
+    def __init__(self):
+        self._category_cells = {}
+
+    def column(self, series):
+        dtype = series.dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            cells = self._category_cells.get(series.name)
+            if cells is None:
+                cells = self._category_cells[series.name] = _string_cells(series.cat.categories.to_numpy(dtype=object))
+            return _pick(cells, series.cat.codes.to_numpy())
+        if pd.api.types.is_bool_dtype(dtype):
+            return pa.array(np.where(series.to_numpy(), '<c t="b"><v>1</v></c>', '<c t="b"><v>0</v></c>'))
+        if pd.api.types.is_numeric_dtype(dtype) and not isinstance(dtype, pd.api.extensions.ExtensionDtype):
+            return _number_cells(series.to_numpy())
+        return _string_cells(series.to_numpy(dtype=object))
+
+
+def _sheet_rows(cells):
+    """UTF-8 XML of the rows whose cells are given column by column."""
+    rows = pc.binary_join_element_wise('<row>', *cells, '</row>', '')
+    return pc.binary_join(pa.ListArray.from_arrays([0, len(rows)], rows), '')[0].as_buffer()
+
+
+def xlsx_chunks(batches, columns):
+    """An XLSX workbook of the batches, one bytes chunk per batch."""
+    sink = _Sink()
+    cells = _SheetCells()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED, compresslevel=XLSX_COMPRESS_LEVEL) as workbook:
+        for name, text in _XLSX_PARTS.items():
+            workbook.writestr(name, text)
+        with workbook.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            header = [_string_cells([column]) for column in columns]
+            sheet.write(_SHEET_START.encode())
+            sheet.write(_sheet_rows(header))
+            yield sink.drain()
+            for frame in batches:
+                sheet.write(_sheet_rows([cells.column(frame[column]) for column in columns]))
+                yield sink.drain()
+            sheet.write(_SHEET_END.encode())
+    yield sink.drain()
+
+
+def export_chunks(df, rows, format_name, fields=None, chunk_size=EXPORT_CHUNK_SIZE, overrides=None):
+    """Bytes chunks of the rows exported in format_name ('csv', 'parquet' or 'xlsx').
+
+    Raises ValueError for unknown formats and for XLSX exports that do not
+    fit one sheet.
+    """
+    columns = list(df.columns) if fields is None else list(fields)
+    if format_name not in FORMATS:
+        raise ValueError(f"Unknown export format: {format_name}")
+    if format_name == 'xlsx' and len(rows) > XLSX_MAX_ROWS:
+        raise ValueError(f"XLSX exports hold at most {XLSX_MAX_ROWS} rows; use csv or parquet")
+    batches = row_batches(df, rows, columns, chunk_size, overrides)
+    if format_name == 'csv':
+        return csv_chunks(batches, arrow_schema(df, columns))
+    if format_name == 'parquet':
+        return parquet_chunks(batches, arrow_schema(df, columns))
+    return xlsx_chunks(batches, columns)
+
+
+class Export:
+    """An export's bytes chunks, measured as they are consumed.
+
+    `bytes` and `seconds` grow while the stream is read; a fully read export
+    is recorded in the export throughput histogram. For a streamed response
+    the time includes waiting on the client.
+    """
+
+    def __init__(self, df, rows, format_name, fields=None, chunk_size=EXPORT_CHUNK_SIZE, overrides=None):
+        self.format = format_name
+        self.media_type = FORMATS.get(format_name)
+        self.rows = len(rows)
+        self.bytes = 0
+        self.seconds = 0.0
+        self._chunks = export_chunks(df, rows, format_name, fields, chunk_size, overrides)
+
+    def __iter__(self):
+        start = time.perf_counter()
+        for chunk in self._chunks:
+            self.bytes += len(chunk)
+            self.seconds = time.perf_counter() - start
+            yield chunk
+        self.seconds = time.perf_counter() - start
+        EXPORT_THROUGHPUT.observe(self.bytes / self.seconds if self.seconds else 0.0, self.format)
+
+    @property
+    def mb_per_second(self):
+        return self.bytes / 1e6 / self.seconds if self.seconds else 0.0
+
+    def write_to(self, file):
+        """Write the whole export to a binary file object; returns self."""
+        for chunk in self:
+            file.write(chunk)
+        return self
@@ -0,0 +1,162 @@
+"""Facet counts (City, Keyword, rating and price buckets) for filtered listings.
+
+Every row gets one small integer per facet: its City or Keyword category
+code, or the bucket its Rating or Price falls in. The facets' codes are
+offset into one shared range and stored as a (facets x rows) array, so
+counting any result set is a single np.bincount over the codes of its rows.
+A missing value has a slot of its own per facet and is reported as that
+facet's `missing` count. The whole dataset's counts are computed once.
+
+Like the other lookup structures, the codes are saved next to the supplier
+index and memory-mapped by every worker.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from supplier_index import derived_index_path, load_arrays, save_arrays
+
+VALUE_FACETS = ['City', 'Keyword']
+
+# Bucket edges: a bucket runs from one edge up to (not including) the next
+RATING_EDGES = [1.0, 2.0, 3.0, 3.5, 4.0, 4.5]
+PRICE_EDGES = [10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+BUCKET_FACETS = {'Rating': RATING_EDGES, 'Price (per Kg)': PRICE_EDGES}
+
+
+def _number(value):
+    return int(value) if float(value).is_integer() else float(value)
+
+
+def bucket_labels(edges):
+    """Display label, lower and upper bound of every bucket (None for open ends)."""
+    bounds = [None] + [_number(edge) for edge in edges] + [None]
+    buckets = []
+    for low, high in zip(bounds[:-1], bounds[1:]):
+        if low is None:
+            label = f"<{high}"
+        elif high is None:
+            label = f"{low}+"
+        else:
+            label = f"{low}-{high}"
+        buckets.append({'value': label, 'min': low, 'max': high})
+    return buckets
+
+
+def _value_codes(series):
+    """Category codes (-1 for missing) and the values they stand for."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy().astype(np.int64), series.cat.categories.tolist()
+    codes, uniques = pd.factorize(series, sort=True)
+    return codes.astype(np.int64), list(uniques)
+
+
+def _bucket_codes(series, edges):
+    values = series.to_numpy(dtype=np.float64)
+    codes = np.searchsorted(np.asarray(edges, dtype=np.float64), values, side='right')
+    return np.where(np.isnan(values), -1, codes)
+
+
+class FacetIndex:
+    def __init__(self, facets, labels, offsets, codes, totals):
+        self.facets = facets      # facet (column) names
+        self.labels = labels      # per facet: values, or bucket dicts for bucket facets
+        self.offsets = offsets    # first slot of every facet, plus the end; each facet's last slot is "missing"
+        self.codes = codes        # (facets x rows) slots
+        self.totals = totals      # slot counts over every row
+
+    @classmethod
+    def build(cls, df, value_facets=VALUE_FACETS, bucket_facets=BUCKET_FACETS):
+        facets, labels, codes = [], [], []
+        for column in value_facets:
+            if column in df.columns:
+                column_codes, values = _value_codes(df[column])
+                facets.append(column)
+                labels.append(values)
+                codes.append(column_codes)
+        for column, edges in bucket_facets.items():
+            if column in df.columns:
+                facets.append(column)
+                labels.append(bucket_labels(edges))
+                codes.append(_bucket_codes(df[column], edges))
+        sizes = [len(facet_labels) + 1 for facet_labels in labels]
+        offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+        dtype = np.uint16 if offsets[-1] <= np.iinfo(np.uint16).max else np.int32
+        slots = np.empty((len(facets), len(df)), dtype=dtype)
+        for i, column_codes in enumerate(codes):
+            # Code -1 (missing) goes to the facet's last slot
+            slots[i] = np.where(column_codes < 0, sizes[i] - 1, column_codes) + offsets[i]
+        return cls(facets, labels, offsets, slots, cls._bincount(slots, offsets[-1]))
+
+    @staticmethod
+    def _bincount(slots, n_slots):
+        return np.bincount(slots.ravel(), minlength=n_slots)
+
+    def save(self, path):
+        """Write the facet codes to directory `path` atomically."""
+        save_arrays(path, {'codes': self.codes, 'offsets': self.offsets, 'totals': self.totals},
+                    {'facets': self.facets, 'labels': self.labels})
+
+    @classmethod
+    def load(cls, path):
+        """Open saved facet codes memory-mapped."""
+        arrays, metadata = load_arrays(path)
+        return cls(metadata['facets'], metadata['labels'], arrays['offsets'], arrays['codes'], arrays['totals'])
+
+    def slot_counts(self, rows=None):
+        """Count of every slot over `rows` (every row when None), in one pass."""
+        if rows is None:
+            return self.totals
+        # take() gathers along the row axis several times faster than [:, rows]
+        return self._bincount(self.codes.take(rows, axis=1), self.offsets[-1])
+
+    def counts(self, rows=None, limit=None):
+        """{facet: {'values': [...], 'missing': n}} over `rows`.
+
+        City and Keyword values come most frequent first (ties in label
+        order), at most `limit` of them; rating and price buckets come in
+        bucket order. Values and buckets with no rows are left out.
+        """
+        slot_counts = self.slot_counts(rows)
+        result = {}
+        for i, facet in enumerate(self.facets):
+            start, end = int(self.offsets[i]), int(self.offsets[i + 1]) - 1
+            facet_counts = slot_counts[start:end]
+            present = np.flatnonzero(facet_counts)
+            if facet in VALUE_FACETS:
+                present = present[np.argsort(-facet_counts[present], kind='stable')][:limit]
+                values = [{'value': self.labels[i][code], 'count': int(facet_counts[code])} for code in present]
+            else:
+                values = [dict(self.labels[i][code], count=int(facet_counts[code])) for code in present]
+            result[facet] = {'values': values, 'missing': int(slot_counts[end])}
+        return result
+
+    def value_counts(self, facet, rows=None):
+        """{value: count} of one value facet over `rows`, in label order."""
+        i = self.facets.index(facet)
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1]) - 1
+        facet_counts = self.slot_counts(rows)[start:end]
+        return {self.labels[i][code]: int(facet_counts[code]) for code in np.flatnonzero(facet_counts)}
+
+
+def value_range(series, rows=None):
+    """(min, max) of a float column over `rows`, or None if all are missing."""
+    values = series.to_numpy()
+    values = values if rows is None else values[rows]
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return None
+    # Through the shortest decimal form, so a float32 4.4 stays 4.4
+    return _number(float(str(values.min()))), _number(float(str(values.max())))
+
+
+def open_facet_index(index_path, df):
+    """Load the facet index of a supplier index, building it from df if it is missing.
+
+    `df` must be the frame read from index_path.
+    """
+    path = derived_index_path(index_path, 'facets', {'values': VALUE_FACETS, 'buckets': BUCKET_FACETS})
+    if not os.path.exists(path):
+        FacetIndex.build(df).save(path)
+    return FacetIndex.load(path)
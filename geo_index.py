@@ -0,0 +1,279 @@
+"""Geocoded locations and a radius/state index over supplier listings.
+
+IndiaMART addresses end in "<place> - <pincode>, Dist.<district>, <state>".
+Each distinct address is geocoded once against the bundled gazetteer
+(india_gazetteer.csv): by place, then district, then the listing's City,
+then the 3-digit pincode prefix (sorting district). Listings with no
+address are geocoded by their City alone. The gazetteer row an
+address resolves to is its location id, and rows are laid out CSR-style per
+location and per state, like the keyword postings.
+
+A radius query finds the matching locations with a k-d tree over the (few)
+gazetteer places, then takes their postings; its cost is the number of
+matching rows, not the size of the dataset. The arrays are saved next to the
+supplier index and memory-mapped.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from supplier_index import (derived_index_path, distinct_values, expand_offsets, file_hash, load_arrays,
+                            merge_postings, save_arrays)
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'india_gazetteer.csv')
+
+EARTH_RADIUS_KM = 6371.0088
+DEFAULT_RADIUS_KM = 50.0
+
+_ADDRESS_PATTERN = (r'(?P<place>[^,]+?)\s*-\s*(?P<pincode>\d{6})\s*'
+                    r'(?:,\s*Dist\.\s*(?P<district>[^,]+?))?\s*(?:,\s*(?P<state>[^,]+?))?\s*$')
+
+
+def _key(values):
+    return values.astype(str).str.lower().str.replace(r'[^a-z0-9]+', ' ', regex=True).str.strip()
+
+
+class Gazetteer:
+    """Place name / pincode prefix -> (latitude, longitude, state)."""
+
+    def __init__(self, places):
+        self.places = places
+        names = pd.concat([
+            pd.DataFrame({'name': places['place'], 'row': np.arange(len(places))}),
+            pd.DataFrame({'name': places['aliases'], 'row': np.arange(len(places))}).dropna(),
+        ])
+        names = names.assign(name=_key(names['name'])).drop_duplicates('name')
+        self.by_name = pd.Series(names['row'].to_numpy(), index=names['name'].to_numpy())
+        prefixes = places['pincode_prefixes'].str.split().explode().dropna()
+        self.by_prefix = pd.Series(prefixes.index.to_numpy(), index=prefixes.to_numpy())
+
+    @classmethod
+    def load(cls, path=GAZETTEER_PATH):
+        return cls(pd.read_csv(path, dtype={'pincode_prefixes': str}))
+
+    def lookup(self, name):
+        """(latitude, longitude) of a place name, or None."""
+        row = self.by_name.get(_key(pd.Series([name]))[0])
+        if row is None:
+            return None
+        return float(self.places['latitude'].iloc[row]), float(self.places['longitude'].iloc[row])
+
+    def geocode(self, addresses, cities=None):
+        """Gazetteer row per address (-1 if unknown) and the address's state.
+
+        `addresses` and `cities` are aligned Series of (distinct) strings.
+        """
+        parts = addresses.astype(str).str.extract(_ADDRESS_PATTERN)
+        rows = pd.Series(-1, index=parts.index)
+        candidates = [parts['place'], parts['district']]
+        if cities is not None:
+            candidates.append(cities.reset_index(drop=True).set_axis(parts.index))
+        for names in candidates:
+            found = _key(names.fillna('')).map(self.by_name)
+            rows = rows.where(rows >= 0, found.fillna(-1).astype(int))
+        found = parts['pincode'].str[:3].map(self.by_prefix)
+        rows = rows.where(rows >= 0, found.fillna(-1).astype(int))
+
+        states = parts['state'].str.strip()
+        known = rows >= 0
+        # Addresses without a state take the gazetteer's
+        states = states.where(states.notna() | ~known,
+                              self.places['state'].reindex(rows.where(known, 0)).set_axis(rows.index))
+        return rows.to_numpy(), states
+
+
+def _unit_vectors(latitude, longitude):
+    lat = np.radians(np.asarray(latitude, dtype=np.float64))
+    lon = np.radians(np.asarray(longitude, dtype=np.float64))
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def _postings(codes, n_codes):
+    """Rows grouped by code: rows of code i are order[offsets[i]:offsets[i + 1]]."""
+    order = np.argsort(codes, kind='stable').astype(np.int32)
+    offsets = np.searchsorted(codes[order], np.arange(n_codes + 1))
+    return order, offsets
+
+
+class GeoIndex:
+    def __init__(self, arrays, states, n_rows):
+        self.location_codes = arrays['location_codes']    # location id per row, -1 if unknown
+        self.latitude = arrays['latitude']                # per location id
+        self.longitude = arrays['longitude']
+        self.location_order = arrays['location_order']
+        self.location_offsets = arrays['location_offsets']
+        self.state_codes = arrays['state_codes']          # index into states per row, -1 if unknown
+        self.state_order = arrays['state_order']
+        self.state_offsets = arrays['state_offsets']
+        self.states = states
+        self.state_lookup = {state.lower(): i for i, state in enumerate(states)}
+        self.n_rows = n_rows
+        self.tree = cKDTree(_unit_vectors(self.latitude, self.longitude)) if len(self.latitude) else None
+
+    @classmethod
+    def build(cls, df, gazetteer=None):
+        gazetteer = gazetteer or Gazetteer.load()
+        # Geocode each distinct address once; the location id of a listing is
+        # the gazetteer row its address resolved to
+        address_codes, addresses = distinct_values(df['Address'])
+        first_rows = pd.Series(np.arange(len(df))).groupby(address_codes).first()
+        cities = df['City'].iloc[first_rows[first_rows.index >= 0].to_numpy()].astype(object)
+        # Rows without an address are geocoded once per distinct City, as an
+        # empty address after the real ones
+        address_codes = address_codes.astype(np.int64)
+        missing = np.flatnonzero(address_codes < 0)
+        city_codes, missing_cities = distinct_values(df['City'].iloc[missing].astype(object))
+        address_codes[missing] = np.where(city_codes >= 0, city_codes + len(addresses), -1)
+        addresses = np.concatenate([addresses, [''] * len(missing_cities)])
+        cities = pd.concat([cities, pd.Series(missing_cities, dtype=object)])
+        places, address_states = gazetteer.geocode(pd.Series(addresses, dtype=object), cities)
+        state_of_address, states = pd.factorize(address_states.str.title(), sort=True)
+
+        def per_row(values):
+            return np.append(values, -1)[address_codes].astype(np.int32)
+
+        location_codes = per_row(places)
+        state_codes = per_row(state_of_address)
+        arrays = {
+            'location_codes': location_codes,
+            'latitude': gazetteer.places['latitude'].to_numpy(dtype=np.float64),
+            'longitude': gazetteer.places['longitude'].to_numpy(dtype=np.float64),
+            'state_codes': state_codes,
+        }
+        arrays['location_order'], arrays['location_offsets'] = _postings(location_codes, len(gazetteer.places))
+        arrays['state_order'], arrays['state_offsets'] = _postings(state_codes, len(states))
+        return cls(arrays, list(states), len(df))
+
+    def append(self, df, gazetteer=None):
+        """The index of this index's rows followed by df's; only df is geocoded."""
+        other = GeoIndex.build(df, gazetteer)
+        states = sorted(set(self.states) | set(other.states))
+        arrays = {
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'location_codes': np.concatenate([self.location_codes, other.location_codes]),
+        }
+        positions = [np.searchsorted(np.array(states, dtype=object), index.states).astype(np.int64)
+                     for index in (self, other)]
+        arrays['state_codes'] = np.concatenate([np.append(p, -1)[index.state_codes]
+                                                for p, index in zip(positions, (self, other))]).astype(np.int32)
+
+        def merged(index_positions, n_codes, order, offsets):
+            # Rows of unknown code (-1) lead each order; they get key 0 here
+            expanded = [expand_offsets(np.concatenate([[0], getattr(index, offsets)]),
+                                       np.concatenate([[0], p + 1]), n_codes + 1)
+                        for index, p in zip((self, other), index_positions)]
+            merged_offsets, rows = merge_postings(expanded[0], getattr(self, order),
+                                                  expanded[1], getattr(other, order) + self.n_rows)
+            return rows.astype(np.int32), merged_offsets[1:]
+
+        locations = np.arange(len(self.latitude))
+        arrays['location_order'], arrays['location_offsets'] = merged(
+            [locations, locations], len(locations), 'location_order', 'location_offsets')
+        arrays['state_order'], arrays['state_offsets'] = merged(positions, len(states), 'state_order', 'state_offsets')
+        return GeoIndex(arrays, states, self.n_rows + len(df))
+
+    def save(self, path):
+        """Write the arrays to directory `path` atomically."""
+        arrays = {name: getattr(self, name) for name in (
+            'location_codes', 'latitude', 'longitude', 'location_order', 'location_offsets',
+            'state_codes', 'state_order', 'state_offsets')}
+        save_arrays(path, arrays, {'states': self.states, 'n_rows': self.n_rows})
+
+    @classmethod
+    def load(cls, path):
+        """Open saved arrays memory-mapped read-only."""
+        arrays, metadata = load_arrays(path)
+        return cls(arrays, metadata['states'], metadata['n_rows'])
+
+    def _rows_of(self, order, offsets, codes):
+        rows = [order[offsets[code]:offsets[code + 1]] for code in codes]
+        if not rows:
+            return np.empty(0, dtype=np.int32)
+        # Each slice is already in row order; only a union of several needs sorting
+        return rows[0] if len(rows) == 1 else np.sort(np.concatenate(rows))
+
+    def locations_near(self, latitude, longitude, radius_km):
+        """Location ids within radius_km (great-circle) of a point."""
+        if self.tree is None:
+            return np.empty(0, dtype=np.int64)
+        # Great-circle distance d <-> chord length 2 sin(d / 2R) on the unit sphere
+        chord = 2 * np.sin(min(radius_km / EARTH_RADIUS_KM, np.pi) / 2)
+        return np.sort(self.tree.query_ball_point(_unit_vectors([latitude], [longitude])[0], chord))
+
+    def near(self, latitude, longitude, radius_km):
+        """Sorted row ids within radius_km of a point."""
+        return self._rows_of(self.location_order, self.location_offsets,
+                             self.locations_near(latitude, longitude, radius_km))
+
+    def near_mask(self, rows, latitude, longitude, radius_km):
+        """Boolean mask of which of `rows` lie within radius_km of a point."""
+        matched = np.zeros(len(self.latitude) + 1, dtype=bool)  # last slot: unknown location
+        matched[self.locations_near(latitude, longitude, radius_km)] = True
+        return matched[self.location_codes[rows]]
+
+    def state_code(self, state):
+        return self.state_lookup.get(' '.join(str(state).lower().split()), -1)
+
+    def in_state(self, state):
+        """Sorted row ids whose address is in `state` (case-insensitive)."""
+        code = self.state_code(state)
+        return self._rows_of(self.state_order, self.state_offsets, [code] if code >= 0 else [])
+
+    def state_mask(self, rows, state):
+        """Boolean mask of which of `rows` are in `state`."""
+        code = self.state_code(state)
+        if code < 0:
+            return np.zeros(len(rows), dtype=bool)
+        return self.state_codes[rows] == code
+
+
+def parse_near(near, radius_km=None, gazetteer=None):
+    """(latitude, longitude, radius_km) from `near=lat,lon` or `near=<place>`.
+
+    Raises ValueError for unknown places, out-of-range coordinates or a
+    negative radius.
+    """
+    radius_km = DEFAULT_RADIUS_KM if radius_km is None else float(radius_km)
+    if not radius_km >= 0:
+        raise ValueError("'radius_km' must be a non-negative number")
+    parts = near.split(',')
+    try:
+        latitude, longitude = (float(part) for part in parts)
+    except ValueError:
+        point = (gazetteer or _default_gazetteer()).lookup(near)
+        if point is None:
+            raise ValueError(f"Unknown place for 'near': {near}")
+        latitude, longitude = point
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError("'near' must be 'latitude,longitude' in degrees or a place name")
+    return latitude, longitude, radius_km
+
+
+_gazetteer = None
+
+
+def _default_gazetteer():
+    global _gazetteer
+    if _gazetteer is None:
+        _gazetteer = Gazetteer.load()
+    return _gazetteer
+
+
+def geo_index_path(index_path):
+    # A changed gazetteer re-geocodes every index
+    return derived_index_path(index_path, 'geo', {'gazetteer': file_hash(GAZETTEER_PATH)})
+
+
+def open_geo_index(index_path, df):
+    """Load the geo index for a supplier index, geocoding df if it is missing.
+
+    `df` must be the frame read from index_path.
+    """
+    path = geo_index_path(index_path)
+    if not os.path.exists(path):
+        GeoIndex.build(df).save(path)
+    return GeoIndex.load(path)
+
@@ -0,0 +1,169 @@
+"""Incremental ingestion of new IndiaMART crawl batches.
+
+    python ingest.py new_crawl.csv [more.jsonl ...] [--csv BASE_CSV] [--preset api]
+
+Each batch file (CSV, or JSON Lines with the same column names) is read in
+chunks. Every chunk has Price/Rating coerced like load_data(), is
+deduplicated against the listings already served (normalized Product URL +
+Company), and only the new rows are scored. The per-Keyword/City price
+statistics are updated with each chunk rather than recomputed, and new rows
+are priced against them. Only the new rows are written, as an immutable
+segment file extending the served index (see supplier_index.index_files),
+and the preset's pointer is moved to it; running APIs notice the pointer
+and hot-swap (see live_dataset.py). Duplicates are found through the saved
+listing ids of the served index, never by re-reading its listings.
+
+The search, geo and TF-IDF indexes of a segment are the served ones with
+only the new rows appended (TF-IDF keeps its fitted vocabulary and IDF
+weights). The sort, facet and company indexes depend on every row and are
+rebuilt here, once, so serving processes only ever load them. After
+MAX_SEGMENTS files the index is compacted instead: the served rows and the
+new ones are written as a single file with no 'previous', and everything
+derived from it is rebuilt.
+"""
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from geo_index import geo_index_path
+from listing_ids import ListingIds, hash_keys, listing_ids_path, listing_keys
+from live_dataset import SupplierData
+from price_stats import PriceStats, price_stats_path
+from scoring import SCORING_PRESETS, SCORING_WEIGHTS
+from search_index import search_index_path
+from semantic_search import tfidf_index_path
+from supplier_index import (INDEX_DIR, coerce_types, compact_frame, concat_compact, current_index_path,
+                            ensure_index, file_hash, index_files, index_metadata, read_index, reprice_frame,
+                            score_frame, set_current_index, write_index)
+
+CHUNK_SIZE = 50_000
+# Files an index may be made of before ingest compacts it into one
+MAX_SEGMENTS = int(os.environ.get('SUPPLIER_MAX_SEGMENTS', 8))
+
+SOURCE_COLUMNS = ['Keyword', 'Product Name', 'Price (per Kg)', 'Product URL', 'Company',
+                  'Company URL', 'City', 'Address', 'Rating', 'Phone']
+
+
+def read_batches(path, chunk_size=CHUNK_SIZE):
+    """Yield DataFrame chunks of a crawl file with the source columns."""
+    if path.endswith(('.jsonl', '.ndjson')):
+        reader = pd.read_json(path, lines=True, chunksize=chunk_size, dtype=False)
+    else:
+        reader = pd.read_csv(path, chunksize=chunk_size)
+    with reader:
+        for chunk in reader:
+            yield chunk.reindex(columns=SOURCE_COLUMNS)
+
+
+def align_frame(frame, schema):
+    """frame with each column typed like the served index's, so the files read as one table.
+
+    A chunk types its columns from its own values: one with no phone numbers
+    reads Phone as float, one with only digits reads it as integers.
+    """
+    frame = frame.copy()
+    for field in schema:
+        if field.name not in frame or isinstance(frame[field.name].dtype, pd.CategoricalDtype):
+            continue
+        column = frame[field.name]
+        if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            frame[field.name] = column.astype(object).where(column.isna(), column.astype(str))
+        elif pa.types.is_integer(field.type) or pa.types.is_floating(field.type):
+            frame[field.name] = pd.to_numeric(column, errors='coerce')
+    return frame
+
+
+def ingest(batch_paths, csv_path, preset='api', weights=SCORING_WEIGHTS, index_dir=INDEX_DIR,
+           chunk_size=CHUNK_SIZE, max_segments=MAX_SEGMENTS):
+    """Append the new listings of batch_paths to the served index.
+
+    Returns (path of the index now served, stats dict).
+    """
+    base_path = ensure_index(csv_path, preset, weights, index_dir)
+    current_path = current_index_path(csv_path, preset, weights, index_dir)
+    # What the APIs serve; an index ingest wrote already has all of it on disk
+    served = SupplierData(current_path)
+    served_ids = served.listing_ids
+    price_stats = served.price_stats
+
+    stats = {'read': 0, 'duplicates': 0, 'added': 0}
+    new_frames, new_ids = [], []
+    for batch_path in batch_paths:
+        for chunk in read_batches(batch_path, chunk_size):
+            stats['read'] += len(chunk)
+            # The first listing with a key has the key's plain hash as its id
+            ids = hash_keys(listing_keys(chunk).tolist())
+            fresh = ((served_ids.rows_of(ids) < 0) & ~pd.Series(ids).duplicated().to_numpy()
+                     & ~np.isin(ids, np.concatenate(new_ids or [ids[:0]])))
+            new_ids.append(ids[fresh])
+            chunk = coerce_types(chunk[fresh].reset_index(drop=True))
+            stats['duplicates'] += int((~fresh).sum())
+            if chunk.empty:
+                continue
+            price_stats = price_stats.merge(PriceStats.build(chunk))
+            # Only the new rows are scored
+            chunk = score_frame(chunk, weights, price_stats, **SCORING_PRESETS[preset])
+            new_frames.append(compact_frame(chunk))
+            stats['added'] += len(chunk)
+
+    if not new_frames:
+        return current_path, stats
+
+    digest = hashlib.sha256(os.path.basename(current_path).encode())
+    for batch_path in batch_paths:
+        digest.update(file_hash(batch_path).encode())
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    path = os.path.join(index_dir, f"{stem}-{preset}-{digest.hexdigest()[:16]}.arrow")
+
+    metadata = index_metadata(current_path)
+    ingested = json.loads(metadata.get('ingested', '[]'))
+    ingested += [{'path': os.path.abspath(p), 'sha256': file_hash(p)} for p in batch_paths]
+    metadata['ingested'] = json.dumps(ingested)
+    schema = pa.ipc.open_file(pa.memory_map(current_path, 'r')).schema
+    segment = concat_compact([align_frame(frame, schema) for frame in new_frames])
+    if len(index_files(current_path)) >= max_segments:
+        metadata.pop('previous', None)
+        # Relative prices are scored against every row, old and new
+        frame = concat_compact([read_index(current_path, components=True), segment])
+        write_index(reprice_frame(frame, weights, **SCORING_PRESETS[preset]), path, metadata)
+    else:
+        metadata['previous'] = os.path.basename(current_path)
+        write_index(segment, path, metadata)
+        served.search_index.append(segment).save(search_index_path(path))
+        served.geo_index.append(segment).save(geo_index_path(path))
+        served.tfidf_index.append(segment).save(tfidf_index_path(path))
+    # New keys are unique, so their ids are what a rebuild would assign
+    ids = np.concatenate([served_ids.ids] + new_ids)
+    ListingIds.from_ids(ids).save(listing_ids_path(path))
+    price_stats.save(price_stats_path(path))
+    # Build what is left before the APIs are pointed at the new index
+    SupplierData(path)
+    set_current_index(csv_path, preset, base_path, path, index_dir)
+    return path, stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Append new crawl batches to the served supplier index.")
+    parser.add_argument('batches', nargs='+', help="CSV or JSONL crawl files")
+    parser.add_argument('--csv', default="indiamart_casting_data_cleaned_no_missing_prices.csv",
+                        help="base CSV the served index was built from")
+    parser.add_argument('--index-dir', default=INDEX_DIR)
+    parser.add_argument('--preset', choices=sorted(SCORING_PRESETS), action='append',
+                        help="scoring preset to update (default: all)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    for preset in args.preset or sorted(SCORING_PRESETS):
+        path, stats = ingest(args.batches, args.csv, preset, index_dir=args.index_dir,
+                             chunk_size=args.chunk_size)
+        print(f"{preset}: read {stats['read']}, skipped {stats['duplicates']} duplicates, "
+              f"added {stats['added']} -> {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+"""Per-request stage timings, Prometheus metrics and a sampling profiler.
+
+Handlers mark their stages with
+
+    with stage('filter'):
+        rows = filter_rows(...)
+
+Each request is bracketed by begin_request() and end_request(). end_request()
+adds the request's stages to the histograms rendered by render_metrics() and
+returns the Server-Timing header value (`filter;dur=1.234, ...`). Outside a
+request, stage() does nothing.
+
+Allocated bytes are tracked per stage with tracemalloc when
+SUPPLIER_TRACE_ALLOCATIONS=1. It slows every allocation, so it is off by
+default. Its counters are process-wide, so concurrent requests blur each
+other's figures.
+
+The sampling profiler runs for requests with ?trace=1, or for every request
+when SUPPLIER_PROFILE_SLOW_MS is set. A background thread samples the
+request thread's stack every SAMPLE_INTERVAL seconds. Requests at least that
+slow (any ?trace=1 request) are written to SUPPLIER_PROFILE_DIR as collapsed
+stacks, one `frame;frame;frame count` line per distinct stack. That is the
+input format of flamegraph.pl, inferno and speedscope.
+"""
+import contextvars
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+TRACK_ALLOCATIONS = os.environ.get('SUPPLIER_TRACE_ALLOCATIONS', '') not in ('', '0')
+PROFILE_SLOW_MS = os.environ.get('SUPPLIER_PROFILE_SLOW_MS')
+PROFILE_SLOW_MS = float(PROFILE_SLOW_MS) if PROFILE_SLOW_MS else None
+PROFILE_DIR = os.environ.get(
+    'SUPPLIER_PROFILE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'flamegraphs'))
+SAMPLE_INTERVAL = float(os.environ.get('SUPPLIER_PROFILE_INTERVAL', 0.001))
+
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = tuple(1024 * 4 ** i for i in range(11))    # 1 KiB .. 1 GiB
+THROUGHPUT_BUCKETS = tuple(1e6 * 2 ** i for i in range(11))  # 1 MB/s .. 1 GB/s
+
+if TRACK_ALLOCATIONS and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+_current = contextvars.ContextVar('request_trace', default=None)
+
+
+class Histogram:
+    """Prometheus histogram with labels, rendered in the text exposition format."""
+
+    def __init__(self, name, help, label_names, buckets):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}      # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for labels, values in series:
+            label_text = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels))
+            for bound, count in zip(self.buckets, values):
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound:g}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {values[-1]}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {values[-2]:.9g}')
+            lines.append(f'{self.name}_count{{{label_text}}} {values[-1]}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REQUEST_DURATION = Histogram('supplier_request_duration_seconds', 'Time spent handling a request.',
+                             ('endpoint', 'status'), DURATION_BUCKETS)
+STAGE_DURATION = Histogram('supplier_stage_duration_seconds', 'Time spent in one stage of a request.',
+                           ('endpoint', 'stage'), DURATION_BUCKETS)
+STAGE_ALLOCATED = Histogram('supplier_stage_allocated_bytes',
+                            'Peak bytes allocated in one stage of a request (SUPPLIER_TRACE_ALLOCATIONS).',
+                            ('endpoint', 'stage'), BYTES_BUCKETS)
+EXPORT_THROUGHPUT = Histogram('supplier_export_throughput_bytes_per_second',
+                              'Bytes per second of finished exports (see export.py).',
+                              ('format',), THROUGHPUT_BUCKETS)
+METRICS = [REQUEST_DURATION, STAGE_DURATION, STAGE_ALLOCATED, EXPORT_THROUGHPUT]
+
+
+def render_metrics():
+    """Every metric in the Prometheus text format."""
+    return '\n'.join(line for metric in METRICS for line in metric.render()) + '\n'
+
+
+class StackSampler:
+    """Counts one thread's call stacks, sampled from a background thread."""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def dump(self, path):
+        """Write the samples as collapsed stacks."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class RequestTrace:
+    def __init__(self, endpoint, sample=False, slow_ms=None):
+        self.endpoint = endpoint
+        self.stages = []       # (name, seconds, allocated bytes or None)
+        self.slow_ms = slow_ms
+        self.sampler = StackSampler(threading.get_ident()) if sample else None
+        self.profile_path = None
+        self.start = time.perf_counter()
+
+
+def begin_request(endpoint, trace=False):
+    """Start tracing the current request; trace=True forces a profile dump."""
+    sample = trace or PROFILE_SLOW_MS is not None
+    request_trace = RequestTrace(endpoint, sample, 0 if trace else PROFILE_SLOW_MS)
+    _current.set(request_trace)
+    return request_trace
+
+
+@contextmanager
+def stage(name):
+    """Time (and with allocation tracking, measure) a block of the current request."""
+    request_trace = _current.get()
+    if request_trace is None:
+        yield
+        return
+    if TRACK_ALLOCATIONS:
+        tracemalloc.reset_peak()
+        allocated_before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        allocated = tracemalloc.get_traced_memory()[1] - allocated_before if TRACK_ALLOCATIONS else None
+        request_trace.stages.append((name, seconds, allocated))
+
+
+def end_request(request_trace, status):
+    """Record a finished request; returns its Server-Timing header value."""
+    _current.set(None)
+    seconds = time.perf_counter() - request_trace.start
+    REQUEST_DURATION.observe(seconds, request_trace.endpoint, str(status))
+    timings = []
+    for name, stage_seconds, allocated in request_trace.stages:
+        STAGE_DURATION.observe(stage_seconds, request_trace.endpoint, name)
+        timing = f"{name};dur={stage_seconds * 1000:.3f}"
+        if allocated is not None:
+            STAGE_ALLOCATED.observe(allocated, request_trace.endpoint, name)
+            timing += f';desc="{allocated} B"'
+        timings.append(timing)
+    timings.append(f"total;dur={seconds * 1000:.3f}")
+
+    sampler = request_trace.sampler
+    if sampler is not None:
+        sampler.stop()
+        if seconds * 1000 >= request_trace.slow_ms:
+            request_trace.profile_path = os.path.join(
+                PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{request_trace.endpoint}-"
+                             f"{seconds * 1000:.0f}ms-{threading.get_ident()}.folded")
+            sampler.dump(request_trace.profile_path)
+    return ', '.join(timings)
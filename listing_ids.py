@@ -0,0 +1,113 @@
+"""Stable listing ids.
+
+A listing's id is a 53-bit hash of its dedupe key (listing_keys():
+normalized Product URL + Company). Rebuilding the index, re-crawling or
+ingesting new batches moves rows around but leaves every listing's id
+unchanged. 53 bits keep ids exact as JSON numbers in JavaScript clients.
+Repeated keys within one dataset are told apart by their occurrence number.
+
+The ids, their sort order and the ids in that order are saved next to the
+supplier index and memory-mapped; looking up many ids is one searchsorted
+on the mapped sorted ids.
+"""
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from supplier_index import derived_index_path, load_arrays, save_arrays, split_url
+
+ID_COLUMN = 'Listing ID'
+ID_BITS = 53
+
+
+def normalize_url(urls):
+    """Canonical URL without tracking query, scheme, 'www.' or trailing slash."""
+    canonical, _ = split_url(urls.astype(str).where(urls.notna()))
+    return (canonical.str.lower().str.strip()
+            .str.replace(r'^[a-z]+://(www\.)?', '', regex=True)
+            .str.rstrip('/'))
+
+
+def normalize_company(names):
+    """Lowercased company name with punctuation and extra whitespace removed."""
+    return (names.astype(str).where(names.notna()).str.lower()
+            .str.replace(r'[^\w]+', ' ', regex=True).str.strip())
+
+
+def listing_keys(df):
+    """Dedupe key per listing: normalized Product URL + normalized Company."""
+    return (normalize_url(df['Product URL']).fillna('') + '\x1f'
+            + normalize_company(df['Company']).fillna('')).reset_index(drop=True)
+
+
+def hash_keys(keys):
+    """53-bit id of each key string."""
+    mask = (1 << ID_BITS) - 1
+    return np.fromiter((int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big') & mask
+                        for key in keys), dtype=np.int64, count=len(keys))
+
+
+def listing_ids(df):
+    """Stable id of every listing in df."""
+    keys = listing_keys(df)
+    occurrence = keys.groupby(keys, sort=False).cumcount()
+    repeated = (occurrence > 0).to_numpy()
+    keys = keys.where(~repeated, keys + '\x1f' + occurrence.astype(str))
+    return hash_keys(keys.tolist())
+
+
+class ListingIds:
+    def __init__(self, ids, order, sorted_ids):
+        self.ids = ids                  # id of every row
+        self.order = order              # rows in id order
+        self.sorted_ids = sorted_ids    # ids[order]
+
+    @classmethod
+    def from_ids(cls, ids):
+        order = np.argsort(ids, kind='stable')
+        return cls(ids, order, ids[order])
+
+    @classmethod
+    def build(cls, df):
+        return cls.from_ids(listing_ids(df))
+
+    def save(self, path):
+        """Write the ids to directory `path` atomically."""
+        save_arrays(path, {'ids': self.ids, 'order': self.order, 'sorted_ids': self.sorted_ids},
+                    {'bits': ID_BITS})
+
+    @classmethod
+    def load(cls, path):
+        """Open saved ids memory-mapped."""
+        arrays, _ = load_arrays(path)
+        return cls(arrays['ids'], arrays['order'], arrays['sorted_ids'])
+
+    def rows_of(self, ids):
+        """Positional row of each id, -1 for unknown ids."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(self.ids):
+            return np.full(len(ids), -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.sorted_ids, ids), len(self.sorted_ids) - 1)
+        return np.where(self.sorted_ids[positions] == ids, self.order[positions], -1)
+
+    def series(self, index):
+        """The ids as a column aligned with a frame's index."""
+        return pd.Series(self.ids, index=index, name=ID_COLUMN)
+
+
+def listing_ids_path(index_path):
+    return derived_index_path(index_path, 'ids', {
+        'bits': ID_BITS, 'key': ['Product URL', 'Company'], 'arrays': ['ids', 'order', 'sorted_ids']})
+
+
+def open_listing_ids(index_path, df):
+    """Load the listing ids of a supplier index, computing them from df if missing.
+
+    `df` must be the frame read from index_path.
+    """
+    path = listing_ids_path(index_path)
+    if not os.path.exists(path):
+        ListingIds.build(df).save(path)
+    return ListingIds.load(path)
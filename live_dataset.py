@@ -0,0 +1,108 @@
+"""Hot-swappable serving dataset for the supplier API.
+
+SupplierData bundles one index file with everything derived from it (search,
+sort, TF-IDF, geo, company and facet indexes, price statistics, profile
+scores, score explanations and listing ids). LiveDataset holds the bundle
+currently being served and polls the index pointer that ingest.py moves;
+when it changes, a new bundle is built on a background thread and swapped in
+with a single reference assignment. Requests keep using whichever bundle
+they started with, so nothing is served half-loaded and nothing stops
+serving.
+"""
+import os
+import threading
+import time
+import traceback
+
+from company_index import open_company_index
+from facets import open_facet_index
+from geo_index import open_geo_index
+from listing_ids import ID_COLUMN, open_listing_ids
+from price_stats import open_price_stats
+from score_explanations import open_score_explanations
+from scoring_profiles import ProfileScores
+from search_index import open_search_index
+from semantic_search import open_tfidf_index
+from serialization import RecordEncoder
+from sort_index import open_sort_index
+from supplier_index import current_index_path, read_components, read_index
+
+DEFAULT_POLL_INTERVAL = float(os.environ.get('SUPPLIER_INDEX_POLL_INTERVAL', 2.0))
+
+
+class SupplierData:
+    """One immutable index file plus its derived lookup structures."""
+
+    def __init__(self, path):
+        self.path = path
+        # The file name encodes the data and scoring options it was built from
+        self.version = os.path.basename(path)
+        self.df = read_index(path)
+        self.df['Price (per Kg)'] = self.df['Price (per Kg)'].fillna(0)  # Missing prices are served as 0
+        self.search_index = open_search_index(path, self.df)
+        self.sort_index = open_sort_index(path, self.df)
+        self.tfidf_index = open_tfidf_index(path, self.df)
+        self.geo_index = open_geo_index(path, self.df)
+        self.company_index = open_company_index(path, self.df)
+        self.price_stats = open_price_stats(path, self.df)
+        self.facet_index = open_facet_index(path, self.df)
+        # Supplier Scores under the scoring profiles, from the stored components
+        self.profile_scores = ProfileScores(read_components(path), self.df, self.price_stats)
+        # What raised each stored component score (see score_explanations.py)
+        self.explanations = open_score_explanations(path, self.df)
+        # Stable ids, served with every record (see listing_ids.py)
+        self.listing_ids = open_listing_ids(path, self.df)
+        self.df[ID_COLUMN] = self.listing_ids.ids
+        # JSON encoder with this dataset's category fragments and row cache
+        self.encoder = RecordEncoder(self.df)
+
+
+class LiveDataset:
+    def __init__(self, csv_path, preset='api', load=SupplierData, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.csv_path = csv_path
+        self.preset = preset
+        self.load = load
+        self.poll_interval = poll_interval
+        self._current = load(current_index_path(csv_path, preset))
+        self._checked_at = time.monotonic()
+        self._checking = False
+        self._lock = threading.Lock()
+
+    @property
+    def current(self):
+        """The bundle to serve; may start a check for a newer one in the background."""
+        with self._lock:
+            due = not self._checking and time.monotonic() - self._checked_at >= self.poll_interval
+        if due:
+            self.check_for_update()
+        return self._current
+
+    def check_for_update(self, wait=False):
+        """Look for a newer index on a background thread and swap it in.
+
+        Returns False if a check is already running.
+        """
+        with self._lock:
+            if self._checking:
+                return False
+            self._checking = True
+        thread = threading.Thread(target=self._reload, daemon=True)
+        thread.start()
+        if wait:
+            thread.join()
+        return True
+
+    def _reload(self):
+        try:
+            # Resolving the path hashes the CSV, and builds a fresh index when
+            # the CSV changed, so it never runs on a request thread
+            path = current_index_path(self.csv_path, self.preset)
+            if path != self._current.path:
+                self._current = self.load(path)
+        except Exception:
+            # Keep serving the old bundle; the next poll will retry
+            traceback.print_exc()
+        finally:
+            with self._lock:
+                self._checking = False
+                self._checked_at = time.monotonic()
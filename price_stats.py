@@ -0,0 +1,243 @@
+"""Per-Keyword and per-City price statistics.
+
+For every Keyword and every City the index keeps the count, mean, sum of
+squared deviations, min and max of its prices, plus a histogram over fixed
+log-spaced price bins (BINS_PER_DECADE per factor of ten). All of these
+merge exactly, so a new crawl batch is folded in without rescanning the
+listings already served (see ingest.py). Quantiles are read off the
+histograms, and z-scores follow from the mean and deviation, so
+category-relative price lookups are O(1) per listing.
+
+Missing prices (NaN, or 0 as served) are left out.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from scoring import relative_price_score
+from supplier_index import derived_index_path, load_arrays, save_arrays
+
+# stats dimension -> column it groups by
+DIMENSIONS = {'keyword': 'Keyword', 'city': 'City'}
+
+QUANTILES = [0.1, 0.25, 0.5, 0.75, 0.9]
+
+# Prices below 10**MIN_DECADE or above 10**MAX_DECADE fall in the end bins
+BINS_PER_DECADE = 50
+MIN_DECADE, MAX_DECADE = 0, 5
+BIN_EDGES = np.logspace(MIN_DECADE, MAX_DECADE, (MAX_DECADE - MIN_DECADE) * BINS_PER_DECADE + 1)
+N_BINS = len(BIN_EDGES) - 1
+
+DEFAULT_HISTOGRAM_BINS = 10
+
+_FIELDS = ['count', 'mean', 'm2', 'minimum', 'maximum', 'histogram', 'quantiles']
+
+
+def price_bins(prices):
+    """Fine histogram bin of each price."""
+    return np.clip(np.searchsorted(BIN_EDGES, prices, side='right') - 1, 0, N_BINS - 1)
+
+
+def _widen(values):
+    # Shortest-decimal widening of float32, as in supplier_query.frame_records
+    values = np.asarray(values)
+    if values.dtype == np.float32:
+        # Widen each distinct price once
+        codes, uniques = pd.factorize(values)
+        return np.append(uniques.astype(str).astype(np.float64), np.nan)[codes]
+    return pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=np.float64)
+
+
+class GroupStats:
+    """Price statistics of the groups (distinct values) of one column."""
+
+    def __init__(self, names, count, mean, m2, minimum, maximum, histogram, quantiles=None):
+        self.names = list(names)
+        self.lookup = pd.Index(self.names)
+        self.count = count
+        self.mean = mean
+        self.m2 = m2                  # sum of squared deviations from the mean
+        self.minimum = minimum
+        self.maximum = maximum
+        self.histogram = histogram    # (groups, N_BINS) counts
+        self.quantiles = self._quantiles() if quantiles is None else quantiles
+
+    @classmethod
+    def build(cls, values, prices):
+        prices = _widen(prices)
+        if isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype):
+            codes, names = values.cat.codes.to_numpy(), values.cat.categories.to_numpy(dtype=object)
+        else:
+            codes, names = pd.factorize(np.asarray(values, dtype=object), sort=True)
+        valid = (prices > 0) & (codes >= 0)
+        # Keep only the groups that have a price
+        used, codes = np.unique(codes[valid], return_inverse=True)
+        names = names[used]
+        prices = prices[valid]
+        n_groups = len(names)
+
+        count = np.bincount(codes, minlength=n_groups).astype(np.int64)
+        mean = np.bincount(codes, prices, minlength=n_groups) / np.maximum(count, 1)
+        m2 = np.bincount(codes, (prices - mean[codes]) ** 2, minlength=n_groups)
+        minimum = np.full(n_groups, np.inf)
+        np.minimum.at(minimum, codes, prices)
+        maximum = np.full(n_groups, -np.inf)
+        np.maximum.at(maximum, codes, prices)
+        histogram = np.bincount(codes * N_BINS + price_bins(prices),
+                                minlength=n_groups * N_BINS).reshape(n_groups, N_BINS)
+        return cls(names, count, mean, m2, minimum, maximum, histogram)
+
+    def merge(self, other):
+        """Statistics of both sets of prices together (Chan et al.'s parallel update)."""
+        names = self.lookup.union(other.lookup)
+
+        def aligned(stats, values, fill):
+            result = np.full((len(names),) + values.shape[1:], fill, dtype=values.dtype)
+            result[names.get_indexer(stats.lookup)] = values
+            return result
+
+        count_a, count_b = aligned(self, self.count, 0), aligned(other, other.count, 0)
+        mean_a, mean_b = aligned(self, self.mean, 0.0), aligned(other, other.mean, 0.0)
+        count = count_a + count_b
+        delta = mean_b - mean_a
+        safe_count = np.maximum(count, 1)
+        mean = mean_a + delta * count_b / safe_count
+        m2 = (aligned(self, self.m2, 0.0) + aligned(other, other.m2, 0.0)
+              + delta ** 2 * count_a * count_b / safe_count)
+        return GroupStats(
+            names, count, mean, m2,
+            np.minimum(aligned(self, self.minimum, np.inf), aligned(other, other.minimum, np.inf)),
+            np.maximum(aligned(self, self.maximum, -np.inf), aligned(other, other.maximum, -np.inf)),
+            aligned(self, self.histogram, 0) + aligned(other, other.histogram, 0))
+
+    @property
+    def std(self):
+        return np.sqrt(self.m2 / np.maximum(self.count, 1))
+
+    def _quantiles(self):
+        """(groups, len(QUANTILES)) prices, interpolated log-linearly within a bin."""
+        result = np.full((len(self.names), len(QUANTILES)), np.nan)
+        if not len(self.names):
+            return result
+        cumulative = np.cumsum(self.histogram, axis=1)
+        groups = np.arange(len(self.names))
+        for i, q in enumerate(QUANTILES):
+            target = q * self.count
+            bins = np.argmax(cumulative >= target[:, None], axis=1)
+            in_bin = self.histogram[groups, bins]
+            fraction = (target - (cumulative[groups, bins] - in_bin)) / np.maximum(in_bin, 1)
+            values = BIN_EDGES[bins] * (BIN_EDGES[bins + 1] / BIN_EDGES[bins]) ** fraction
+            result[:, i] = np.clip(values, self.minimum, self.maximum)
+        result[self.count == 0] = np.nan
+        return result
+
+    def groups_of(self, values):
+        """Group id of each value, -1 for values without priced listings."""
+        if isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype):
+            # Look up each category once
+            groups = self.lookup.get_indexer(values.cat.categories.to_numpy(dtype=object))
+            return np.append(groups, -1)[values.cat.codes.to_numpy()]
+        return self.lookup.get_indexer(np.asarray(values, dtype=object))
+
+    def _lookup(self, values, prices):
+        """(price, group mean, group std) per listing; NaN for unknown groups or prices."""
+        groups = self.groups_of(values)
+        prices = _widen(prices)
+        # The extra last slot is what group -1 (unknown) picks
+        mean = np.append(self.mean, np.nan)[groups]
+        std = np.append(self.std, np.nan)[groups]
+        return np.where(prices > 0, prices, np.nan), mean, std
+
+    def z_scores(self, values, prices):
+        """z-score of each price within its value's group (NaN when unknown)."""
+        prices, mean, std = self._lookup(values, prices)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (prices - mean) / std
+
+    def competitiveness(self, values, prices):
+        """scoring.relative_price_score of each price within its value's group."""
+        return relative_price_score(*self._lookup(values, prices))
+
+    def display_histogram(self, group, bins=DEFAULT_HISTOGRAM_BINS):
+        """(edges, counts) of a group's prices in at most `bins` bins spanning its min..max."""
+        if not self.count[group]:
+            return [], []
+        low, high = price_bins([self.minimum[group], self.maximum[group]])
+        splits = np.unique(np.linspace(low, high + 1, min(bins, high - low + 1) + 1).round().astype(int))
+        counts = np.add.reduceat(self.histogram[group, low:high + 1], splits[:-1] - low)
+        edges = BIN_EDGES[splits]
+        edges[0], edges[-1] = self.minimum[group], self.maximum[group]
+        return edges.tolist(), counts.tolist()
+
+    def summary(self, group, bins=DEFAULT_HISTOGRAM_BINS, ndigits=2):
+        """JSON-ready statistics of one group."""
+        edges, counts = self.display_histogram(group, bins)
+        empty = not self.count[group]
+
+        def number(value):
+            return None if empty else round(float(value), ndigits)
+
+        return {
+            'value': self.names[group],
+            'count': int(self.count[group]),
+            'mean': number(self.mean[group]),
+            'std': number(self.std[group]),
+            'min': number(self.minimum[group]),
+            'max': number(self.maximum[group]),
+            'quantiles': {f"p{round(q * 100)}": number(value)
+                          for q, value in zip(QUANTILES, self.quantiles[group])},
+            'histogram': {'edges': [round(edge, ndigits) for edge in edges], 'counts': counts},
+        }
+
+
+class PriceStats:
+    """GroupStats for every entry of DIMENSIONS."""
+
+    def __init__(self, dimensions):
+        self.dimensions = dimensions
+
+    @classmethod
+    def build(cls, df):
+        return cls({name: GroupStats.build(df[column], df['Price (per Kg)'])
+                    for name, column in DIMENSIONS.items()})
+
+    def merge(self, other):
+        return PriceStats({name: stats.merge(other.dimensions[name])
+                           for name, stats in self.dimensions.items()})
+
+    def __getitem__(self, dimension):
+        return self.dimensions[dimension]
+
+    def competitiveness(self, keywords, prices):
+        """Per-Keyword price competitiveness of each listing (see scoring.score_suppliers)."""
+        return self.dimensions['keyword'].competitiveness(keywords, prices)
+
+    def save(self, path):
+        """Write the statistics to directory `path` atomically."""
+        arrays = {f"{name}.{field}": getattr(stats, field)
+                  for name, stats in self.dimensions.items() for field in _FIELDS}
+        save_arrays(path, arrays, {name: stats.names for name, stats in self.dimensions.items()})
+
+    @classmethod
+    def load(cls, path):
+        """Open saved statistics memory-mapped."""
+        arrays, names = load_arrays(path)
+        return cls({name: GroupStats(names[name], *(arrays[f"{name}.{field}"] for field in _FIELDS))
+                    for name in DIMENSIONS})
+
+
+def price_stats_path(index_path):
+    return derived_index_path(index_path, 'prices', {
+        'dimensions': DIMENSIONS, 'bins': [MIN_DECADE, MAX_DECADE, BINS_PER_DECADE], 'quantiles': QUANTILES})
+
+
+def open_price_stats(index_path, df):
+    """Load the price statistics for a supplier index, computing them from df if missing.
+
+    `df` must be the frame read from index_path.
+    """
+    path = price_stats_path(index_path)
+    if not os.path.exists(path):
+        PriceStats.build(df).save(path)
+    return PriceStats.load(path)
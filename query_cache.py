@@ -0,0 +1,78 @@
+"""Thread-safe LRU cache with per-entry TTL for API query results.
+
+Entries are tagged with a version string (dataset + scoring weights); when a
+caller presents a different version the whole cache is dropped, so results
+computed against an old dataset or old weights are never served.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_CACHE_SIZE = int(os.environ.get('SUPPLIER_CACHE_SIZE', 256))
+DEFAULT_CACHE_TTL = float(os.environ.get('SUPPLIER_CACHE_TTL', 300))
+
+_MISSING = object()
+
+
+class QueryCache:
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE, ttl=DEFAULT_CACHE_TTL, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value), oldest first
+        self._lock = threading.Lock()
+
+    def _check_version(self, version):
+        if version != self.version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.version = version
+
+    def get(self, key, version=None, default=None):
+        with self._lock:
+            self._check_version(version)
+            expires_at, value = self._entries.get(key, (None, _MISSING))
+            if value is _MISSING or expires_at <= self.clock():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, version=None):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'version': self.version,
+            }
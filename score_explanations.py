@@ -0,0 +1,71 @@
+"""Why a listing got its Supplier Score, read from the index.
+
+The index build stores, next to every listing's component scores, a bitset
+of the terms and signals that raised them and the Product Name's word count
+(see scoring.explain_components). Explaining a listing decodes those few
+numbers against its scoring preset's explanation_layout(); no text is
+scanned after the build, and the explanation is of the very scores the
+index serves.
+"""
+import numpy as np
+
+from scoring import (COMPONENT_COLUMNS, EXPLANATION_COLUMNS, REASONS_COLUMN, SCORING_PRESETS, SCORING_WEIGHTS,
+                     WORDS_COLUMN, explanation_layout)
+from supplier_index import index_metadata, read_columns, read_components
+
+
+class ScoreExplanations:
+    def __init__(self, layout, components, reasons, words, ratings):
+        self.layout = layout            # (component, kind, name) of every reason bit
+        self.components = components    # stored component scores, one column per SCORE_COMPONENTS
+        self.reasons = reasons          # reason bits per row
+        self.words = words              # Product Name words per row
+        self.ratings = ratings          # Rating per row
+
+    @classmethod
+    def load(cls, path, ratings):
+        """Open the explanations stored in the index at path.
+
+        `ratings` is the Rating column of the frame read from it.
+        """
+        preset = index_metadata(path).get('scoring_preset', 'api')
+        explanations = read_columns(path, set(EXPLANATION_COLUMNS))
+        return cls(explanation_layout(**SCORING_PRESETS[preset]), read_components(path),
+                   explanations[REASONS_COLUMN].to_numpy(), explanations[WORDS_COLUMN].to_numpy(),
+                   ratings.to_numpy())
+
+    def matched(self, row):
+        """(component, kind, name) of every term and signal set for a row."""
+        bits = int(self.reasons[row])
+        return [entry for bit, entry in enumerate(self.layout) if bits >> bit & 1]
+
+    def explain(self, row, weights=SCORING_WEIGHTS, extra=None):
+        """Every weighted component of a row's score, with what raised it.
+
+        `extra` maps further weighted terms (a profile's 'price') to the
+        row's value for them.
+        """
+        matched = self.matched(row)
+        scores = {name: float(self.components[name].iat[row]) for name in COMPONENT_COLUMNS}
+        scores.update(extra or {})
+        explained = []
+        for name, score in scores.items():
+            weight = weights.get(name, 0)
+            entry = {'name': name,
+                     'label': COMPONENT_COLUMNS.get(name, name.title()).removesuffix(' Score'),
+                     'weight': weight, 'score': round(score, 4), 'points': round(weight * score * 100, 2)}
+            if name in COMPONENT_COLUMNS:
+                entry['terms'] = [term for component, kind, term in matched if component == name and kind == 'term']
+                entry['signals'] = [signal for component, kind, signal in matched
+                                    if component == name and kind == 'signal']
+            if name == 'products':
+                entry['words'] = int(self.words[row])
+            elif name == 'quality':
+                entry['rating'] = float(np.format_float_positional(self.ratings[row]))
+            explained.append(entry)
+        return explained
+
+
+def open_score_explanations(index_path, df):
+    """The score explanations of a supplier index; `df` must be the frame read from it."""
+    return ScoreExplanations.load(index_path, df['Rating'])
@@ -0,0 +1,298 @@
+import re
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr
+
+# Scoring weights for supplier ranking
+SCORING_WEIGHTS = {
+    'products': 0.15,        # Diversity of product range
+    'business_info': 0.20,   # Company age, turnover, and employees
+    'quality': 0.25,         # Certifications and ratings
+    'market_presence': 0.25,  # Reviews and ratings
+    'accessibility': 0.15    # Contact information and location
+}
+
+# Component columns, in the order they are summed into the final score
+SCORE_COMPONENTS = list(SCORING_WEIGHTS)
+
+# Index column holding each component score, e.g. 'Business Info Score'
+COMPONENT_COLUMNS = {name: name.replace('_', ' ').title() + ' Score' for name in SCORE_COMPONENTS}
+
+# Points (of a component's 1.0) a term match adds
+TERM_POINTS = {'products': 0.3, 'business_info': 0.5, 'quality': 0.3}
+
+# Signals other than term matches that add fixed points, with the component
+# they count towards; 'priced' adds the listing's price competitiveness
+SIGNALS = {
+    'company_url': ('business_info', 0.5),
+    'online_listing': ('market_presence', 0.5),   # company website and product page
+    'priced': ('market_presence', None),
+    'phone': ('accessibility', 0.5),
+    'location': ('accessibility', 0.5),            # address or city
+}
+
+# Index columns explaining the stored component scores (see explain_components)
+REASONS_COLUMN = 'Score Reasons'
+WORDS_COLUMN = 'Product Name Words'
+EXPLANATION_COLUMNS = [REASONS_COLUMN, WORDS_COLUMN]
+
+# Default term lists (the Flask API variant)
+MANUFACTURING_TERMS = ['casting', 'machined', 'forged', 'precision', 'custom']
+COMPANY_PATTERNS = ['ltd', 'private', 'inc']
+QUALITY_TERMS = ['premium', 'iso', 'certified']
+
+# Term options used by each entry point. The Streamlit app ranks with broader
+# term lists and scores prices against their Keyword's price distribution
+# ('relative', see relative_price_score); api-app.py also counts 'industries'.
+SCORING_PRESETS = {
+    'api': {},
+    'api-app': {
+        'company_patterns': ['ltd', 'private', 'inc', 'industries'],
+    },
+    'streamlit': {
+        'manufacturing_terms': ['casting', 'machined', 'forged', 'precision', 'custom'],
+        'company_patterns': ['ltd', 'limited', 'pvt', 'private', 'industries', 'inc', 'corporation'],
+        'quality_terms': ['premium', 'high quality', 'certified', 'iso', 'standard'],
+        'price_competitiveness': 'relative',
+    },
+}
+
+_WORD_PATTERN = re.compile(r'\S+')
+
+
+def compile_terms(terms):
+    """Build one alternation regex matching any of the (lowercase) terms literally."""
+    return re.compile('|'.join(re.escape(term) for term in terms))
+
+
+def _contains_any(lowered, terms):
+    # Terms are matched as plain substrings of the lowercased text, exactly
+    # like `any(term in text.lower() for term in terms)` did row by row.
+    if not terms:
+        return np.zeros(len(lowered), dtype=bool)
+    return lowered.str.contains(compile_terms(terms), regex=True, na=False).to_numpy(dtype=bool)
+
+
+def market_presence_score(has_price, online_listing, price_competitiveness=None):
+    """Market presence (0-1) from whether a row has a price and an online listing.
+
+    Priced rows get their `price_competitiveness` (when prices are scored).
+    """
+    market_score = np.zeros(len(has_price), dtype=np.float64)
+    if price_competitiveness is not None:
+        market_score = market_score + np.where(has_price, price_competitiveness, 0.0)
+    market_score = market_score + np.where(online_listing, SIGNALS['online_listing'][1], 0.0)
+    return np.minimum(market_score, 1.0)
+
+
+def compute_component_scores(df,
+                             manufacturing_terms=MANUFACTURING_TERMS,
+                             company_patterns=COMPANY_PATTERNS,
+                             quality_terms=QUALITY_TERMS,
+                             price_competitiveness=None):
+    """Compute the five 0-1 component scores column-wise.
+
+    Returns a float64 DataFrame with one column per entry of SCORE_COMPONENTS,
+    aligned to df.index. `price_competitiveness` (a number, or an array with
+    one value per row) is added to the market presence score for rows with a
+    price.
+    """
+    product_name = df['Product Name']
+    has_name = product_name.notna().to_numpy()
+    # str() of a missing value is 'nan', which never matches a term
+    name_lower = product_name.astype(str).str.lower()
+    company_lower = df['Company'].astype(str).str.lower()
+
+    has_company_url = df['Company URL'].notna().to_numpy()
+    has_product_url = df['Product URL'].notna().to_numpy()
+
+    # Products score - more words in the name indicate more product details
+    words = name_lower.str.count(_WORD_PATTERN).to_numpy(dtype=np.float64, na_value=0)
+    product_score = np.minimum(words / 10, 1)
+    product_score = product_score + np.where(_contains_any(name_lower, manufacturing_terms),
+                                             TERM_POINTS['products'], 0.0)
+    product_score = np.where(has_name, np.minimum(product_score, 1.0), 0.0)
+
+    # Business info score - company URL and established-company name patterns
+    business_score = np.where(has_company_url, SIGNALS['company_url'][1], 0.0)
+    business_score = business_score + np.where(_contains_any(company_lower, company_patterns),
+                                               TERM_POINTS['business_info'], 0.0)
+    business_score = np.minimum(business_score, 1.0)
+
+    # Quality score - numeric rating plus quality terms in the product name
+    rating = pd.to_numeric(df['Rating'], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    quality_score = np.where(np.isnan(rating), 0.0, rating / 5.0)
+    quality_score = quality_score + np.where(_contains_any(name_lower, quality_terms), TERM_POINTS['quality'], 0.0)
+    quality_score = np.minimum(quality_score, 1.0)
+
+    # Market presence score - pricing and online presence
+    market_score = market_presence_score(df['Price (per Kg)'].notna().to_numpy(),
+                                         has_company_url & has_product_url, price_competitiveness)
+
+    # Accessibility score - contact info and location
+    accessibility_score = np.where(df['Phone'].notna().to_numpy(), SIGNALS['phone'][1], 0.0)
+    has_location = df['Address'].notna().to_numpy() | df['City'].notna().to_numpy()
+    accessibility_score = accessibility_score + np.where(has_location, SIGNALS['location'][1], 0.0)
+    accessibility_score = np.minimum(accessibility_score, 1.0)
+
+    return pd.DataFrame({
+        'products': product_score,
+        'business_info': business_score,
+        'quality': quality_score,
+        'market_presence': market_score,
+        'accessibility': accessibility_score,
+    }, index=df.index)
+
+
+def explanation_layout(manufacturing_terms=MANUFACTURING_TERMS,
+                       company_patterns=COMPANY_PATTERNS,
+                       quality_terms=QUALITY_TERMS,
+                       price_competitiveness=None):
+    """(component, kind, name) of every reason bit, in bit order.
+
+    `kind` is 'term' for a matched term and 'signal' for an entry of SIGNALS;
+    the 'priced' signal only exists when prices are scored.
+    """
+    layout = [(component, 'term', term)
+              for component, terms in (('products', manufacturing_terms),
+                                       ('business_info', company_patterns),
+                                       ('quality', quality_terms))
+              for term in terms]
+    layout += [(component, 'signal', name) for name, (component, _) in SIGNALS.items()
+               if name != 'priced' or price_competitiveness is not None]
+    return layout
+
+
+def _term_matches(lowered, terms):
+    # One column per term; any() over a row equals _contains_any()
+    return [lowered.str.contains(term, regex=False, na=False).to_numpy(dtype=bool) for term in terms]
+
+
+def explain_components(df,
+                       manufacturing_terms=MANUFACTURING_TERMS,
+                       company_patterns=COMPANY_PATTERNS,
+                       quality_terms=QUALITY_TERMS,
+                       price_competitiveness=None):
+    """Why each row got its component scores, as (reasons, words).
+
+    `reasons` holds one bit per entry of explanation_layout() with the same
+    options, set when the row matched that term or has that signal.
+    `words` is the Product Name's word count (capped at 255), which the
+    products score scales with. Together with the Rating and the price
+    competitiveness they reproduce compute_component_scores().
+    """
+    name_lower = df['Product Name'].astype(str).str.lower()
+    company_lower = df['Company'].astype(str).str.lower()
+    has_company_url = df['Company URL'].notna().to_numpy()
+    signals = {
+        'company_url': has_company_url,
+        'online_listing': has_company_url & df['Product URL'].notna().to_numpy(),
+        'priced': df['Price (per Kg)'].notna().to_numpy(),
+        'phone': df['Phone'].notna().to_numpy(),
+        'location': df['Address'].notna().to_numpy() | df['City'].notna().to_numpy(),
+    }
+    matches = (_term_matches(name_lower, manufacturing_terms) + _term_matches(company_lower, company_patterns)
+               + _term_matches(name_lower, quality_terms))
+    matches += [signals[name] for name in SIGNALS if name != 'priced' or price_competitiveness is not None]
+
+    if len(matches) > 64:
+        raise ValueError(f"At most 64 terms and signals can be explained, got {len(matches)}")
+    dtype = next(dtype for dtype in (np.uint8, np.uint16, np.uint32, np.uint64)
+                 if np.iinfo(dtype).bits >= len(matches))
+    reasons = np.zeros(len(df), dtype=dtype)
+    for bit, matched in enumerate(matches):
+        reasons |= matched.astype(dtype) << dtype(bit)
+    words = name_lower.str.count(_WORD_PATTERN).to_numpy(dtype=np.float64, na_value=0)
+    words = np.where(df['Product Name'].notna().to_numpy(), np.minimum(words, 255), 0).astype(np.uint8)
+    return reasons, words
+
+
+def reprice_market_presence(reasons, competitiveness, **term_options):
+    """Market presence scores of rows explained by `reasons`, priced at `competitiveness`.
+
+    `reasons` and `term_options` (of a preset that scores prices) are as for
+    explain_components(), whose 'priced' and 'online_listing' bits are all
+    the score needs besides the price competitiveness.
+    """
+    layout = explanation_layout(**term_options)
+    reasons = np.asarray(reasons).astype(np.uint64)
+
+    def signal(name):
+        bit = np.uint64(layout.index(('market_presence', 'signal', name)))
+        return ((reasons >> bit) & np.uint64(1)).astype(bool)
+
+    return market_presence_score(signal('priced'), signal('online_listing'), competitiveness)
+
+
+def round_scores(values, ndigits=1):
+    """Round like the builtin round(), which the row-wise scorer used.
+
+    np.round and round() disagree only when the value sits on a rounding
+    boundary, so those few entries are re-rounded with round().
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rounded = np.round(values, ndigits)
+    scaled = values * 10 ** ndigits
+    ties = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    for i in ties:
+        rounded[i] = round(float(values[i]), ndigits)
+    return rounded
+
+
+def combine_scores(components, weights=SCORING_WEIGHTS):
+    """Weight the component scores into the final 0-100 Supplier Score.
+
+    Every column of `components` is weighted (columns missing from `weights`
+    count 0), in column order.
+    """
+    final_score = np.zeros(len(components), dtype=np.float64)
+    for name in components.columns:
+        final_score = final_score + weights.get(name, 0) * components[name].to_numpy()
+    return pd.Series(round_scores(final_score * 100), index=components.index, name='Supplier Score')
+
+
+def relative_price_score(prices, mean, std):
+    """Price competitiveness (0-1) of each price within its category.
+
+    The normal CDF of minus the price's z-score: 0.5 at the category mean,
+    approaching 1 for the cheapest listings. Prices in categories without
+    spread score 0.5.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    std = np.asarray(std, dtype=np.float64)
+    spread = std > 0
+    z = np.where(spread, (prices - mean) / np.where(spread, std, 1.0), 0.0)
+    return np.where(np.isnan(z), 0.5, ndtr(-z))
+
+
+def keyword_price_competitiveness(df):
+    """relative_price_score of every row against its Keyword's prices in df itself."""
+    prices = pd.to_numeric(df['Price (per Kg)'], errors='coerce').astype(np.float64)
+    # Missing prices are NaN or 0 (see load_data) and stay out of the statistics
+    prices = prices.where(prices > 0)
+    keywords = df['Keyword'].astype(object).to_numpy()
+    mean = prices.groupby(keywords, dropna=False).transform('mean')
+    std = np.sqrt(((prices - mean) ** 2).groupby(keywords, dropna=False).transform('mean')).to_numpy()
+    return relative_price_score(prices.to_numpy(), mean.to_numpy(), std)
+
+
+def supplier_components(df, price_stats=None, **term_options):
+    """compute_component_scores() with the preset's term options.
+
+    With price_competitiveness='relative', prices are scored against the
+    per-Keyword statistics of `price_stats` (a price_stats.PriceStats), or
+    against df's own prices when none are given.
+    """
+    if isinstance(term_options.get('price_competitiveness'), str):
+        if price_stats is not None:
+            competitiveness = price_stats.competitiveness(df['Keyword'], df['Price (per Kg)'])
+        else:
+            competitiveness = keyword_price_competitiveness(df)
+        term_options = {**term_options, 'price_competitiveness': competitiveness}
+    return compute_component_scores(df, **term_options)
+
+
+def score_suppliers(df, weights=SCORING_WEIGHTS, price_stats=None, **term_options):
+    """Vectorized replacement for df.apply(calculate_supplier_score, axis=1)."""
+    return combine_scores(supplier_components(df, price_stats, **term_options), weights)
@@ -0,0 +1,147 @@
+"""Named scoring profiles, loaded from a JSON file and reloaded when it changes.
+
+    {"quality-first": {"products": 0.1, "quality": 0.45, ...}, ...}
+
+A profile weights the five component scores stored in the index (see
+supplier_index.score_frame) plus 'price', the listing's price
+competitiveness within its Keyword (see price_stats). Terms a profile leaves
+out weigh 0. Serving a profile is one weighted sum over the stored
+component columns, never a rescore; each dataset keeps the scores and sort
+order of its most recently used profiles.
+
+The file is re-read when its modification time changes, checked at most
+every SUPPLIER_PROFILES_POLL_INTERVAL seconds. If an edit breaks the file,
+the error is printed and the previous profiles stay in use.
+"""
+import functools
+import json
+import math
+import os
+import threading
+import time
+import traceback
+
+import pandas as pd
+
+from scoring import SCORE_COMPONENTS, combine_scores
+from sort_index import SortIndex
+
+PROFILES_PATH = os.environ.get(
+    'SUPPLIER_SCORING_PROFILES',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scoring_profiles.json'))
+DEFAULT_POLL_INTERVAL = float(os.environ.get('SUPPLIER_PROFILES_POLL_INTERVAL', 2.0))
+
+PRICE_TERM = 'price'
+PROFILE_TERMS = SCORE_COMPONENTS + [PRICE_TERM]
+
+# Profiles whose scores and order each dataset keeps
+PROFILE_CACHE_SIZE = 8
+
+
+def parse_profiles(config):
+    """{name: weights} from a decoded profiles file. Raises ValueError if invalid."""
+    if not isinstance(config, dict):
+        raise ValueError("Scoring profiles must be a JSON object of {name: weights}")
+    profiles = {}
+    for name, weights in config.items():
+        if not isinstance(weights, dict):
+            raise ValueError(f"Profile '{name}' must map terms to weights")
+        unknown = sorted(set(weights) - set(PROFILE_TERMS))
+        if unknown:
+            raise ValueError(f"Profile '{name}' has unknown terms {unknown}; "
+                             f"expected some of {PROFILE_TERMS}")
+        for term, weight in weights.items():
+            if isinstance(weight, bool) or not isinstance(weight, (int, float)) or not 0 <= weight < math.inf:
+                raise ValueError(f"Profile '{name}': weight of '{term}' must be a non-negative number")
+        profiles[name] = {term: float(weights[term]) for term in PROFILE_TERMS if term in weights}
+    return profiles
+
+
+def load_profiles(path=PROFILES_PATH):
+    with open(path) as f:
+        return parse_profiles(json.load(f))
+
+
+def profile_key(weights):
+    """Hashable form of a profile's weights."""
+    return tuple(sorted(weights.items()))
+
+
+class ProfileStore:
+    """The profiles in a JSON file, reloaded after the file changes."""
+
+    def __init__(self, path=PROFILES_PATH, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        # A broken file at startup is an error; later ones are only reported
+        self._mtime = self._stat()
+        self._profiles = load_profiles(path) if self._mtime is not None else {}
+        self._checked_at = time.monotonic()
+
+    def _stat(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _check_for_update(self):
+        with self._lock:
+            if time.monotonic() - self._checked_at < self.poll_interval:
+                return
+            self._checked_at = time.monotonic()
+            mtime = self._stat()
+            if mtime == self._mtime:
+                return
+            self._mtime = mtime
+        try:
+            profiles = load_profiles(self.path) if mtime is not None else {}
+        except (OSError, ValueError):
+            traceback.print_exc()
+            return
+        self._profiles = profiles
+
+    def profiles(self):
+        """{name: weights} of every profile."""
+        self._check_for_update()
+        return self._profiles
+
+    def get(self, name):
+        """A profile's weights, or None if there is no such profile."""
+        return self.profiles().get(name)
+
+
+class ProfileScores:
+    """Supplier Scores and their sort order under any profile, for one dataset."""
+
+    def __init__(self, components, df, price_stats):
+        self.components = components      # stored component scores, one column per SCORE_COMPONENTS
+        self.df = df
+        self.price_stats = price_stats
+        self._price = None
+        self._scores = functools.lru_cache(maxsize=PROFILE_CACHE_SIZE)(self._compute_scores)
+        self._sort_indexes = functools.lru_cache(maxsize=PROFILE_CACHE_SIZE)(self._build_sort_index)
+
+    def price_competitiveness(self):
+        if self._price is None:
+            self._price = self.price_stats.competitiveness(self.df['Keyword'], self.df['Price (per Kg)'])
+        return self._price
+
+    def _compute_scores(self, key):
+        weights = dict(key)
+        components = self.components
+        if weights.get(PRICE_TERM):
+            components = components.assign(**{PRICE_TERM: self.price_competitiveness()})
+        # Stored like the index's own Supplier Score column
+        return combine_scores(components, weights).astype('float32').set_axis(self.df.index)
+
+    def _build_sort_index(self, key):
+        return SortIndex.build(pd.DataFrame({'Supplier Score': self._scores(key)}), ['Supplier Score'])
+
+    def scores(self, weights):
+        """The profile's Supplier Score of every row."""
+        return self._scores(profile_key(weights))
+
+    def sort_index(self, weights):
+        """A SortIndex ordering rows by the profile's Supplier Score."""
+        return self._sort_indexes(profile_key(weights))
@@ -0,0 +1,311 @@
+"""Tokenized inverted index over the supplier text columns.
+
+Each indexed column gets a sorted vocabulary and a CSR-style postings layout
+(`offsets` into one concatenated array of row ids), so an exact term is a
+slice and a prefix is a contiguous range of the vocabulary found by binary
+search. Row ids are positional (for df.iloc) and come back sorted, so result
+sets from different terms or filters can be intersected with numpy.
+
+Typo tolerance works on the vocabulary, not the rows: every column also
+keeps a character-trigram index of its vocabulary (terms padded with '$').
+A misspelled token is matched to the terms sharing enough of its trigrams,
+verified with a bounded edit distance (see max_edits), and their postings
+are used instead. Tokens are matched literally; nothing in a query is ever
+interpreted as a pattern. Punctuation is not indexed, so a query that has
+some (see literal_text) is matched against the text itself as well; see
+supplier_query.keyword_rows.
+
+The arrays are saved next to the supplier index and memory-mapped, so every
+worker process serves from the same page-cache pages.
+"""
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from supplier_index import derived_index_path, expand_offsets, load_arrays, merge_postings, save_arrays
+
+SEARCH_COLUMNS = ['Keyword', 'Product Name', 'Company']
+
+_TOKEN_PATTERN = re.compile(r'[^\W_]+')
+
+TRIGRAM_PAD = '$'
+
+
+def tokenize(text):
+    """Lowercase a string and split it into alphanumeric tokens."""
+    return _TOKEN_PATTERN.findall(str(text).lower())
+
+
+def literal_text(query):
+    """The lowercased query when it has characters tokenize() drops, else None.
+
+    Whitespace only separates tokens; anything else, as in 'c++' or '(',
+    has to be matched against the text itself.
+    """
+    text = ' '.join(str(query).lower().split())
+    return text if _TOKEN_PATTERN.sub('', text).strip() else None
+
+
+def max_edits(token):
+    """Edits a token of this length may be away from a term: 0, 1 or 2."""
+    return 0 if len(token) <= 3 else 1 if len(token) <= 6 else 2
+
+
+def trigrams(token, prefix=False):
+    """Distinct padded trigrams of a token; with `prefix` the end stays open."""
+    padded = TRIGRAM_PAD + token + ('' if prefix else TRIGRAM_PAD)
+    return sorted({padded[i:i + 3] for i in range(max(len(padded) - 2, 1))})
+
+
+def edit_distance(a, b, limit, prefix=False):
+    """Edit distance (with transpositions) from a to b, or to b's closest prefix.
+
+    Stops early and returns limit + 1 once the distance must exceed `limit`.
+    """
+    over = limit + 1
+    if prefix:
+        # Longer prefixes of b are more than `limit` edits away anyway
+        b = b[:len(a) + limit]
+    elif abs(len(a) - len(b)) > limit:
+        return over
+    # Only cells within `limit` of the diagonal can stay within `limit`
+    before, previous = None, [min(j, over) for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [over] * (len(b) + 1)
+        current[0] = min(i, over)
+        best = current[0]
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            value = previous[j - 1] + (a[i - 1] != b[j - 1])
+            if previous[j] < value:
+                value = previous[j] + 1
+            if current[j - 1] < value:
+                value = current[j - 1] + 1
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1] and before[j - 2] < value:
+                value = before[j - 2] + 1
+            current[j] = value = value if value < over else over
+            if value < best:
+                best = value
+        if best > limit:
+            return over
+        before, previous = previous, current
+    return min(previous) if prefix else previous[-1]
+
+
+class _Postings:
+    def __init__(self, vocab, offsets, row_ids, grams, gram_offsets, gram_terms):
+        self.vocab = vocab                # sorted numpy array of unique tokens
+        self.offsets = offsets            # row ids of vocab[i] are row_ids[offsets[i]:offsets[i + 1]]
+        self.row_ids = row_ids
+        self.grams = grams                # sorted trigrams of the vocabulary
+        self.gram_offsets = gram_offsets  # vocab ids of grams[i] are gram_terms[gram_offsets[i]:gram_offsets[i + 1]]
+        self.gram_terms = gram_terms
+
+    @classmethod
+    def build(cls, values):
+        n_rows = len(values)
+        tokens = values.reset_index(drop=True).astype(str).str.lower().str.findall(_TOKEN_PATTERN).explode().dropna()
+        codes, vocab = pd.factorize(tokens, sort=True)
+        # One int64 key per (token, row) pair; sorting and deduplicating the
+        # keys yields each token's postings in row order
+        keys = np.sort(codes.astype(np.int64) * n_rows + tokens.index.to_numpy(dtype=np.int64))
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+        offsets = np.searchsorted(keys // n_rows, np.arange(len(vocab) + 1)) if n_rows else np.zeros(1, np.int64)
+        vocab = np.asarray(vocab, dtype=str)
+        return cls(vocab, offsets, (keys % max(n_rows, 1)).astype(np.int32), *cls._build_trigrams(vocab))
+
+    def append(self, other, n_rows):
+        """These postings followed by other's, whose row ids start at n_rows."""
+        vocab = np.union1d(self.vocab, other.vocab)
+        offsets, row_ids = merge_postings(
+            expand_offsets(self.offsets, np.searchsorted(vocab, self.vocab), len(vocab)), self.row_ids,
+            expand_offsets(other.offsets, np.searchsorted(vocab, other.vocab), len(vocab)), other.row_ids + n_rows)
+        return _Postings(vocab, offsets, row_ids.astype(np.int32), *self._build_trigrams(vocab))
+
+    @staticmethod
+    def _build_trigrams(vocab):
+        pairs = [(gram, term_id) for term_id, term in enumerate(vocab.tolist()) for gram in trigrams(term)]
+        grams = pd.Series([gram for gram, _ in pairs], dtype=object)
+        term_ids = np.array([term_id for _, term_id in pairs], dtype=np.int32)
+        codes, gram_vocab = pd.factorize(grams, sort=True)
+        order = np.lexsort((term_ids, codes))
+        gram_offsets = np.searchsorted(codes[order], np.arange(len(gram_vocab) + 1))
+        return np.asarray(gram_vocab, dtype=str), gram_offsets, term_ids[order]
+
+    def lookup(self, token, prefix=False):
+        """Return (rows, sorted_unique) for an exact or prefix term."""
+        lo = np.searchsorted(self.vocab, token, side='left')
+        if prefix:
+            # Every token starting with `token` sorts before token + U+10FFFF
+            hi = np.searchsorted(self.vocab, token + '\U0010ffff', side='left')
+        else:
+            hi = lo + 1 if lo < len(self.vocab) and self.vocab[lo] == token else lo
+        return self.row_ids[self.offsets[lo]:self.offsets[hi]], hi - lo <= 1
+
+    def similar_terms(self, token, prefix=False):
+        """Vocab ids of the terms within max_edits(token) of token (of a prefix of the term, with `prefix`)."""
+        limit = max_edits(token)
+        if not limit or not len(self.grams):
+            return np.empty(0, dtype=np.int64)
+        grams = trigrams(token, prefix)
+        found = np.minimum(np.searchsorted(self.grams, grams), len(self.grams) - 1)
+        found = found[self.grams[found] == grams]
+        if not len(found):
+            return np.empty(0, dtype=np.int64)
+        candidates, shared = np.unique(np.concatenate(
+            [self.gram_terms[self.gram_offsets[i]:self.gram_offsets[i + 1]] for i in found]), return_counts=True)
+        # Each edit changes at most three of the token's trigrams
+        candidates = candidates[shared >= max(len(grams) - 3 * limit, 1)]
+        lengths = np.char.str_len(self.vocab[candidates])
+        if prefix:
+            candidates = candidates[lengths >= len(token) - limit]
+        else:
+            candidates = candidates[np.abs(lengths - len(token)) <= limit]
+        return np.array([term_id for term_id in candidates.tolist()
+                         if edit_distance(token, str(self.vocab[term_id]), limit, prefix) <= limit],
+                        dtype=np.int64)
+
+    def rows_of_terms(self, term_ids):
+        """Postings lists (sorted row ids) of several vocab ids."""
+        return [self.row_ids[self.offsets[i]:self.offsets[i + 1]] for i in term_ids]
+
+
+_ARRAYS = ['vocab', 'offsets', 'row_ids', 'grams', 'gram_offsets', 'gram_terms']
+
+
+class InvertedIndex:
+    """Case-insensitive term/prefix index returning sorted positional row ids."""
+
+    def __init__(self, postings, n_rows):
+        self.postings = postings
+        self.n_rows = n_rows
+
+    @classmethod
+    def build(cls, df, columns=SEARCH_COLUMNS):
+        return cls({column: _Postings.build(df[column]) for column in columns}, len(df))
+
+    def append(self, df):
+        """The index of this index's rows followed by df's; only df is tokenized."""
+        return InvertedIndex({column: postings.append(_Postings.build(df[column]), self.n_rows)
+                              for column, postings in self.postings.items()}, self.n_rows + len(df))
+
+    def save(self, path):
+        """Write the postings to directory `path` atomically."""
+        arrays = {}
+        for i, postings in enumerate(self.postings.values()):
+            arrays.update({f"{i}.vocab": postings.vocab, f"{i}.offsets": postings.offsets,
+                           f"{i}.row_ids": postings.row_ids, f"{i}.grams": postings.grams,
+                           f"{i}.gram_offsets": postings.gram_offsets, f"{i}.gram_terms": postings.gram_terms})
+        save_arrays(path, arrays, {'columns': list(self.postings), 'n_rows': self.n_rows})
+
+    @classmethod
+    def load(cls, path):
+        """Open saved postings memory-mapped read-only."""
+        arrays, metadata = load_arrays(path)
+        postings = {column: _Postings(*(arrays[f"{i}.{name}"] for name in _ARRAYS))
+                    for i, column in enumerate(metadata['columns'])}
+        return cls(postings, metadata['n_rows'])
+
+    def _union(self, matches):
+        """Sorted row ids of the union of (rows, sorted_unique) matches."""
+        matches = [match for match in matches if len(match[0])] or matches[:1]
+        if len(matches) == 1 and matches[0][1]:
+            return matches[0][0]
+        # Union several postings lists by scattering them into a row mask,
+        # which is linear where sorting the concatenation is not
+        return np.flatnonzero(self._mask(matches)).astype(np.int32)
+
+    def _mask(self, matches):
+        mask = np.zeros(self.n_rows, dtype=bool)
+        for rows, _ in matches:
+            mask[rows] = True
+        return mask
+
+    def _contains(self, matches, rows):
+        """Mask of which of the sorted `rows` are in any of the matches."""
+        found = np.zeros(len(rows), dtype=bool)
+        scattered = []
+        for postings, sorted_unique in matches:
+            if sorted_unique and len(postings) > 8 * len(rows):
+                # Binary search the few rows instead of touching every posting
+                positions = np.minimum(np.searchsorted(postings, rows), len(postings) - 1)
+                found |= postings[positions] == rows
+            elif len(postings):
+                scattered.append((postings, sorted_unique))
+        if scattered:
+            found |= self._mask(scattered)[rows]
+        return found
+
+    def _matches(self, token, columns=None, prefix=False):
+        token = token.lower()
+        return [self.postings[column].lookup(token, prefix) for column in columns or self.postings]
+
+    def _similar_matches(self, token, columns=None, prefix=False):
+        token = token.lower()
+        return [(rows, True) for column in columns or self.postings
+                for rows in self.postings[column].rows_of_terms(self.postings[column].similar_terms(token, prefix))]
+
+    def term(self, token, columns=None, prefix=False):
+        """Row ids where any of `columns` contains `token` (or a token starting with it)."""
+        return self._union(self._matches(token, columns, prefix))
+
+    def similar(self, token, columns=None, prefix=False):
+        """Row ids where any of `columns` contains a term within max_edits(token) of `token`."""
+        return self._union(self._similar_matches(token, columns, prefix))
+
+    def intersect(self, a, b):
+        """Intersect two sorted row-id arrays."""
+        if len(a) > len(b):
+            a, b = b, a
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[a] = True
+        return b[mask[b]]
+
+    def search(self, query, columns=None, prefix=True, fuzzy=False):
+        """Row ids matching every token of `query`.
+
+        With `prefix` set the last token is prefix-matched, so partially
+        typed words still match; the other tokens, and a last token of a
+        single character, must match whole words.
+        With `fuzzy` set, a token matching no term at all matches the terms
+        a few edits away instead. A query without any alphanumeric token
+        matches nothing.
+        """
+        tokens = tokenize(query)
+        token_matches = []
+        for i, token in enumerate(tokens):
+            # Every term starting with one letter would match, which is noise
+            is_prefix = prefix and i == len(tokens) - 1 and len(token) > 1
+            matches = self._matches(token, columns, is_prefix)
+            if fuzzy and not any(len(rows) for rows, _ in matches):
+                matches = self._similar_matches(token, columns, is_prefix)
+            if not any(len(rows) for rows, _ in matches):
+                return np.empty(0, dtype=np.int32)
+            token_matches.append(matches)
+        if not token_matches:
+            return np.empty(0, dtype=np.int32)
+        # Start from the rarest token and narrow its rows down with a mask
+        # per other token, so only the postings are touched, never every row
+        token_matches.sort(key=lambda matches: sum(len(rows) for rows, _ in matches))
+        result = self._union(token_matches[0])
+        for matches in token_matches[1:]:
+            result = result[self._contains(matches, result)]
+            if not len(result):
+                break
+        return result
+
+
+def search_index_path(index_path, columns=SEARCH_COLUMNS):
+    return derived_index_path(index_path, 'search', {'columns': columns, 'trigrams': TRIGRAM_PAD})
+
+
+def open_search_index(index_path, df, columns=SEARCH_COLUMNS):
+    """Load the keyword index for a supplier index, building it from df if it is missing.
+
+    `df` must be the frame read from index_path.
+    """
+    path = search_index_path(index_path, columns)
+    if not os.path.exists(path):
+        InvertedIndex.build(df, columns).save(path)
+    return InvertedIndex.load(path)
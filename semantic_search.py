@@ -0,0 +1,140 @@
+"""TF-IDF / cosine-similarity search over supplier listings.
+
+Each listing's Product Name, Keyword and Company are vectorized with
+scikit-learn's TfidfVectorizer into an L2-normalized sparse CSR matrix, so a
+query's cosine similarity to every listing is a single sparse product. The
+fitted vocabulary, IDF weights and the CSR arrays are saved next to the
+supplier index file and memory-mapped at startup instead of being refitted.
+
+An ingested segment only has its own listings vectorized, against the
+vocabulary and IDF weights already fitted (see TfidfSearchIndex.append);
+compacting the index refits them on every listing.
+"""
+import json
+import os
+import shutil
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from supplier_index import derived_index_path
+
+TEXT_COLUMNS = ['Product Name', 'Keyword', 'Company']
+
+VECTORIZER_PARAMS = {
+    'lowercase': True,
+    'ngram_range': [1, 2],
+    'sublinear_tf': True,
+    'norm': 'l2',
+}
+
+
+def listing_text(df, columns=TEXT_COLUMNS):
+    """Join the searchable text columns of every listing into one document."""
+    def column_text(column):
+        # Through object dtype, since Categorical.fillna('') would need ''
+        # to be one of its categories
+        return df[column].astype(object).fillna('').astype(str)
+
+    text = column_text(columns[0])
+    for column in columns[1:]:
+        text = text + ' ' + column_text(column)
+    return text
+
+
+def _make_vectorizer(vocabulary=None):
+    params = dict(VECTORIZER_PARAMS, ngram_range=tuple(VECTORIZER_PARAMS['ngram_range']))
+    return TfidfVectorizer(vocabulary=vocabulary, dtype=np.float32, **params)
+
+
+def _top_k(scores, rows, k):
+    """Pick the k best (row, score) pairs without sorting every candidate."""
+    if len(scores) > k:
+        keep = np.argpartition(-scores, k - 1)[:k]
+        scores, rows = scores[keep], rows[keep]
+    order = np.lexsort((rows, -scores))
+    return rows[order], scores[order]
+
+
+class TfidfSearchIndex:
+    """Sparse TF-IDF matrix plus the vectorizer needed to encode queries."""
+
+    def __init__(self, vectorizer, matrix):
+        self.vectorizer = vectorizer
+        self.matrix = matrix
+
+    @classmethod
+    def build(cls, df, columns=TEXT_COLUMNS):
+        vectorizer = _make_vectorizer()
+        matrix = vectorizer.fit_transform(listing_text(df, columns)).tocsr()
+        return cls(vectorizer, matrix)
+
+    def append(self, df, columns=TEXT_COLUMNS):
+        """The index of this index's rows followed by df's, vectorized with the fitted vectorizer."""
+        matrix = sp.vstack([self.matrix, self.vectorizer.transform(listing_text(df, columns))], format='csr')
+        return TfidfSearchIndex(self.vectorizer, matrix)
+
+    def save(self, path):
+        """Write the index to directory `path` atomically."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        os.makedirs(tmp_path, exist_ok=True)
+        vocabulary = {term: int(col) for term, col in self.vectorizer.vocabulary_.items()}
+        with open(os.path.join(tmp_path, 'vocabulary.json'), 'w') as f:
+            json.dump(vocabulary, f)
+        np.save(os.path.join(tmp_path, 'idf.npy'), self.vectorizer.idf_.astype(np.float32))
+        np.save(os.path.join(tmp_path, 'data.npy'), self.matrix.data.astype(np.float32))
+        # Keep scipy's own index dtype so loading does not have to convert
+        np.save(os.path.join(tmp_path, 'indices.npy'), self.matrix.indices)
+        np.save(os.path.join(tmp_path, 'indptr.npy'), self.matrix.indptr)
+        with open(os.path.join(tmp_path, 'shape.json'), 'w') as f:
+            json.dump(list(self.matrix.shape), f)
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            # Another process saved the same index first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path):
+        """Open a saved index with the CSR arrays memory-mapped read-only."""
+        with open(os.path.join(path, 'vocabulary.json')) as f:
+            vectorizer = _make_vectorizer(json.load(f))
+        vectorizer.idf_ = np.load(os.path.join(path, 'idf.npy'))
+        with open(os.path.join(path, 'shape.json')) as f:
+            shape = tuple(json.load(f))
+        arrays = [np.load(os.path.join(path, name), mmap_mode='r')
+                  for name in ('data.npy', 'indices.npy', 'indptr.npy')]
+        return cls(vectorizer, sp.csr_matrix(tuple(arrays), shape=shape, copy=False))
+
+    def query(self, text, k=10):
+        """Top-k (row ids, cosine similarities) for one query string."""
+        return self.query_batch([text], k)[0]
+
+    def query_batch(self, texts, k=10):
+        """Top-k results for many queries, scored with one sparse product."""
+        queries = self.vectorizer.transform(texts)
+        # (listings x queries): column j holds the similarities for texts[j],
+        # with only listings sharing a term with the query stored
+        scores = (self.matrix @ queries.T).tocsc()
+        results = []
+        for j in range(len(texts)):
+            start, end = scores.indptr[j], scores.indptr[j + 1]
+            results.append(_top_k(scores.data[start:end], scores.indices[start:end], k))
+        return results
+
+
+def tfidf_index_path(index_path):
+    """Directory of the TF-IDF index fitted on the supplier index at index_path."""
+    return derived_index_path(index_path, 'tfidf', {'columns': TEXT_COLUMNS, 'params': VECTORIZER_PARAMS})
+
+
+def open_tfidf_index(index_path, df):
+    """Load the TF-IDF index for a supplier index, fitting it on df if it is missing.
+
+    `df` must be the frame read from index_path.
+    """
+    path = tfidf_index_path(index_path)
+    if not os.path.exists(path):
+        TfidfSearchIndex.build(df).save(path)
+    return TfidfSearchIndex.load(path)
@@ -0,0 +1,190 @@
+"""Columnar serialization of supplier records.
+
+RecordEncoder writes JSON straight from the DataFrame's columns: every
+column of a page is turned into an array of JSON fragments in one pass
+(categorical columns reuse fragments encoded once per category, numeric
+columns encode each distinct value once) and the fragments are joined row by
+row. The text is the same as json.dumps over page_records() with the same
+options, including NaN for missing values and null for None, without
+building a dict per record. Encoded /supplier/<id> rows are kept in an LRU
+cache.
+
+Internal consumers can ask for the rows as an Arrow IPC stream or a Parquet
+file instead (see MEDIA_TYPES).
+"""
+import functools
+import json
+import os
+from json.encoder import encode_basestring_ascii
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from supplier_query import STREAM_CHUNK_SIZE
+
+ROW_CACHE_SIZE = int(os.environ.get('SUPPLIER_ROW_CACHE_SIZE', 4096))
+
+ARROW_STREAM = 'application/vnd.apache.arrow.stream'
+PARQUET = 'application/vnd.apache.parquet'
+NDJSON = 'application/x-ndjson'
+JSON = 'application/json'
+
+# ?format= values and the media types they stand for
+MEDIA_TYPES = {'json': JSON, 'ndjson': NDJSON, 'arrow': ARROW_STREAM, 'parquet': PARQUET}
+
+# json.dumps separators: app.json.dumps() defaults, and jsonify() outside debug mode
+DEFAULT_SEPARATORS = (', ', ': ')
+COMPACT_SEPARATORS = (',', ':')
+
+
+def encode_value(value):
+    """JSON text of one Python value, as json.dumps(value) would write it."""
+    if isinstance(value, str):
+        return encode_basestring_ascii(value)
+    if isinstance(value, np.generic):
+        value = value.item()
+    return json.dumps(value)
+
+
+def _encode_each(values):
+    return np.array([encode_value(value) for value in values], dtype=object)
+
+
+def _encode_distinct(values, widen=None):
+    """Fragments for numeric values, encoding each distinct value once."""
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    uniques = np.asarray(uniques)
+    if widen is not None:
+        uniques = widen(uniques)
+    fragments = np.append(_encode_each(uniques.tolist()), 'NaN')
+    return fragments[codes]
+
+
+def _widen_float32(values):
+    # Same shortest-decimal widening as supplier_query.frame_records
+    return values.astype(str).astype(np.float64)
+
+
+class RecordEncoder:
+    """Encodes rows of one (immutable) supplier frame as JSON."""
+
+    def __init__(self, df, row_cache_size=ROW_CACHE_SIZE):
+        self.df = df
+        self._category_fragments = {}
+        self.row = functools.lru_cache(maxsize=row_cache_size)(self._encode_row)
+
+    def column_fragments(self, column, rows, values=None):
+        """JSON fragment of column's value for every row id in rows.
+
+        `values` (a full-length Series) replaces the frame's column.
+        """
+        series = self.df[column] if values is None else values
+        dtype = series.dtype
+        if isinstance(dtype, pd.CategoricalDtype) and values is None:
+            fragments = self._category_fragments.get(column)
+            if fragments is None:
+                categories = series.cat.categories.to_numpy(dtype=object).tolist()
+                # The extra last fragment is what code -1 (missing) picks
+                fragments = np.append(_encode_each(categories), 'NaN')
+                self._category_fragments[column] = fragments
+            return fragments[series.cat.codes.to_numpy()[rows]]
+        if dtype == np.float32:
+            return _encode_distinct(series.to_numpy()[rows], _widen_float32)
+        if pd.api.types.is_float_dtype(dtype):
+            return _encode_distinct(series.to_numpy()[rows])
+        if pd.api.types.is_integer_dtype(dtype) and not isinstance(dtype, pd.api.extensions.ExtensionDtype):
+            return series.to_numpy()[rows].astype(str).astype(object)
+        return _encode_each(series.iloc[rows].to_numpy(dtype=object).tolist())
+
+    def objects(self, rows, fields=None, separators=DEFAULT_SEPARATORS, indent=None, level=0, overrides=None):
+        """One JSON object text per row id, keys sorted like Flask's json provider.
+
+        `overrides` maps column names to full-length Series served instead.
+        """
+        overrides = overrides or {}
+        fields = sorted(self.df.columns if fields is None else fields)
+        rows = np.asarray(rows, dtype=np.int64)
+        item_separator, key_separator = separators
+        if indent is None:
+            inner = close = ''
+        else:
+            inner = '\n' + ' ' * (indent * (level + 1))
+            close = '\n' + ' ' * (indent * level)
+        if not fields:
+            return ['{}'] * len(rows)
+
+        texts = np.full(len(rows), '{', dtype=object)
+        for i, field in enumerate(fields):
+            key = (item_separator if i else '') + inner + encode_basestring_ascii(field) + key_separator
+            texts = texts + key + self.column_fragments(field, rows, overrides.get(field))
+        return (texts + (close + '}')).tolist()
+
+    def dumps(self, rows, fields=None, indent=None, overrides=None):
+        """JSON array of the rows, as jsonify(page_records(...)) writes it (without the newline)."""
+        if indent is None:
+            return '[' + ','.join(self.objects(rows, fields, COMPACT_SEPARATORS, overrides=overrides)) + ']'
+        if not len(rows):
+            return '[]'
+        objects = self.objects(rows, fields, (',', ': '), indent, level=1, overrides=overrides)
+        pad = '\n' + ' ' * indent
+        return '[' + pad + (',' + pad).join(objects) + '\n]'
+
+    def lines(self, rows, fields=None, chunk_size=STREAM_CHUNK_SIZE, overrides=None):
+        """Yield NDJSON text (app.json.dumps per record) a chunk of rows at a time."""
+        for start in range(0, len(rows), chunk_size):
+            objects = self.objects(rows[start:start + chunk_size], fields, overrides=overrides)
+            yield ''.join(text + "\n" for text in objects)
+
+    def _encode_row(self, row_id, indent=None):
+        separators = COMPACT_SEPARATORS if indent is None else (',', ': ')
+        return self.objects([row_id], None, separators, indent)[0]
+
+
+def arrow_table(df, rows, fields=None, overrides=None):
+    """The rows (restricted to fields) as an Arrow table, keeping column types."""
+    frame = df.iloc[rows]
+    if overrides:
+        frame = frame.assign(**{column: values.to_numpy()[rows] for column, values in overrides.items()})
+    if fields is not None:
+        frame = frame[fields]
+    return pa.Table.from_pandas(frame, preserve_index=False)
+
+
+def encode_binary(df, rows, fields, media_type, chunk_size=STREAM_CHUNK_SIZE, overrides=None):
+    """Serialize rows as an Arrow IPC stream or a Parquet file."""
+    table = arrow_table(df, rows, fields, overrides)
+    sink = pa.BufferOutputStream()
+    if media_type == ARROW_STREAM:
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=chunk_size)
+    elif media_type == PARQUET:
+        pq.write_table(table, sink)
+    else:
+        raise ValueError(f"Unsupported media type: {media_type}")
+    return sink.getvalue().to_pybytes()
+
+
+def negotiate_media_type(format_name=None, accept=None):
+    """Response media type for a ?format= value or, failing that, an Accept header.
+
+    The highest-q supported type in Accept wins (earliest on ties); wildcards
+    and anything else fall back to JSON.
+    """
+    if format_name in MEDIA_TYPES:
+        return MEDIA_TYPES[format_name]
+    best, best_q = JSON, 0.0
+    for item in (accept or '').split(','):
+        media_type, *params = [part.strip() for part in item.split(';')]
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media_type in MEDIA_TYPES.values() and q > best_q:
+            best, best_q = media_type, q
+    return best
@@ -0,0 +1,137 @@
+"""Precomputed sort orders for the sortable supplier columns.
+
+For every sortable column we keep a dense integer rank per row (ties share a
+rank, missing values rank last in both directions) plus the full ascending
+and descending permutations. A filtered result is then ordered either by
+walking the precomputed permutation through the filter mask or, for small
+results, by sorting the integer ranks of just the matching rows. Ties keep
+dataset order, like a stable sort_values.
+
+Like the keyword index, the arrays are saved next to the supplier index and
+memory-mapped by every worker.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from supplier_index import derived_index_path, load_arrays, save_arrays
+
+SORTABLE_COLUMNS = ['Supplier Score', 'Price (per Kg)', 'Rating', 'Company']
+
+# Rows scanned per step when merging a filter mask with a precomputed order
+_SCAN_CHUNK = 4096
+
+
+class _ColumnOrder:
+    def __init__(self, keys, orders):
+        self.keys = keys      # {ascending: dense rank per row}
+        self.orders = orders  # {ascending: row ids in sorted order}
+
+    @classmethod
+    def build(cls, values):
+        codes, uniques = pd.factorize(values, sort=True)
+        n_unique = len(uniques)
+        codes = codes.astype(np.int64)
+        missing = codes < 0
+        keys = {
+            True: np.where(missing, n_unique, codes),
+            False: np.where(missing, n_unique, n_unique - 1 - codes),
+        }
+        orders = {
+            ascending: np.argsort(column_keys, kind='stable').astype(np.int32)
+            for ascending, column_keys in keys.items()
+        }
+        return cls(keys, orders)
+
+
+class SortIndex:
+    def __init__(self, columns, n_rows):
+        self.columns = columns
+        self.n_rows = n_rows
+
+    @classmethod
+    def build(cls, df, columns=SORTABLE_COLUMNS):
+        return cls({column: _ColumnOrder.build(df[column]) for column in columns if column in df.columns},
+                   len(df))
+
+    def save(self, path):
+        """Write the ranks and orders to directory `path` atomically."""
+        arrays = {}
+        for i, order in enumerate(self.columns.values()):
+            for ascending, name in ((True, 'asc'), (False, 'desc')):
+                arrays[f"{i}.{name}.keys"] = order.keys[ascending]
+                arrays[f"{i}.{name}.order"] = order.orders[ascending]
+        save_arrays(path, arrays, {'columns': list(self.columns), 'n_rows': self.n_rows})
+
+    @classmethod
+    def load(cls, path):
+        """Open saved ranks and orders memory-mapped read-only."""
+        arrays, metadata = load_arrays(path)
+        columns = {
+            column: _ColumnOrder(
+                {True: arrays[f"{i}.asc.keys"], False: arrays[f"{i}.desc.keys"]},
+                {True: arrays[f"{i}.asc.order"], False: arrays[f"{i}.desc.order"]})
+            for i, column in enumerate(metadata['columns'])
+        }
+        return cls(columns, metadata['n_rows'])
+
+    def __contains__(self, column):
+        return column in self.columns
+
+    def _mask(self, rows):
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[rows] = True
+        return mask
+
+    def _composite_keys(self, rows, column, ascending):
+        # rank * n_rows + row is unique per row, so selecting on it is stable
+        return self.columns[column].keys[ascending][rows] * self.n_rows + rows
+
+    def sort(self, rows, column, ascending=True):
+        """All of `rows` ordered by column."""
+        if column not in self.columns:
+            return rows
+        if len(rows) * 8 > self.n_rows:
+            # Dense result: one linear pass over the precomputed order
+            order = self.columns[column].orders[ascending]
+            return order[self._mask(rows)[order]]
+        return rows[np.argsort(self._composite_keys(rows, column, ascending))]
+
+    def top_k(self, rows, column, ascending=True, k=10):
+        """The first k of sort(rows, ...) without ordering the whole result."""
+        if column not in self.columns:
+            return rows[:k]
+        if len(rows) <= k:
+            return self.sort(rows, column, ascending)
+        if len(rows) * 8 > self.n_rows:
+            # Walk the precomputed order until k matching rows are found;
+            # with a dense filter this touches about k / selectivity rows
+            order = self.columns[column].orders[ascending]
+            mask = self._mask(rows)
+            found = []
+            count = 0
+            for start in range(0, self.n_rows, _SCAN_CHUNK):
+                block = order[start:start + _SCAN_CHUNK]
+                block = block[mask[block]]
+                found.append(block)
+                count += len(block)
+                if count >= k:
+                    break
+            return np.concatenate(found)[:k]
+        # Sparse result: bounded selection of the k smallest keys, then
+        # sort only those k
+        keys = self._composite_keys(rows, column, ascending)
+        best = np.argpartition(keys, k - 1)[:k]
+        return rows[best[np.argsort(keys[best])]]
+
+
+def open_sort_index(index_path, df, columns=SORTABLE_COLUMNS):
+    """Load the sort index for a supplier index, building it from df if it is missing.
+
+    `df` must be the frame read from index_path.
+    """
+    path = derived_index_path(index_path, 'sort', {'columns': columns})
+    if not os.path.exists(path):
+        SortIndex.build(df, columns).save(path)
+    return SortIndex.load(path)
@@ -0,0 +1,435 @@
+"""Precomputed, memory-mapped supplier index.
+
+The CSV is parsed, typed and scored once by an offline build step and written
+to an uncompressed Arrow IPC file. Entry points open that file memory-mapped,
+so every worker process shares the same page-cache pages instead of keeping
+its own parsed copy of the CSV.
+
+Build the index for every scoring preset ahead of deployment with:
+
+    python supplier_index.py build --csv indiamart_casting_data_cleaned_no_missing_prices.csv
+
+Index files are named after a hash of the CSV contents and the scoring
+options, so a stale index is never served; open_index() builds a missing one
+on first use.
+"""
+import argparse
+import functools
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from scoring import (COMPONENT_COLUMNS, EXPLANATION_COLUMNS, REASONS_COLUMN, SCORING_PRESETS, SCORING_WEIGHTS,
+                     WORDS_COLUMN, combine_scores, explain_components, keyword_price_competitiveness,
+                     reprice_market_presence, supplier_components)
+
+INDEX_DIR = os.environ.get('SUPPLIER_INDEX_DIR', 'index')
+
+# Bumped whenever the on-disk column layout changes, so old files are rebuilt
+INDEX_LAYOUT = 5
+
+# Low-cardinality text columns stored dictionary-encoded (pandas Categorical)
+CATEGORICAL_COLUMNS = ['Keyword', 'City', 'Company', 'Address']
+# Numeric columns stored as float32, or as int32 while they hold only whole
+# numbers (so a price of 310 is still served as 310, not 310.0)
+NUMERIC_COLUMNS = ['Price (per Kg)', 'Rating', 'Supplier Score']
+
+
+_file_hashes = {}
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-256 of a file's contents, read in chunks.
+
+    Remembered per (path, size, mtime), so callers that re-check the source
+    on every request only re-read it after it changed.
+    """
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _file_hashes:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        _file_hashes[memo_key] = digest.hexdigest()
+    return _file_hashes[memo_key]
+
+
+def scoring_fingerprint(preset='api', weights=SCORING_WEIGHTS):
+    options = {'weights': weights, 'terms': SCORING_PRESETS[preset], 'layout': INDEX_LAYOUT}
+    return hashlib.sha256(json.dumps(options, sort_keys=True).encode()).hexdigest()
+
+
+def index_path(csv_path, preset='api', weights=SCORING_WEIGHTS, index_dir=INDEX_DIR, source_hash=None):
+    source_hash = source_hash or file_hash(csv_path)
+    key = hashlib.sha256((source_hash + scoring_fingerprint(preset, weights)).encode()).hexdigest()
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(index_dir, f"{stem}-{preset}-{key[:16]}.arrow")
+
+
+def coerce_types(df):
+    """Coerce Price/Rating the way load_data() does, in place."""
+    # Convert Price to numeric, leaving unparseable prices missing
+    df['Price (per Kg)'] = pd.to_numeric(df['Price (per Kg)'], errors='coerce')
+    # Convert Rating to numeric and fill any missing ratings with 0
+    df['Rating'] = pd.to_numeric(df['Rating'], errors='coerce').fillna(0)
+    return df
+
+
+def load_csv(csv_path):
+    """Read the raw CSV with Price/Rating coerced."""
+    return coerce_types(pd.read_csv(csv_path))
+
+
+def split_url(urls):
+    """Split URLs into (canonical URL, tracking query string) series."""
+    # A column with no URLs at all is read as float; partition() then has
+    # no columns past the first
+    urls = urls.astype(object)
+    parts = urls.str.partition('?').reindex(columns=range(3))
+    canonical = parts[0].where(urls.notna())
+    tracking = parts[2].where(urls.notna() & (parts[1] == '?'))
+    return canonical, tracking
+
+
+def compact_number(values):
+    """int32 for a column of whole numbers that fits, float32 otherwise."""
+    if pd.api.types.is_integer_dtype(values.dtype):
+        info = np.iinfo(np.int32)
+        if not len(values) or (info.min <= values.min() and values.max() <= info.max):
+            return values.astype(np.int32)
+    return values.astype(np.float32)
+
+
+def compact_frame(df):
+    """Convert a scored frame to the compact index layout.
+
+    Repeated text becomes categorical (with sorted categories, so code order
+    is string order) and the numeric columns become float32, or int32 while
+    they hold whole numbers only.
+    """
+    df = df.copy()
+    for column in CATEGORICAL_COLUMNS:
+        df[column] = pd.Categorical(df[column])
+    for column in NUMERIC_COLUMNS:
+        df[column] = compact_number(df[column])
+    return df
+
+
+def distinct_values(values):
+    """(code per row, distinct values), using a categorical's own codes when it has them.
+
+    Missing values get code -1.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), values.cat.categories.to_numpy(dtype=object)
+    return pd.factorize(values.astype(object))
+
+
+def concat_compact(frames):
+    """Concatenate compact frames, re-unifying their categorical and numeric columns."""
+    df = pd.concat(frames, ignore_index=True)
+    for column in CATEGORICAL_COLUMNS:
+        if column in df:
+            df[column] = pd.Categorical(df[column])
+    for column in NUMERIC_COLUMNS:
+        if column in df:
+            df[column] = compact_number(df[column])
+    return df
+
+
+def score_frame(df, weights=SCORING_WEIGHTS, price_stats=None, **term_options):
+    """df with its Supplier Score and the component scores it was combined from.
+
+    The components are kept (as COMPONENT_COLUMNS) so other weightings can be
+    served without rescoring; see scoring_profiles.py. So are the reasons
+    behind them (as EXPLANATION_COLUMNS, see scoring.explain_components).
+    """
+    components = supplier_components(df, price_stats, **term_options)
+    df['Supplier Score'] = combine_scores(components, weights)
+    for name, column in COMPONENT_COLUMNS.items():
+        df[column] = components[name]
+    df[REASONS_COLUMN], df[WORDS_COLUMN] = explain_components(df, **term_options)
+    return df
+
+
+def build_index(csv_path, preset='api', weights=SCORING_WEIGHTS, index_dir=INDEX_DIR):
+    """Score the CSV once and write it as an Arrow IPC file. Returns its path."""
+    source_hash = file_hash(csv_path)
+    path = index_path(csv_path, preset, weights, index_dir, source_hash)
+
+    df = load_csv(csv_path)
+    df = score_frame(df, weights, **SCORING_PRESETS[preset])
+
+    write_index(compact_frame(df), path, {
+        'source_path': os.path.abspath(csv_path),
+        'source_sha256': source_hash,
+        'scoring_preset': preset,
+        'scoring_weights': json.dumps(weights),
+    })
+    return path
+
+
+def write_index(frame, path, metadata):
+    """Write a compact frame to an Arrow IPC index file atomically."""
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        **{key.encode(): value.encode() for key, value in metadata.items()},
+    })
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    # Write to a private temp file and rename, so concurrent builders and
+    # readers never see a half-written index
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def index_metadata(path):
+    """The string metadata stored in an index file's schema."""
+    schema = pa.ipc.open_file(pa.memory_map(path, 'r')).schema
+    return {key.decode(): value.decode() for key, value in (schema.metadata or {}).items()
+            if key != b'pandas'}
+
+
+def index_files(path):
+    """The files the index at path is made of, oldest first.
+
+    An ingested index is a segment holding only the rows it added; its
+    'previous' metadata names the index it extends (see ingest.py).
+    """
+    paths = [path]
+    while previous := index_metadata(paths[0]).get('previous'):
+        paths.insert(0, os.path.join(os.path.dirname(path), previous))
+    return paths
+
+
+def read_columns(path, columns):
+    """The given columns of the index at path, over all its files, memory-mapped.
+
+    The files' record batches are chained rather than copied: text columns
+    stay Arrow-backed on the mapped pages whatever the number of files.
+    Only the fixed-width columns (numbers, category codes) of a segmented
+    index are made contiguous.
+    """
+    tables = []
+    for file_path in index_files(path):
+        table = pa.ipc.open_file(pa.memory_map(file_path, 'r')).read_all()
+        tables.append(table.select([name for name in table.column_names if name in columns]))
+    if len(tables) == 1:
+        return tables[0].to_pandas(split_blocks=True)
+    # A segment may hold wider types, e.g. fractional prices after whole ones
+    df = pa.concat_tables(tables, promote_options='permissive').to_pandas(split_blocks=True)
+    for column in CATEGORICAL_COLUMNS:
+        if column in df and not df[column].cat.categories.is_monotonic_increasing:
+            # Dictionaries are unified in file order; keep code order string order
+            df[column] = df[column].cat.reorder_categories(df[column].cat.categories.sort_values())
+    for column in NUMERIC_COLUMNS:
+        if column in df:
+            df[column] = compact_number(df[column])
+    return df
+
+
+def market_presence(frame, **term_options):
+    """Market presence of every row of frame, its prices scored against each other.
+
+    `frame` has the Keyword, Price and REASONS_COLUMN columns of an index.
+    """
+    prices = frame['Price (per Kg)']
+    if prices.dtype == np.float32:
+        # Widen to the shortest decimal, so prices score as they read in the CSV
+        frame = frame.assign(**{'Price (per Kg)': prices.astype(str).astype(np.float64)})
+    return reprice_market_presence(frame[REASONS_COLUMN], keyword_price_competitiveness(frame), **term_options)
+
+
+def reprice_frame(frame, weights=SCORING_WEIGHTS, **term_options):
+    """A frame read with components, its market presence and Supplier Score re-priced over all its rows."""
+    if not isinstance(term_options.get('price_competitiveness'), str):
+        return frame
+    frame = frame.copy()
+    frame[COMPONENT_COLUMNS['market_presence']] = market_presence(frame, **term_options)
+    components = frame[list(COMPONENT_COLUMNS.values())].set_axis(list(COMPONENT_COLUMNS), axis=1)
+    frame['Supplier Score'] = compact_number(combine_scores(components, weights))
+    return frame
+
+
+@functools.lru_cache(maxsize=4)
+def _market_presence(path):
+    """Market presence of every row of the index at path, re-priced over all its files.
+
+    Relative prices are scored against the whole index, so the scores
+    stored in a segment (or in the files before it) are stale once more
+    rows are added. None when the stored scores are current.
+    """
+    metadata = index_metadata(path)
+    term_options = SCORING_PRESETS[metadata.get('scoring_preset', 'api')]
+    if not metadata.get('previous') or not isinstance(term_options.get('price_competitiveness'), str):
+        return None
+    return market_presence(read_columns(path, {'Keyword', 'Price (per Kg)', REASONS_COLUMN}), **term_options)
+
+
+def read_index(path, components=False):
+    """Open an index memory-mapped and wrap it in a DataFrame without copying.
+
+    The component score and explanation columns stay on disk (their pages
+    are never touched) unless `components` is set.
+    """
+    hidden = set() if components else set(COMPONENT_COLUMNS.values()) | set(EXPLANATION_COLUMNS)
+    names = pa.ipc.open_file(pa.memory_map(path, 'r')).schema.names
+    df = read_columns(path, {name for name in names if name not in hidden})
+    if _market_presence(path) is not None:
+        scores = read_components(path)
+        weights = json.loads(index_metadata(path)['scoring_weights'])
+        df['Supplier Score'] = compact_number(combine_scores(scores, weights))
+        if components:
+            df[COMPONENT_COLUMNS['market_presence']] = scores['market_presence']
+    return df
+
+
+def read_components(path):
+    """The component scores of an index, one column per scoring component."""
+    components = read_columns(path, set(COMPONENT_COLUMNS.values()))
+    components = components[list(COMPONENT_COLUMNS.values())].set_axis(list(COMPONENT_COLUMNS), axis=1)
+    market_presence = _market_presence(path)
+    if market_presence is not None:
+        components['market_presence'] = market_presence
+    return components
+
+
+def derived_index_path(index_path, kind, options):
+    """Directory of a structure of the given kind derived from the index at index_path."""
+    key = hashlib.sha256(json.dumps(options, sort_keys=True).encode()).hexdigest()
+    # Supplier index file names are content-addressed, so they key this too
+    return f"{os.path.splitext(index_path)[0]}-{kind}-{key[:16]}"
+
+
+def save_arrays(path, arrays, metadata, tables=None):
+    """Write named numpy arrays plus JSON metadata to directory `path` atomically.
+
+    `tables` ({name: DataFrame}) are written alongside as <name>.arrow index
+    files, to be opened with read_index().
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    os.makedirs(tmp_path, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_path, f"{name}.npy"), array)
+    for name, frame in (tables or {}).items():
+        write_index(frame, os.path.join(tmp_path, f"{name}.arrow"), {})
+    with open(os.path.join(tmp_path, 'metadata.json'), 'w') as f:
+        json.dump(metadata, f)
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # Another process saved the same arrays first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def expand_offsets(offsets, positions, n_keys):
+    """CSR offsets re-laid over a larger, sorted key space.
+
+    Key i of `offsets` becomes key positions[i]; positions must increase.
+    """
+    counts = np.zeros(n_keys, dtype=np.int64)
+    counts[positions] = np.diff(offsets)
+    return np.concatenate([[0], np.cumsum(counts)])
+
+
+def merge_postings(offsets, rows, other_offsets, other_rows):
+    """(offsets, rows) of two CSR postings over the same keys, each key's rows before other's.
+
+    Appending a segment keeps every key's rows in row order this way,
+    without sorting the postings again.
+    """
+    counts = np.diff(offsets)
+    other_counts = np.diff(other_offsets)
+    merged_offsets = np.concatenate([[0], np.cumsum(counts + other_counts)])
+    merged = np.empty(len(rows) + len(other_rows), dtype=np.result_type(rows, other_rows))
+    # A posting moves by how much its key's start moved
+    merged[np.repeat(merged_offsets[:-1] - offsets[:-1], counts) + np.arange(len(rows))] = rows
+    other_shift = np.repeat(merged_offsets[:-1] + counts - other_offsets[:-1], other_counts)
+    merged[other_shift + np.arange(len(other_rows))] = other_rows
+    return merged_offsets, merged
+
+
+def load_arrays(path):
+    """Open a save_arrays() directory: ({name: read-only memory-mapped array}, metadata)."""
+    with open(os.path.join(path, 'metadata.json')) as f:
+        metadata = json.load(f)
+    arrays = {os.path.splitext(name)[0]: np.load(os.path.join(path, name), mmap_mode='r')
+              for name in os.listdir(path) if name.endswith('.npy')}
+    return arrays, metadata
+
+
+def ensure_index(csv_path, preset='api', weights=SCORING_WEIGHTS, index_dir=INDEX_DIR):
+    """Return the index file path for csv_path, building it if needed."""
+    path = index_path(csv_path, preset, weights, index_dir)
+    if not os.path.exists(path):
+        path = build_index(csv_path, preset, weights, index_dir)
+    return path
+
+
+def pointer_path(csv_path, preset='api', index_dir=INDEX_DIR):
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(index_dir, f"{stem}-{preset}.current.json")
+
+
+def set_current_index(csv_path, preset, base_path, current_path, index_dir=INDEX_DIR):
+    """Atomically point csv_path/preset at current_path (an ingested index on base_path)."""
+    path = pointer_path(csv_path, preset, index_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({'base': os.path.basename(base_path), 'current': os.path.basename(current_path)}, f)
+    os.replace(tmp_path, path)
+
+
+def current_index_path(csv_path, preset='api', weights=SCORING_WEIGHTS, index_dir=INDEX_DIR):
+    """Path of the index to serve: the latest ingested one, or the CSV's own.
+
+    Ingested indexes extend one particular base index; once the CSV (or the
+    scoring options) change, the pointer is ignored and the fresh base wins.
+    """
+    base_path = ensure_index(csv_path, preset, weights, index_dir)
+    try:
+        with open(pointer_path(csv_path, preset, index_dir)) as f:
+            pointer = json.load(f)
+    except (OSError, ValueError):
+        return base_path
+    current_path = os.path.join(index_dir, pointer['current'])
+    if pointer['base'] == os.path.basename(base_path) and os.path.exists(current_path):
+        return current_path
+    return base_path
+
+
+def open_index(csv_path, preset='api', weights=SCORING_WEIGHTS, index_dir=INDEX_DIR):
+    """Return the scored supplier frame to serve for csv_path, building the index if needed."""
+    return read_index(current_index_path(csv_path, preset, weights, index_dir))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the precomputed supplier index.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build = subparsers.add_parser('build', help="score the CSV and write the index")
+    build.add_argument('--csv', default="indiamart_casting_data_cleaned_no_missing_prices.csv")
+    build.add_argument('--index-dir', default=INDEX_DIR)
+    build.add_argument('--preset', choices=sorted(SCORING_PRESETS), action='append',
+                       help="scoring preset to build (default: all)")
+    args = parser.parse_args(argv)
+
+    for preset in args.preset or sorted(SCORING_PRESETS):
+        path = index_path(args.csv, preset, index_dir=args.index_dir)
+        if os.path.exists(path):
+            print(f"{preset}: up to date ({path})")
+        else:
+            print(f"{preset}: built {build_index(args.csv, preset, index_dir=args.index_dir)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+"""Row-id based filtering, sorting and paging for the supplier API.
+
+Requests work on numpy arrays of positional row ids instead of filtered
+copies of the DataFrame; only the rows of the requested page are ever
+materialized as records.
+"""
+import numpy as np
+import pandas as pd
+
+from search_index import literal_text, tokenize
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 1000
+
+# Columns a typo-tolerant keyword is matched against
+FUZZY_COLUMNS = ['Keyword', 'Product Name']
+
+
+def query_key(keyword=None, min_price=None, max_price=None, city=None, near=None, state=None, fuzzy=False):
+    """Normalized, hashable key for a filter combination.
+
+    Parameters that cannot change the result are folded together: keyword
+    case and spacing (and punctuation between words, which the index does
+    not see unless the keyword is matched literally), a price range given
+    with only one bound, and state case and spacing.
+    """
+    if min_price is None or max_price is None:
+        min_price = max_price = None
+    state = ' '.join(state.lower().split()) if state else None
+    # A keyword without tokens matches nothing, unlike no keyword at all; one
+    # with punctuation is kept as text, which it is matched against (see keyword_rows)
+    keyword_key = (literal_text(keyword) or tuple(tokenize(keyword))) if keyword else None
+    return (keyword_key, min_price, max_price, city or None,
+            tuple(near) if near else None, state, bool(fuzzy and keyword))
+
+
+def keyword_rows(df, search_index, keyword, fuzzy=False):
+    """Row ids whose Keyword matches, or with `fuzzy` whose Keyword or
+    Product Name matches allowing for typos.
+
+    A keyword with punctuation (such as 'c++') must also appear literally,
+    ignoring case, in one of those columns; the index only narrows down the
+    rows to check.
+    """
+    columns = FUZZY_COLUMNS if fuzzy else ['Keyword']
+    literal = literal_text(keyword)
+    if literal is None:
+        return search_index.search(keyword, columns=columns, fuzzy=fuzzy)
+    if tokenize(keyword):
+        rows = search_index.search(keyword, columns=columns, fuzzy=fuzzy)
+    else:
+        rows = np.arange(len(df), dtype=np.int32)
+    found = np.zeros(len(rows), dtype=bool)
+    for column in columns:
+        found |= contains(df[column], literal, rows)
+    return rows[found]
+
+
+def filter_rows(df, search_index, keyword=None, min_price=None, max_price=None, city=None,
+                geo_index=None, near=None, state=None, fuzzy=False):
+    """Sorted positional row ids matching the /suppliers filters.
+
+    `near` is a (latitude, longitude, radius_km) tuple; it and `state` need
+    the dataset's geo_index.
+    """
+    if keyword:
+        rows = keyword_rows(df, search_index, keyword, fuzzy)
+    elif near:
+        # Start from the listings around the point instead of every row
+        rows = geo_index.near(*near)
+    elif state:
+        rows = geo_index.in_state(state)
+    else:
+        rows = np.arange(len(df))
+
+    if near and keyword:
+        rows = rows[geo_index.near_mask(rows, *near)]
+    if state and (keyword or near):
+        rows = rows[geo_index.state_mask(rows, state)]
+
+    if min_price is not None and max_price is not None:
+        price = df['Price (per Kg)'].to_numpy()[rows]
+        rows = rows[(price >= min_price) & (price <= max_price)]
+
+    if city:
+        rows = rows[equals(df['City'], city, rows)]
+
+    return rows
+
+
+def filter_rows_batch(df, search_index, queries, geo_index=None):
+    """filter_rows() for many queries in one pass.
+
+    `queries` are query_key() tuples. Each distinct keyword, price range,
+    city, area and state is evaluated once as a full-length mask, and every
+    query that uses it shares that mask.
+    """
+    all_rows = np.arange(len(df))
+    masks = {}
+
+    def mask(kind, value, compute):
+        if (kind, value) not in masks:
+            masks[kind, value] = compute()
+        return masks[kind, value]
+
+    def keyword_mask(keyword, fuzzy):
+        # query_key() keeps a keyword as its tokens, or as text when literal
+        selected = np.zeros(len(df), dtype=bool)
+        keyword = keyword if isinstance(keyword, str) else ' '.join(keyword)
+        selected[keyword_rows(df, search_index, keyword, fuzzy)] = True
+        return selected
+
+    def price_mask(bounds):
+        price = df['Price (per Kg)'].to_numpy()
+        return (price >= bounds[0]) & (price <= bounds[1])
+
+    results = []
+    for keyword, min_price, max_price, city, near, state, fuzzy in queries:
+        parts = []
+        if keyword is not None:
+            parts.append(mask('keyword', (keyword, fuzzy), lambda: keyword_mask(keyword, fuzzy)))
+        if min_price is not None:
+            parts.append(mask('price', (min_price, max_price), lambda: price_mask((min_price, max_price))))
+        if city is not None:
+            parts.append(mask('city', city, lambda: equals(df['City'], city, all_rows)))
+        if near is not None:
+            parts.append(mask('near', near, lambda: geo_index.near_mask(all_rows, *near)))
+        if state is not None:
+            parts.append(mask('state', state, lambda: geo_index.state_mask(all_rows, state)))
+        if not parts:
+            results.append(all_rows)
+            continue
+        selected = parts[0].copy() if len(parts) > 1 else parts[0]
+        for part in parts[1:]:
+            selected &= part
+        results.append(np.flatnonzero(selected))
+    return results
+
+
+def equals(column, value, rows):
+    """Boolean mask of column[rows] == value.
+
+    Categorical columns compare their integer codes against the value's code
+    instead of materializing strings.
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        code = column.cat.categories.get_indexer([value])[0]
+        if code < 0:
+            return np.zeros(len(rows), dtype=bool)
+        return column.cat.codes.to_numpy()[rows] == code
+    return column.to_numpy()[rows] == value
+
+
+def contains(column, text, rows):
+    """Boolean mask of whether column[rows], lowercased, contains text.
+
+    Categorical columns check each category once and look the rows up by
+    code.
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        categories = column.cat.categories.to_series().astype(str).str.lower()
+        # The extra last slot is what code -1 (missing) picks
+        found = np.append(categories.str.contains(text, regex=False).to_numpy(dtype=bool), False)
+        return found[column.cat.codes.to_numpy()[rows]]
+    values = pd.Series(column.to_numpy(dtype=object)[rows], dtype=object)
+    return values.str.lower().str.contains(text, regex=False, na=False).to_numpy(dtype=bool)
+
+
+def sort_rows(df, rows, sort_by, ascending=False):
+    """Reorder row ids by a column; ties keep their dataset order."""
+    if sort_by not in df.columns:
+        return rows
+    values = df[sort_by].iloc[rows].reset_index(drop=True)
+    order = values.sort_values(ascending=ascending, kind='stable').index.to_numpy()
+    return rows[order]
+
+
+def order_rows(df, sort_index, rows, sort_by, ascending=False, limit=None):
+    """Order row ids by sort_by, returning only the first `limit` when given.
+
+    Columns in the precomputed sort index never sort the whole result when a
+    limit is given; other columns fall back to sort_rows.
+    """
+    if sort_by in sort_index:
+        if limit is None:
+            return sort_index.sort(rows, sort_by, ascending)
+        return sort_index.top_k(rows, sort_by, ascending, limit)
+    rows = sort_rows(df, rows, sort_by, ascending)
+    return rows if limit is None else rows[:limit]
+
+
+def parse_fields(fields, columns):
+    """Split a `fields=A,B` projection; raises ValueError on unknown columns."""
+    if not fields:
+        return list(columns)
+    selected = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in selected if field not in columns]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return selected
+
+
+def frame_records(frame, fields=None):
+    """Plain-Python records for a (small) frame, restricted to `fields`.
+
+    float32 columns are widened through their shortest decimal form, so a
+    stored 4.4 is served as 4.4 rather than 4.400000095367432.
+    """
+    frame = frame[fields] if fields is not None else frame
+    widened = {column: frame[column].astype(str).astype(np.float64)
+               for column in frame.columns if frame[column].dtype == np.float32}
+    if widened:
+        frame = frame.assign(**widened)
+    return frame.to_dict(orient='records')
+
+
+def page_records(df, rows, fields=None):
+    """Records for the given row ids, restricted to `fields`."""
+    return frame_records(df.iloc[rows], fields)
+
@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CSV_FILE_PATH = os.path.join(ROOT, "indiamart_casting_data_cleaned_no_missing_prices.csv")
+
+
+@pytest.fixture
+def index_dir(tmp_path):
+    return str(tmp_path / 'index')
@@ -0,0 +1,106 @@
+import io
+import xml.etree.ElementTree as ElementTree
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from conftest import CSV_FILE_PATH
+from export import Export, export_chunks
+from supplier_index import build_index, read_index
+
+SHEET = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+FIELDS = ['Company', 'Keyword', 'Product Name', 'Price (per Kg)', 'Rating', 'Supplier Score', 'City']
+
+
+@pytest.fixture
+def df(index_dir):
+    return read_index(build_index(CSV_FILE_PATH, index_dir=index_dir))
+
+
+@pytest.fixture
+def rows(df):
+    return np.random.default_rng(0).permutation(len(df))[:80]
+
+
+def export_bytes(df, rows, format_name, **options):
+    return b''.join(export_chunks(df, rows, format_name, **options))
+
+
+def read_sheet(data):
+    """Rows of cell values of an exported workbook: text, numbers, or None for empty cells."""
+    with zipfile.ZipFile(io.BytesIO(data)) as workbook:
+        assert workbook.testzip() is None
+        root = ElementTree.fromstring(workbook.read('xl/worksheets/sheet1.xml'))
+    values = []
+    for row in root.iter(f'{SHEET}row'):
+        cells = []
+        for cell in row:
+            text, number = cell.find(f'{SHEET}is/{SHEET}t'), cell.find(f'{SHEET}v')
+            if text is not None:
+                cells.append(text.text or '')
+            else:
+                cells.append(float(number.text) if number is not None else None)
+        values.append(cells)
+    return values
+
+
+def expected_frame(df, rows, fields=FIELDS):
+    frame = df.iloc[rows][fields].reset_index(drop=True)
+    return frame.assign(**{column: frame[column].astype(object) for column in ['Company', 'Keyword', 'City']})
+
+
+def test_csv_round_trip(df, rows):
+    exported = pd.read_csv(io.BytesIO(export_bytes(df, rows, 'csv', fields=FIELDS, chunk_size=7)))
+    expected = expected_frame(df, rows)
+    pd.testing.assert_frame_equal(exported, expected, check_dtype=False)
+
+
+def test_parquet_round_trip(df, rows):
+    table = pq.read_table(io.BytesIO(export_bytes(df, rows, 'parquet', fields=FIELDS, chunk_size=7)))
+    assert table.num_rows == len(rows)
+    pd.testing.assert_frame_equal(table.to_pandas(), expected_frame(df, rows), check_dtype=False)
+
+
+def test_xlsx_round_trip(df, rows):
+    sheet = read_sheet(export_bytes(df, rows, 'xlsx', fields=FIELDS, chunk_size=7))
+
+    assert sheet[0] == FIELDS
+    expected = expected_frame(df, rows)
+    assert len(sheet) == len(expected) + 1
+    for values, (_, row) in zip(sheet[1:], expected.iterrows()):
+        assert values[:3] == [row['Company'], row['Keyword'], row['Product Name']]
+        assert values[3:6] == pytest.approx([float(str(row[column])) for column in FIELDS[3:6]])
+        assert values[6] == row['City']
+
+
+def test_xlsx_escapes_text_and_leaves_missing_cells_empty():
+    frame = pd.DataFrame({
+        'Company': pd.Categorical(['A & B <Castings>', None]),
+        'Product Name': ['Valve\x01 body', None],
+        'Price (per Kg)': [np.nan, 12.5],
+        'In Stock': [True, False],
+    })
+    sheet = read_sheet(export_bytes(frame, np.arange(2), 'xlsx'))
+
+    assert sheet == [['Company', 'Product Name', 'Price (per Kg)', 'In Stock'],
+                     ['A & B <Castings>', 'Valve body', None, 1.0],
+                     [None, None, 12.5, 0.0]]
+
+
+def test_scores_are_exported_with_overrides(df, rows):
+    overrides = {'Supplier Score': pd.Series(np.arange(len(df), dtype=np.float64))}
+    exported = pd.read_csv(io.BytesIO(export_bytes(df, rows, 'csv', fields=['Supplier Score'],
+                                                   overrides=overrides)))
+    np.testing.assert_array_equal(exported['Supplier Score'].to_numpy(), rows)
+
+
+def test_export_measures_what_it_wrote(df, rows):
+    file = io.BytesIO()
+    export = Export(df, rows, 'csv').write_to(file)
+    assert export.bytes == len(file.getvalue()) > 0
+    assert export.rows == len(rows)
+    with pytest.raises(ValueError):
+        Export(df, rows, 'xls')
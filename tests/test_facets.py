@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import CSV_FILE_PATH
+from facets import PRICE_EDGES, RATING_EDGES, FacetIndex, bucket_labels, value_range
+from supplier_index import build_index, read_index
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        'City': pd.Categorical(['Rajkot', 'Pune', 'Rajkot', None, 'Chennai', 'Pune', 'Rajkot']),
+        'Keyword': pd.Categorical(['Casting'] * 4 + ['Forging'] * 3),
+        'Rating': [4.5, 0.0, 3.9, np.nan, 5.0, 4.4, 1.0],
+        'Price (per Kg)': [310, 9, 10, 10000, np.nan, 49.5, 50],
+    })
+
+
+def test_counts_over_every_row(df):
+    counts = FacetIndex.build(df).counts()
+
+    assert counts['City'] == {'values': [{'value': 'Rajkot', 'count': 3}, {'value': 'Pune', 'count': 2},
+                                         {'value': 'Chennai', 'count': 1}], 'missing': 1}
+    assert counts['Keyword']['values'] == [{'value': 'Casting', 'count': 4}, {'value': 'Forging', 'count': 3}]
+    # A bucket runs from its edge up to, not including, the next one
+    assert counts['Rating'] == {'values': [
+        {'value': '<1', 'min': None, 'max': 1, 'count': 1},
+        {'value': '1-2', 'min': 1, 'max': 2, 'count': 1},
+        {'value': '3.5-4', 'min': 3.5, 'max': 4, 'count': 1},
+        {'value': '4-4.5', 'min': 4, 'max': 4.5, 'count': 1},
+        {'value': '4.5+', 'min': 4.5, 'max': None, 'count': 2},
+    ], 'missing': 1}
+    assert [(bucket['value'], bucket['count']) for bucket in counts['Price (per Kg)']['values']] == [
+        ('<10', 1), ('10-20', 1), ('20-50', 1), ('50-100', 1), ('200-500', 1), ('10000+', 1)]
+    assert counts['Price (per Kg)']['missing'] == 1
+
+
+def test_counts_over_rows_and_limit(df):
+    facet_index = FacetIndex.build(df)
+    counts = facet_index.counts(np.array([0, 1, 3, 5]), limit=1)
+
+    assert counts['City'] == {'values': [{'value': 'Pune', 'count': 2}], 'missing': 1}
+    assert counts['Keyword'] == {'values': [{'value': 'Casting', 'count': 3}], 'missing': 0}
+    assert facet_index.value_counts('City', np.array([0, 2, 4])) == {'Chennai': 1, 'Rajkot': 2}
+
+
+def test_counts_match_value_counts(index_dir):
+    path = build_index(CSV_FILE_PATH, index_dir=index_dir)
+    df = read_index(path)
+    facet_index = FacetIndex.build(df)
+    rows = np.flatnonzero(df['Rating'].to_numpy() >= 4)
+
+    counts = facet_index.counts(rows)
+    expected = df['City'].iloc[rows].value_counts(sort=False)
+    assert {entry['value']: entry['count'] for entry in counts['City']['values']} == expected[expected > 0].to_dict()
+    labels = [bucket['value'] for bucket in bucket_labels(PRICE_EDGES)]
+    buckets = pd.cut(df['Price (per Kg)'].iloc[rows], [-np.inf] + PRICE_EDGES + [np.inf], right=False,
+                     labels=labels).value_counts()
+    assert {entry['value']: entry['count'] for entry in counts['Price (per Kg)']['values']} == \
+        buckets[buckets > 0].to_dict()
+    assert sum(entry['count'] for entry in counts['Rating']['values']) + counts['Rating']['missing'] == len(rows)
+    assert len(bucket_labels(RATING_EDGES)) == len(RATING_EDGES) + 1
+
+
+def test_value_range_keeps_the_decimal_form():
+    prices = pd.Series([4.4, np.nan, 310.0], dtype=np.float32)
+    assert value_range(prices) == (4.4, 310)
+    assert value_range(prices, np.array([1])) is None
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import CSV_FILE_PATH
+from geo_index import EARTH_RADIUS_KM, Gazetteer, GeoIndex, parse_near
+from supplier_index import load_csv
+
+
+@pytest.fixture(scope='module')
+def gazetteer():
+    return Gazetteer.load()
+
+
+@pytest.fixture(scope='module')
+def listings_index(gazetteer):
+    return GeoIndex.build(load_csv(CSV_FILE_PATH), gazetteer)
+
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    lat1, lon1, lat2, lon2 = map(np.radians, (latitude, longitude, latitudes, longitudes))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        'City': ['Vadodara', 'Rajkot', 'Vadodara', 'Nowhere'],
+        'Address': ['42-1, GIDC Estate, Makarpura - 390010, Dist.Vadodara, Gujarat', np.nan, np.nan, np.nan],
+    })
+
+
+def test_missing_address_is_geocoded_by_city(df, gazetteer):
+    geo_index = GeoIndex.build(df, gazetteer)
+
+    rajkot = gazetteer.by_name['rajkot']
+    assert geo_index.location_codes[1] == rajkot
+    assert geo_index.location_codes[2] == gazetteer.by_name['vadodara']
+    assert geo_index.location_codes[3] == -1
+    assert [geo_index.states[code] for code in geo_index.state_codes[:3]] == ['Gujarat'] * 3
+    np.testing.assert_array_equal(
+        geo_index.near(geo_index.latitude[rajkot], geo_index.longitude[rajkot], 10), [1])
+
+
+@pytest.mark.parametrize('near, radius_km', [('Rajkot', 25), ('Rajkot', 250), ('Pune', 150), ('Chennai', 5),
+                                             ('28.6,77.2', 400), ('Pune', 0)])
+def test_near_matches_great_circle_distance(listings_index, gazetteer, near, radius_km):
+    latitude, longitude, radius_km = parse_near(near, radius_km, gazetteer)
+    codes = listings_index.location_codes
+    known = codes >= 0
+    distances = haversine_km(latitude, longitude, listings_index.latitude[codes[known]],
+                             listings_index.longitude[codes[known]])
+    expected = np.flatnonzero(known)[distances <= radius_km]
+
+    rows = listings_index.near(latitude, longitude, radius_km)
+    np.testing.assert_array_equal(rows, expected)
+    all_rows = np.arange(listings_index.n_rows)
+    np.testing.assert_array_equal(all_rows[listings_index.near_mask(all_rows, latitude, longitude, radius_km)],
+                                  expected)
+
+
+def test_in_state_is_case_insensitive(listings_index):
+    rows = listings_index.in_state(' gujarat ')
+    assert len(rows)
+    np.testing.assert_array_equal(rows, listings_index.in_state('Gujarat'))
+    assert (listings_index.state_codes[rows] == listings_index.state_code('Gujarat')).all()
+    assert len(listings_index.in_state('Atlantis')) == 0
@@ -0,0 +1,129 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import ingest as ingest_module
+from conftest import CSV_FILE_PATH
+from geo_index import GeoIndex, Gazetteer, geo_index_path
+from ingest import ingest
+from live_dataset import SupplierData
+from search_index import InvertedIndex, _Postings, search_index_path
+from supplier_index import build_index, index_files, read_components, read_index
+
+
+def split_csv(tmp_path, rows):
+    """Write the first `rows` listings of the CSV as a base CSV and the rest as a batch."""
+    df = pd.read_csv(CSV_FILE_PATH)
+    base_csv, batch_csv = str(tmp_path / 'base.csv'), str(tmp_path / 'batch.csv')
+    df.iloc[:rows].to_csv(base_csv, index=False)
+    df.iloc[rows:].to_csv(batch_csv, index=False)
+    return base_csv, batch_csv
+
+
+def index_contents(index_dir):
+    return {os.path.join(root, name) for root, _, names in os.walk(index_dir) for name in names}
+
+
+def test_ingest_appends_a_segment(tmp_path, index_dir):
+    base_csv, batch_csv = split_csv(tmp_path, 60)
+    base_path = build_index(base_csv, index_dir=index_dir)
+    with open(base_path, 'rb') as f:
+        base_bytes = f.read()
+
+    path, stats = ingest([batch_csv], base_csv, index_dir=index_dir)
+
+    assert stats['added'] == 52
+    assert index_files(path) == [base_path, path]
+    with open(base_path, 'rb') as f:
+        assert f.read() == base_bytes
+    assert len(read_index(path)) == 112
+
+
+def test_ingest_chunk_without_urls(tmp_path, index_dir):
+    base_csv, _ = split_csv(tmp_path, 60)
+    batch = pd.read_csv(CSV_FILE_PATH).iloc[60:63].copy()
+    batch['Product URL'] = np.nan
+    batch['Company URL'] = np.nan
+    batch_csv = str(tmp_path / 'no-urls.csv')
+    batch.to_csv(batch_csv, index=False)
+
+    path, stats = ingest([batch_csv], base_csv, index_dir=index_dir)
+
+    assert stats['added'] == 3
+    df = read_index(path)
+    assert len(df) == 63
+    assert df['Product URL'].iloc[60:].isna().all()
+
+
+def test_ingested_scores_match_a_fresh_build(tmp_path, index_dir):
+    base_csv, batch_csv = split_csv(tmp_path, 60)
+    path, _ = ingest([batch_csv], base_csv, 'streamlit', index_dir=index_dir)
+    fresh_path = build_index(CSV_FILE_PATH, 'streamlit', index_dir=index_dir)
+
+    np.testing.assert_array_equal(read_index(path)['Supplier Score'].to_numpy(),
+                                  read_index(fresh_path)['Supplier Score'].to_numpy())
+    pd.testing.assert_frame_equal(read_components(path), read_components(fresh_path))
+
+
+def test_ingest_touches_only_the_new_rows(tmp_path, index_dir, monkeypatch):
+    base_csv, batch_csv = split_csv(tmp_path, 60)
+    SupplierData(build_index(base_csv, index_dir=index_dir))  # as the APIs would have
+
+    sizes = []
+    score_frame, build_postings, geocode = ingest_module.score_frame, _Postings.build, Gazetteer.geocode
+    monkeypatch.setattr(ingest_module, 'score_frame',
+                        lambda df, *args, **kwargs: sizes.append(len(df)) or score_frame(df, *args, **kwargs))
+    monkeypatch.setattr(_Postings, 'build', classmethod(
+        lambda cls, values: sizes.append(len(values)) or build_postings.__func__(cls, values)))
+    monkeypatch.setattr(Gazetteer, 'geocode', lambda self, addresses, cities=None:
+                        sizes.append(len(addresses)) or geocode(self, addresses, cities))
+    path, stats = ingest([batch_csv], base_csv, index_dir=index_dir)
+
+    assert sizes and max(sizes) <= stats['added'] == 52
+    # Serving the new index builds nothing
+    before = index_contents(index_dir)
+    SupplierData(path)
+    assert index_contents(index_dir) == before
+
+
+def test_appended_indexes_match_a_fresh_build(tmp_path, index_dir):
+    base_csv, batch_csv = split_csv(tmp_path, 60)
+    path, _ = ingest([batch_csv], base_csv, index_dir=index_dir)
+    df = read_index(path)
+
+    appended, fresh = InvertedIndex.load(search_index_path(path)), InvertedIndex.build(df)
+    for column, postings in fresh.postings.items():
+        for name in ('vocab', 'offsets', 'row_ids', 'grams', 'gram_offsets', 'gram_terms'):
+            np.testing.assert_array_equal(getattr(appended.postings[column], name), getattr(postings, name))
+    appended, fresh = GeoIndex.load(geo_index_path(path)), GeoIndex.build(df)
+    assert appended.states == fresh.states
+    for name in ('location_codes', 'location_order', 'location_offsets', 'state_codes', 'state_order',
+                 'state_offsets'):
+        np.testing.assert_array_equal(getattr(appended, name), getattr(fresh, name))
+
+
+def test_segmented_text_is_read_without_copying(tmp_path, index_dir):
+    base_csv, batch_csv = split_csv(tmp_path, 60)
+    path, _ = ingest([batch_csv], base_csv, index_dir=index_dir)
+
+    names = read_index(path)['Product Name'].array.__arrow_array__()
+    assert [len(chunk) for chunk in names.chunks] == [60, 52]
+
+
+def test_ingest_compacts_at_max_segments(tmp_path, index_dir):
+    base_csv, batch_csv = split_csv(tmp_path, 60)
+    df = pd.read_csv(batch_csv)
+    first_csv, second_csv = str(tmp_path / 'first.csv'), str(tmp_path / 'second.csv')
+    df.iloc[:20].to_csv(first_csv, index=False)
+    df.iloc[20:].to_csv(second_csv, index=False)
+
+    first, _ = ingest([first_csv], base_csv, 'streamlit', index_dir=index_dir, max_segments=2)
+    assert len(index_files(first)) == 2
+    path, _ = ingest([second_csv], base_csv, 'streamlit', index_dir=index_dir, max_segments=2)
+
+    assert index_files(path) == [path]
+    fresh_path = build_index(CSV_FILE_PATH, 'streamlit', index_dir=index_dir)
+    np.testing.assert_array_equal(read_index(path)['Supplier Score'].to_numpy(),
+                                  read_index(fresh_path)['Supplier Score'].to_numpy())
+    pd.testing.assert_frame_equal(read_components(path), read_components(fresh_path))
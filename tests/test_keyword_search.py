@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from search_index import InvertedIndex
+from supplier_query import filter_rows_batch, keyword_rows, query_key
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        'Keyword': pd.Categorical(['C++ tooling', 'Casting', 'Cold forging', 'C parts', 'Die casting (HPDC)',
+                                   'Nut & bolt']),
+        'Product Name': ['Tool', 'Aluminium casting', 'Forged flange', 'Part (C)', 'Housing', 'M8 bolt'],
+        'Company': ['A', 'B', 'C', 'D', 'E', 'F'],
+        'Price (per Kg)': [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+    })
+
+
+@pytest.fixture
+def search_index(df):
+    return InvertedIndex.build(df)
+
+
+@pytest.mark.parametrize('keyword, expected', [
+    ('c++', [0]),
+    ('C++ tool', [0]),
+    ('(', [4]),
+    ('(hpdc)', [4]),
+    ('&', [5]),
+    ('++', [0]),
+    ('c#', []),
+    (')(', []),
+])
+def test_punctuation_is_matched_literally(df, search_index, keyword, expected):
+    np.testing.assert_array_equal(keyword_rows(df, search_index, keyword), expected)
+
+
+def test_punctuation_is_matched_literally_with_fuzzy(df, search_index):
+    np.testing.assert_array_equal(keyword_rows(df, search_index, '(', fuzzy=True), [3, 4])
+
+
+def test_single_character_is_not_a_prefix(df, search_index):
+    np.testing.assert_array_equal(keyword_rows(df, search_index, 'c'), [0, 3])
+    np.testing.assert_array_equal(keyword_rows(df, search_index, 'ca'), [1, 4])
+
+
+def test_literal_keywords_have_their_own_cache_key(df, search_index):
+    keys = [query_key('c++'), query_key('c'), query_key('C++'), query_key('(')]
+    assert keys[0] != keys[1]
+    assert keys[0] == keys[2]
+    results = filter_rows_batch(df, search_index, keys)
+    for rows, expected in zip(results, [[0], [0, 3], [0], [4]]):
+        np.testing.assert_array_equal(rows, expected)
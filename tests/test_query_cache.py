@@ -0,0 +1,66 @@
+import pytest
+
+from query_cache import QueryCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = QueryCache(maxsize=4, ttl=10, clock=clock)
+    cache.put('a', 1)
+    clock.now = 9.9
+    assert cache.get('a') == 1
+    clock.now = 10
+    assert cache.get('a') is None
+    assert cache.stats()['size'] == 0
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = QueryCache(maxsize=2, ttl=10, clock=clock)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1  # 'b' is now the least recently used
+    cache.put('c', 3)
+
+    assert cache.get('b', default='evicted') == 'evicted'
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert cache.stats()['evictions'] == 1
+
+
+def test_new_version_drops_every_entry(clock):
+    cache = QueryCache(maxsize=4, ttl=10, clock=clock)
+    cache.put('a', 1, version='index-1')
+    cache.put('b', 2, version='index-1')
+    assert cache.get('a', version='index-1') == 1
+
+    assert cache.get('a', version='index-2') is None
+    assert cache.get('b', version='index-1') is None  # not brought back by the old version
+    stats = cache.stats()
+    assert stats['invalidations'] == 1
+    assert stats['version'] == 'index-1'
+
+
+def test_stats_count_hits_and_misses(clock):
+    cache = QueryCache(maxsize=4, ttl=10, clock=clock)
+    cache.put('a', [0, 1])
+    cache.get('a')
+    cache.get('b')
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['hit_rate']) == (1, 1, 0.5)
+
+
+def test_zero_size_cache_stores_nothing(clock):
+    cache = QueryCache(maxsize=0, clock=clock)
+    cache.put('a', 1)
+    assert cache.get('a') is None
@@ -0,0 +1,32 @@
+import json
+
+import pandas as pd
+
+from conftest import CSV_FILE_PATH
+from serialization import RecordEncoder
+from supplier_index import build_index, read_index
+
+
+def baseline_frame():
+    # The frame the original app2.py served records from
+    df = pd.read_csv(CSV_FILE_PATH)
+    df['Rating'] = pd.to_numeric(df['Rating'], errors='coerce').fillna(0)
+    df['Price (per Kg)'] = pd.to_numeric(df['Price (per Kg)'], errors='coerce').fillna(0)
+    return df
+
+
+def test_records_match_baseline(index_dir):
+    baseline = baseline_frame()
+    encoder = RecordEncoder(read_index(build_index(CSV_FILE_PATH, index_dir=index_dir)))
+    for row in range(len(baseline)):
+        served = json.loads(encoder.row(row))
+        for column, value in baseline.iloc[row].items():
+            # Compared as JSON text, so 310 and 310.0 differ
+            assert json.dumps(served[column]) == json.dumps(value.item() if hasattr(value, 'item') else value), \
+                (row, column)
+
+
+def test_urls_keep_their_query_string(index_dir):
+    df = read_index(build_index(CSV_FILE_PATH, index_dir=index_dir))
+    assert df['Product URL'].str.contains('?pos=', regex=False).all()
+    assert df['Company URL'].str.contains('?pos=', regex=False).all()
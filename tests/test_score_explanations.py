@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import CSV_FILE_PATH
+from score_explanations import ScoreExplanations, open_score_explanations
+from scoring import SCORING_WEIGHTS, SIGNALS, TERM_POINTS
+from supplier_index import build_index, read_index
+
+
+@pytest.fixture
+def index_path(tmp_path, index_dir):
+    csv_path = str(tmp_path / 'listings.csv')
+    pd.DataFrame({
+        'Keyword': ['Die casting', 'Forging'],
+        'Product Name': ['Precision ISO certified die casting parts for pumps', np.nan],
+        'Price (per Kg)': [310, np.nan],
+        'Product URL': ['https://acme.example/p', np.nan],
+        'Company': ['Acme Castings Pvt Ltd', 'Inc Works'],
+        'Company URL': ['https://acme.example', np.nan],
+        'City': ['Vadodara', np.nan],
+        'Address': [np.nan, np.nan],
+        'Rating': [4.5, np.nan],
+        'Phone': ['98xxxxxx', np.nan],
+    }).to_csv(csv_path, index=False)
+    return build_index(csv_path, index_dir=index_dir)
+
+
+def test_reason_bits_name_what_raised_each_score(index_path):
+    explanations = open_score_explanations(index_path, read_index(index_path))
+
+    assert explanations.matched(0) == [
+        ('products', 'term', 'casting'), ('products', 'term', 'precision'), ('business_info', 'term', 'ltd'),
+        ('quality', 'term', 'iso'), ('quality', 'term', 'certified'), ('business_info', 'signal', 'company_url'),
+        ('market_presence', 'signal', 'online_listing'), ('accessibility', 'signal', 'phone'),
+        ('accessibility', 'signal', 'location')]
+    assert explanations.matched(1) == [('business_info', 'term', 'inc')]
+
+
+def test_explained_points_add_up_to_the_score(index_path):
+    df = read_index(index_path)
+    explanations = open_score_explanations(index_path, df)
+
+    for row in range(len(df)):
+        explained = {entry['name']: entry for entry in explanations.explain(row)}
+        assert round(sum(entry['points'] for entry in explained.values()), 1) == df['Supplier Score'].iat[row]
+    explained = {entry['name']: entry for entry in explanations.explain(0)}
+    assert explained['products']['words'] == 8
+    assert explained['quality']['rating'] == 4.5
+    assert explained['quality']['weight'] == SCORING_WEIGHTS['quality']
+
+
+def test_reason_bits_reproduce_the_stored_components(index_dir):
+    path = build_index(CSV_FILE_PATH, index_dir=index_dir)
+    explanations = ScoreExplanations.load(path, read_index(path)['Rating'])
+
+    for row in range(len(explanations.reasons)):
+        matched = explanations.matched(row)
+        terms = {component for component, kind, _ in matched if kind == 'term'}
+        signals = {name for _, kind, name in matched if kind == 'signal'}
+        expected = {
+            'products': min(explanations.words[row] / 10 + TERM_POINTS['products'] * ('products' in terms), 1.0),
+            'business_info': min(SIGNALS['company_url'][1] * ('company_url' in signals)
+                                 + TERM_POINTS['business_info'] * ('business_info' in terms), 1.0),
+            'quality': min(explanations.ratings[row] / 5 + TERM_POINTS['quality'] * ('quality' in terms), 1.0),
+            'market_presence': SIGNALS['online_listing'][1] * ('online_listing' in signals),
+            'accessibility': 0.5 * ('phone' in signals) + 0.5 * ('location' in signals),
+        }
+        for name, score in expected.items():
+            assert explanations.components[name].iat[row] == pytest.approx(score, abs=1e-6), (row, name)
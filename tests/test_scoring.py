@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import CSV_FILE_PATH
+from scoring import SCORING_WEIGHTS, score_suppliers
+from supplier_index import load_csv
+
+
+def row_score(row):
+    # The row-wise scorer the original app2.py applied to every listing
+    product_score = 0
+    if pd.notna(row['Product Name']):
+        product_score = min(len(row['Product Name'].split()) / 10, 1)
+        if any(term in row['Product Name'].lower() for term in ['casting', 'machined', 'forged', 'precision',
+                                                                 'custom']):
+            product_score += 0.3
+        product_score = min(product_score, 1.0)
+
+    business_score = 0.5 if pd.notna(row['Company URL']) else 0
+    if any(pattern in str(row['Company']).lower() for pattern in ['ltd', 'private', 'inc']):
+        business_score += 0.5
+    business_score = min(business_score, 1.0)
+
+    quality_score = row['Rating'] / 5.0 if pd.notna(row['Rating']) else 0
+    if any(term in str(row['Product Name']).lower() for term in ['premium', 'iso', 'certified']):
+        quality_score += 0.3
+    quality_score = min(quality_score, 1.0)
+
+    market_score = 0.5 if pd.notna(row['Company URL']) and pd.notna(row['Product URL']) else 0
+
+    accessibility_score = 0.5 if pd.notna(row['Phone']) else 0
+    if pd.notna(row['Address']) or pd.notna(row['City']):
+        accessibility_score += 0.5
+    accessibility_score = min(accessibility_score, 1.0)
+
+    final_score = (SCORING_WEIGHTS['products'] * product_score
+                   + SCORING_WEIGHTS['business_info'] * business_score
+                   + SCORING_WEIGHTS['quality'] * quality_score
+                   + SCORING_WEIGHTS['market_presence'] * market_score
+                   + SCORING_WEIGHTS['accessibility'] * accessibility_score)
+    return round(final_score * 100, 1)
+
+
+@pytest.fixture
+def sparse_df():
+    # Missing values in every column the scorer reads
+    return pd.DataFrame({
+        'Product Name': ['Precision ISO certified die casting parts for pumps', np.nan, 'Custom  forged\tflange',
+                         'Bolt'],
+        'Company': ['Acme Castings Pvt Ltd', 'Inc Works', np.nan, 'Private Foundry'],
+        'Company URL': ['https://acme.example', np.nan, 'https://c.example', np.nan],
+        'Product URL': ['https://acme.example/p', 'https://b.example/p', np.nan, np.nan],
+        'Rating': [4.3, np.nan, 5.0, 0.0],
+        'Price (per Kg)': [310.0, np.nan, 12.5, 80.0],
+        'Phone': ['98xxxxxx', np.nan, np.nan, '97xxxxxx'],
+        'Address': [np.nan, 'Rajkot - 360024, Gujarat', np.nan, np.nan],
+        'City': ['Vadodara', np.nan, np.nan, np.nan],
+    })
+
+
+def test_scores_match_row_wise_scorer():
+    df = load_csv(CSV_FILE_PATH)
+    np.testing.assert_array_equal(score_suppliers(df).to_numpy(), df.apply(row_score, axis=1).to_numpy())
+
+
+def test_scores_match_row_wise_scorer_with_missing_values(sparse_df):
+    np.testing.assert_array_equal(score_suppliers(sparse_df).to_numpy(),
+                                  sparse_df.apply(row_score, axis=1).to_numpy())
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sort_index import SortIndex
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    n = 500
+    prices = rng.integers(10, 60, n).astype(np.float64)
+    prices[rng.random(n) < 0.1] = np.nan
+    return pd.DataFrame({
+        'Supplier Score': np.round(rng.uniform(50, 90, n), 1),
+        'Price (per Kg)': prices,
+        'Rating': rng.choice([0.0, 3.5, 4.0, 4.5, 5.0], n),
+        'Company': pd.Categorical(rng.choice(['Acme', 'Bharat', 'Cast Co', None], n)),
+    })
+
+
+@pytest.fixture
+def sort_index(df):
+    return SortIndex.build(df)
+
+
+def expected_order(df, rows, column, ascending):
+    # A stable sort with missing values last, either way
+    return df.iloc[rows].sort_values(column, ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+
+
+@pytest.mark.parametrize('column', ['Supplier Score', 'Price (per Kg)', 'Rating', 'Company'])
+@pytest.mark.parametrize('ascending', [True, False])
+@pytest.mark.parametrize('step', [1, 3, 40])  # dense, mid and sparse filters
+def test_sort_matches_stable_sort_values(df, sort_index, column, ascending, step):
+    rows = np.arange(0, len(df), step)
+    np.testing.assert_array_equal(sort_index.sort(rows, column, ascending), expected_order(df, rows, column, ascending))
+
+
+@pytest.mark.parametrize('column', ['Supplier Score', 'Price (per Kg)', 'Rating', 'Company'])
+@pytest.mark.parametrize('ascending', [True, False])
+@pytest.mark.parametrize('step, k', [(1, 10), (1, 499), (3, 25), (40, 5), (40, 13)])
+def test_top_k_is_the_head_of_sort(df, sort_index, column, ascending, step, k):
+    rows = np.arange(0, len(df), step)
+    np.testing.assert_array_equal(sort_index.top_k(rows, column, ascending, k),
+                                  expected_order(df, rows, column, ascending)[:k])
+
+
+def test_unsortable_column_keeps_row_order(sort_index):
+    rows = np.array([5, 2, 9])
+    np.testing.assert_array_equal(sort_index.sort(rows, 'Phone'), rows)
+    np.testing.assert_array_equal(sort_index.top_k(rows, 'Phone', k=2), rows[:2])